@@ -32,7 +32,12 @@ from .sandbox import (
     AsyncSandboxApi,
     SandboxApi,
 )
+from .cache import EvalCache, EvalCacheStats
 from .console import AsyncConsoleClient
+from .httpx_transport import SandboxTransport
+from .pool import AsyncReplPool, ReplPool, ReplPoolMetrics
+from .process import RingBuffer
+from .shell import AsyncShell, Shell, ShellResult
 from .options import Options, get_internal_options
 
 __all__ = [
@@ -55,6 +60,16 @@ __all__ = [
     "SymlinkAsset",
     "Asset",
     "EnvVarInputForDeploy",
+    "AsyncReplPool",
+    "ReplPool",
+    "ReplPoolMetrics",
+    "EvalCache",
+    "EvalCacheStats",
+    "RingBuffer",
+    "AsyncShell",
+    "Shell",
+    "ShellResult",
+    "SandboxTransport",
 ]
 
 
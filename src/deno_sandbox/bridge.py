@@ -1,6 +1,6 @@
 import asyncio
 import threading
-from typing import Any, Coroutine, TypeVar
+from typing import Any, AsyncGenerator, Coroutine, Iterator, TypeVar
 
 T = TypeVar("T")
 
@@ -26,6 +26,25 @@ class AsyncBridge:
         future = asyncio.run_coroutine_threadsafe(coro, self.loop)
         return future.result()
 
+    def iterate(self, agen: AsyncGenerator[T, None]) -> Iterator[T]:
+        """Drive an async generator on the bridge loop from synchronous code."""
+
+        async def _next() -> T:
+            return await agen.__anext__()
+
+        async def _close() -> None:
+            await agen.aclose()
+
+        try:
+            while True:
+                try:
+                    item = self.run(_next())
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            self.run(_close())
+
     def stop(self) -> None:
         self.loop.call_soon_threadsafe(self.loop.stop)
         self.thread.join()
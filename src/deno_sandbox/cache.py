@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Optional, TypedDict, Union
+
+
+class EvalCacheStats(TypedDict):
+    entries: int
+    """Results held in memory."""
+
+    epoch: int
+    """The current epoch. Results from earlier epochs are never returned."""
+
+    hits: int
+    """Lookups answered from memory or the backing store."""
+
+    disk_hits: int
+    """Lookups answered from the backing store after missing in memory."""
+
+    misses: int
+    """Lookups that had to evaluate."""
+
+    evictions: int
+    """Results dropped from memory to stay within `max_entries`."""
+
+    invalidations: int
+    """Calls to `invalidate()`, including those made by stateful evaluations."""
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+class EvalCache:
+    """A client-side cache of results from deterministic REPL evaluations.
+
+    Results are keyed by a hash of the code, a hash of the call arguments and
+    the cache's epoch. Bumping the epoch with `invalidate()` makes every
+    earlier result unreachable, which is how changes to sandbox state (files
+    written, globals set by stateful evaluations) are accounted for.
+
+    Results are kept as JSON, in memory up to `max_entries` with least
+    recently used eviction, and optionally in an SQLite file at `path` so
+    they survive across processes. Every lookup decodes a fresh copy, so
+    callers may mutate what they get back.
+
+    A backing store may be shared by caches for different sandboxes: each
+    cache only sees results and invalidations within its `scope`. Caches
+    given the same scope and path share results and their epoch.
+    """
+
+    MISSING: Any = object()
+    """A default for `get()` that no stored result can be equal to."""
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 1024,
+        path: Optional[Union[str, os.PathLike[str]]] = None,
+        scope: Optional[str] = None,
+    ):
+        """Create a cache.
+
+        Args:
+            max_entries: The number of results to keep in memory.
+            path: An SQLite file to also store results in. Default: memory only.
+            scope: Identifies the sandbox or REPL state the results belong to, such as a sandbox id. Default: unique to this cache.
+        """
+        if max_entries < 0:
+            raise ValueError("max_entries must not be negative")
+        self.max_entries = max_entries
+        """The number of results to keep in memory. Can be changed at any time."""
+
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._epoch = 0
+        self._scope = scope if scope is not None else uuid.uuid4().hex
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            self._db = sqlite3.connect(os.fspath(path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results (scope TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (scope, key))"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS epochs (scope TEXT PRIMARY KEY, epoch INTEGER NOT NULL)"
+            )
+            self._db.commit()
+            self._sync_epoch()
+        self._stats = EvalCacheStats(
+            entries=0,
+            epoch=0,
+            hits=0,
+            disk_hits=0,
+            misses=0,
+            evictions=0,
+            invalidations=0,
+        )
+
+    @property
+    def epoch(self) -> int:
+        with self._lock:
+            self._sync_epoch()
+            return self._epoch
+
+    @property
+    def scope(self) -> str:
+        return self._scope
+
+    def key(self, code: str, args: Any = None) -> str:
+        """Return the cache key for evaluating `code` with `args` in the current epoch.
+
+        Args:
+            code: The evaluated code, or the called function.
+            args: JSON-serializable call arguments, or None for an evaluation.
+        """
+        args_json = json.dumps(args, sort_keys=True, separators=(",", ":"))
+        return f"{self.epoch}:{_digest(code)}:{_digest(args_json)}"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the result stored under `key`, or `default`."""
+        with self._lock:
+            self._sync_epoch()
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute(
+                    "SELECT value FROM results WHERE scope = ? AND key = ?",
+                    (self._scope, key),
+                ).fetchone()
+                if row is not None:
+                    value = row[0]
+                    self._stats["disk_hits"] += 1
+                    self._remember(key, value)
+
+            if value is None:
+                self._stats["misses"] += 1
+                return default
+            self._stats["hits"] += 1
+        return json.loads(value)
+
+    def put(self, key: str, result: Any) -> None:
+        """Store a JSON-serializable result under `key`."""
+        value = json.dumps(result)
+        with self._lock:
+            self._sync_epoch()
+            if not key.startswith(f"{self._epoch}:"):
+                # Invalidated while the result was being computed
+                return
+            self._remember(key, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (scope, key, value) VALUES (?, ?, ?)",
+                    (self._scope, key, value),
+                )
+                self._db.commit()
+
+    def invalidate(self) -> None:
+        """Start a new epoch, discarding every result stored in this cache's scope."""
+        with self._lock:
+            self._sync_epoch()
+            self._epoch += 1
+            self._entries.clear()
+            self._stats["invalidations"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO epochs (scope, epoch) VALUES (?, ?)",
+                    (self._scope, self._epoch),
+                )
+                self._db.execute("DELETE FROM results WHERE scope = ?", (self._scope,))
+                self._db.commit()
+
+    def stats(self) -> EvalCacheStats:
+        with self._lock:
+            self._sync_epoch()
+            stats = EvalCacheStats(**self._stats)
+            stats["entries"] = len(self._entries)
+            stats["epoch"] = self._epoch
+        return stats
+
+    def close(self) -> None:
+        """Close the backing store, keeping only the in-memory results."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _sync_epoch(self) -> None:
+        """Adopt an epoch started by another cache sharing the backing store."""
+        if self._db is None:
+            return
+        row = self._db.execute(
+            "SELECT epoch FROM epochs WHERE scope = ?", (self._scope,)
+        ).fetchone()
+        epoch = row[0] if row is not None else 0
+        if epoch > self._epoch:
+            self._epoch = epoch
+            self._entries.clear()
+
+    def _remember(self, key: str, value: str) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
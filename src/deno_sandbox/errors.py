@@ -25,6 +25,18 @@ class ProcessAlreadyExited(Exception):
     pass
 
 
+class IntegrityError(Exception):
+    """Raised when a file in the sandbox does not match the data that was written."""
+
+    def __init__(self, path: str, expected: str, actual: str) -> None:
+        self.path = path
+        self.expected = expected
+        self.actual = actual
+        super().__init__(
+            f"Checksum mismatch for {path}: expected {expected}, got {actual}"
+        )
+
+
 class HTTPStatusError(Exception):
     """Raised when an HTTP request returns a non-success status code."""
 
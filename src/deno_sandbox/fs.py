@@ -1,25 +1,57 @@
 from __future__ import annotations
 
+import asyncio
 import base64
+import binascii
+import hashlib
+import json
 import os
+import posixpath
+from collections import deque
+from contextlib import AbstractAsyncContextManager, aclosing
 from typing import (
     TYPE_CHECKING,
     Any,
     AsyncIterable,
+    AsyncIterator,
+    Awaitable,
     BinaryIO,
+    Callable,
     Iterable,
+    Iterator,
     Literal,
     Optional,
     TypedDict,
     Union,
     cast,
+    overload,
 )
 
 from re import Pattern
 
-from .process import AbortSignal
-from .stream import complete_stream, start_stream
-from .utils import convert_to_camel_case, convert_to_snake_case
+from .errors import IntegrityError
+from .process import AbortSignal, AsyncChildProcess, RemoteProcessOptions
+from .stream import (
+    Compression,
+    StreamMetrics,
+    Streamable,
+    _is_regular_file,
+    add_metrics,
+    complete_stream,
+    compress_chunks,
+    decompress_chunks,
+    empty_metrics,
+    iter_chunks,
+    sample_compression,
+    start_stream,
+)
+from .utils import (
+    convert_to_camel_case,
+    convert_to_snake_case,
+    glob_to_regex,
+    is_glob,
+    split_glob,
+)
 
 if TYPE_CHECKING:
     from .rpc import AsyncRpcClient
@@ -126,6 +158,210 @@ class FsFileHandle(TypedDict):
     file_handle_id: int
 
 
+HashAlgorithm = Literal["md5", "sha1", "sha224", "sha256", "sha384", "sha512"]
+
+# Maximum number of paths passed to a single `<algorithm>sum` invocation
+_HASH_BATCH_SIZE = 512
+# Hashing processes running at once for one hash() call
+_HASH_CONCURRENCY = 4
+
+
+def _hashing(data: Streamable, hasher: Any) -> AsyncIterator[bytes]:
+    """Wrap a streamable so every chunk is fed to `hasher` as it is sent."""
+
+    async def _chunks():
+        async with aclosing(iter_chunks(data)) as chunks:
+            async for chunk in chunks:
+                hasher.update(chunk)
+                yield chunk
+
+    return _chunks()
+
+
+# Runs inside the sandbox. Decompresses stdin into the target file, honouring
+# the same options as writeFile.
+_DECOMPRESS_SCRIPT = """
+const [path, format, rawOptions] = Deno.args;
+const options = JSON.parse(rawOptions);
+const file = await Deno.open(path, {
+  write: true,
+  create: options.create ?? true,
+  append: options.append ?? false,
+  truncate: !options.append,
+  createNew: options.createNew ?? false,
+  mode: options.mode,
+});
+await Deno.stdin.readable
+  .pipeThrough(new DecompressionStream(format))
+  .pipeTo(file.writable);
+"""
+
+# Runs inside the sandbox. Streams the compressed file to stdout.
+_COMPRESS_SCRIPT = """
+const [path, format] = Deno.args;
+const file = await Deno.open(path);
+await file.readable
+  .pipeThrough(new CompressionStream(format))
+  .pipeTo(Deno.stdout.writable);
+"""
+
+
+# Runs inside the sandbox. Writes stdin into an existing file at an offset.
+_RANGE_WRITE_SCRIPT = """
+const [path, offset] = Deno.args;
+const file = await Deno.open(path, { write: true });
+await file.seek(Number(offset), Deno.SeekMode.Start);
+await Deno.stdin.readable.pipeTo(file.writable);
+"""
+
+# Runs inside the sandbox. Streams `length` bytes from an offset to stdout.
+_RANGE_READ_SCRIPT = """
+const [path, offset, length] = Deno.args;
+const file = await Deno.open(path);
+await file.seek(Number(offset), Deno.SeekMode.Start);
+const writer = Deno.stdout.writable.getWriter();
+const buf = new Uint8Array(256 * 1024);
+let remaining = Number(length);
+while (remaining > 0) {
+  const n = await file.read(buf.subarray(0, Math.min(buf.length, remaining)));
+  if (n === null) break;
+  await writer.write(buf.slice(0, n));
+  remaining -= n;
+}
+await writer.close();
+file.close();
+"""
+
+# Striping only pays off once each connection has a few MiB to move
+_STRIPE_MIN_SIZE = 16 * 1024 * 1024
+_STRIPE_MIN_RANGE = 4 * 1024 * 1024
+_RANGE_CHUNK_SIZE = 256 * 1024
+
+ConnectFs = Callable[[], AbstractAsyncContextManager["AsyncSandboxFs"]]
+
+
+def _plan_stripes(size: int, connections: int) -> list[tuple[int, int]]:
+    """Split `size` bytes into (offset, length) ranges, one per connection.
+
+    Returns an empty list when the transfer is too small to be worth striping.
+    """
+    count = min(connections, size // _STRIPE_MIN_RANGE)
+    if size < _STRIPE_MIN_SIZE or count < 2:
+        return []
+
+    step = -(-size // count)
+    return [(offset, min(step, size - offset)) for offset in range(0, size, step)]
+
+
+def _striped_size(data: Any) -> Optional[int]:
+    """The number of bytes left in `data` if it supports reading arbitrary ranges."""
+    if isinstance(data, bytes):
+        return len(data)
+    if _is_regular_file(data):
+        return os.fstat(data.fileno()).st_size - data.tell()
+    return None
+
+
+async def _range_chunks(
+    data: Union[bytes, BinaryIO], offset: int, length: int
+) -> AsyncIterator[Union[bytes, memoryview]]:
+    """Yield `length` bytes of `data` starting at `offset`, without moving a file's position."""
+    end = offset + length
+    if isinstance(data, bytes):
+        view = memoryview(data)
+        for start in range(offset, end, _RANGE_CHUNK_SIZE):
+            yield view[start : min(start + _RANGE_CHUNK_SIZE, end)]
+        return
+
+    fd = data.fileno()
+    while offset < end:
+        size = min(_RANGE_CHUNK_SIZE, end - offset)
+        chunk = await asyncio.to_thread(os.pread, fd, size, offset)
+        if not chunk:
+            raise Exception("Source file was truncated during upload")
+        offset += len(chunk)
+        yield chunk
+
+
+def _sha256_range(data: Union[bytes, BinaryIO], offset: int, length: int) -> str:
+    if isinstance(data, bytes):
+        return hashlib.sha256(data).hexdigest()
+
+    hasher = hashlib.sha256()
+    fd = data.fileno()
+    end = offset + length
+    while offset < end:
+        chunk = os.pread(fd, min(1024 * 1024, end - offset), offset)
+        if not chunk:
+            break
+        hasher.update(chunk)
+        offset += len(chunk)
+    return hasher.hexdigest()
+
+
+async def _run_stripes(stripes: list[Awaitable[None]]) -> None:
+    """Run all stripes concurrently, cancelling the rest as soon as one fails."""
+    tasks = [asyncio.ensure_future(stripe) for stripe in stripes]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+class FsEvent(TypedDict):
+    kind: Literal["any", "access", "create", "modify", "rename", "remove", "other"]
+    """The kind of change. Repeated changes to a path within the debounce window are merged."""
+
+    path: str
+    """The path that changed."""
+
+
+# Runs inside the sandbox. Events are coalesced per path until no new event
+# has arrived for the debounce interval, then written to stdout as NDJSON.
+_WATCH_SCRIPT = """
+const [paths, recursive, debounceMs] = Deno.args;
+const watcher = Deno.watchFs(JSON.parse(paths), { recursive: recursive === "true" });
+console.log(JSON.stringify({ ready: true }));
+
+const pending = new Map();
+let timer;
+const flush = () => {
+  if (pending.size === 0) return;
+  const lines = [];
+  for (const [path, kind] of pending) lines.push(JSON.stringify({ kind, path }));
+  pending.clear();
+  console.log(lines.join("\\n"));
+};
+
+for await (const event of watcher) {
+  for (const path of event.paths) {
+    const previous = pending.get(path);
+    pending.set(path, previous === "create" && event.kind === "modify" ? previous : event.kind);
+  }
+  clearTimeout(timer);
+  timer = setTimeout(flush, Number(debounceMs));
+}
+"""
+
+
+def _walk_include(
+    path: str,
+    exts: Optional[list[str]],
+    match: Optional[list[Pattern]],
+    skip: Optional[list[Pattern]],
+) -> bool:
+    if exts is not None and not any(path.endswith(ext) for ext in exts):
+        return False
+    if match is not None and not any(p.search(path) for p in match):
+        return False
+    if skip is not None and any(p.search(path) for p in skip):
+        return False
+    return True
+
+
 class AsyncFsFile:
     def __init__(self, rpc: AsyncRpcClient, fd: int):
         self._rpc = rpc
@@ -266,24 +502,102 @@ class FsFile:
         self.close()
 
 
+class AsyncFsWatcher:
+    """An async iterator of filesystem events, backed by a watcher process in the sandbox."""
+
+    def __init__(self, process: AsyncChildProcess):
+        self._process = process
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> FsEvent:
+        while True:
+            line = await self._process.stdout.readline()
+            if not line:
+                raise StopAsyncIteration
+            if line.strip():
+                return cast(FsEvent, json.loads(line))
+
+    async def close(self) -> None:
+        """Stop watching and kill the watcher process."""
+
+        await self._process.kill()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class FsWatcher:
+    def __init__(self, bridge: AsyncBridge, async_watcher: AsyncFsWatcher):
+        self._bridge = bridge
+        self._async = async_watcher
+
+    def __iter__(self) -> Iterator[FsEvent]:
+        async def _events():
+            async for event in self._async:
+                yield event
+
+        return self._bridge.iterate(_events())
+
+    def close(self) -> None:
+        """Stop watching and kill the watcher process."""
+        self._bridge.run(self._async.close())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
 class AsyncSandboxFs:
     """Filesystem operations inside the sandbox."""
 
-    def __init__(self, rpc: AsyncRpcClient):
+    def __init__(
+        self,
+        rpc: AsyncRpcClient,
+        connect: Optional[ConnectFs] = None,
+        processes: Optional[dict[int, AsyncChildProcess]] = None,
+    ):
         self._rpc = rpc
+        self._connect = connect
+        # Helper processes are registered with the sandbox so close() kills them
+        self._processes = processes if processes is not None else {}
 
     async def read_file(
         self,
         path: str,
         *,
         signal: Optional[AbortSignal] = None,
+        compression: Optional[Compression] = None,
+        parallel_connections: Optional[int] = None,
     ) -> bytes:
         """Reads the entire contents of a file as bytes.
 
         Args:
             path: The path to the file to read.
             signal: An optional abort signal to cancel the operation.
+            compression: Compress the file inside the sandbox and decompress it locally as it streams in. Default: no compression.
+            parallel_connections: Open this many additional connections to the sandbox and read the file as that many ranges in parallel. Files under 16 MiB are read over the main connection. Default: one connection.
         """
+        if parallel_connections is not None:
+            if compression is not None:
+                raise ValueError(
+                    "parallel_connections cannot be combined with compression"
+                )
+            if self._connect is not None:
+                size = (await self.stat(path))["size"]
+                stripes = _plan_stripes(size, parallel_connections)
+                if stripes:
+                    return await self._read_striped(path, size, stripes)
+
+        if compression is not None:
+            return await self._read_compressed(path, compression, signal)
+
         params: dict[str, Any] = {"path": path}
         options: dict[str, Any] = {}
         if signal is not None:
@@ -294,7 +608,73 @@ class AsyncSandboxFs:
         result = await self._rpc.call("readFile", params)
 
         # Server returns base64-encoded data
-        return base64.b64decode(result)
+        return binascii.a2b_base64(result)
+
+    async def _read_compressed(
+        self, path: str, compression: Compression, signal: Optional[AbortSignal]
+    ) -> bytes:
+        params: dict[str, Any] = {
+            "code": _COMPRESS_SCRIPT,
+            "extension": "ts",
+            "script_args": [path, compression],
+        }
+        if signal is not None:
+            params["signal"] = signal
+        process = await self._spawn_helper("spawnDeno", params)
+
+        async def _compressed() -> AsyncIterator[bytes]:
+            while chunk := await process.stdout.read(64 * 1024):
+                yield chunk
+
+        content = bytearray()
+        async for chunk in decompress_chunks(_compressed(), compression):
+            content += chunk
+
+        stderr = await process.stderr.read()
+        status = await process.wait()
+        if not status["success"]:
+            raise Exception(f"Failed to read {path}: {stderr.decode().strip()}")
+
+        return bytes(content)
+
+    async def _read_striped(
+        self, path: str, size: int, stripes: list[tuple[int, int]]
+    ) -> bytes:
+        assert self._connect is not None
+        content = bytearray(size)
+        view = memoryview(content)
+
+        async def _read(offset: int, length: int) -> None:
+            assert self._connect is not None
+            async with self._connect() as fs:
+                await fs._read_range(path, offset, view[offset : offset + length])
+
+        await _run_stripes([_read(offset, length) for offset, length in stripes])
+        view.release()
+        return bytes(content)
+
+    async def _read_range(self, path: str, offset: int, into: memoryview) -> None:
+        """Read len(into) bytes of the file at `offset` into the buffer."""
+        process = await self._spawn_helper(
+            "spawnDeno",
+            {
+                "code": _RANGE_READ_SCRIPT,
+                "extension": "ts",
+                "script_args": [path, str(offset), str(len(into))],
+            },
+        )
+
+        position = 0
+        while chunk := await process.stdout.read(_RANGE_CHUNK_SIZE):
+            into[position : position + len(chunk)] = chunk
+            position += len(chunk)
+
+        stderr = await process.stderr.read()
+        status = await process.wait()
+        if not status["success"]:
+            raise Exception(f"Failed to read {path}: {stderr.decode().strip()}")
+        if position != len(into):
+            raise Exception(f"Failed to read {path}: file changed during read")
 
     async def write_file(
         self,
@@ -305,6 +685,12 @@ class AsyncSandboxFs:
         append: Optional[bool] = None,
         create_new: Optional[bool] = None,
         mode: Optional[int] = None,
+        verify: Optional[bool] = None,
+        compression: Optional[Literal["gzip", "deflate", "auto"]] = None,
+        parallel_connections: Optional[int] = None,
+        use_mmap: Optional[bool] = None,
+        adaptive: Optional[bool] = None,
+        metrics: Optional[StreamMetrics] = None,
     ) -> None:
         """Write bytes to file. Accepts bytes, async/sync iterables, or file objects.
 
@@ -315,15 +701,50 @@ class AsyncSandboxFs:
             append: Append content instead of overwriting existing contents.
             create_new: Fail if the file already exists.
             mode: Set the file permission mode.
+            verify: Hash the data while it is sent and compare it against a SHA-256 computed inside the sandbox. Raises IntegrityError on mismatch. Default: false.
+            compression: Compress the data on the way to the sandbox, where it is decompressed before being written. 'auto' uses gzip unless a sample of the data shows it is already compressed. Default: no compression.
+            parallel_connections: Open this many additional connections to the sandbox and write the data as that many ranges in parallel. Only bytes and regular files of at least 16 MiB are striped; anything else is written over the main connection. Default: one connection.
+            use_mmap: Memory-map regular files and send slices of the mapping instead of reading chunks into memory. Applies without compression or verify. Default: false.
+            adaptive: Tune the chunk size to the connection's throughput while sending, see AdaptiveChunkSize. Default: false.
+            metrics: Metrics to add this transfer's to, e.g. from `empty_metrics()`. With compression, `bytes` counts compressed bytes.
         """
+        if verify and append:
+            raise ValueError("verify cannot be combined with append")
+
+        if parallel_connections is not None:
+            if compression is not None or append:
+                raise ValueError(
+                    "parallel_connections cannot be combined with compression or append"
+                )
+            size = _striped_size(data)
+            if self._connect is not None and size is not None:
+                stripes = _plan_stripes(size, parallel_connections)
+                if stripes:
+                    transfer = await self._write_striped(
+                        path,
+                        cast(Union[bytes, BinaryIO], data),
+                        size,
+                        stripes,
+                        create=create,
+                        create_new=create_new,
+                        mode=mode,
+                        verify=verify,
+                        adaptive=bool(adaptive),
+                    )
+                    if metrics is not None:
+                        add_metrics(metrics, transfer)
+                    return
+
         if isinstance(data, bytes):
-            streamable = iter([data])
+            streamable: Streamable = iter([data])
         else:
             streamable = data
 
-        stream_id, writer = await start_stream(self._rpc)
+        hasher = None
+        if verify:
+            hasher = hashlib.sha256()
+            streamable = _hashing(streamable, hasher)
 
-        params: dict[str, Any] = {"path": path, "contentStreamId": stream_id}
         options: dict[str, Any] = {}
         if create is not None:
             options["create"] = create
@@ -333,22 +754,197 @@ class AsyncSandboxFs:
             options["create_new"] = create_new
         if mode is not None:
             options["mode"] = mode
+
+        chosen: Optional[Compression] = None
+        if compression == "auto":
+            chosen, streamable = await sample_compression(
+                iter_chunks(streamable), "gzip"
+            )
+        elif compression is not None:
+            chosen = compression
+
+        if chosen is not None:
+            transfer = await self._write_compressed(
+                path, streamable, chosen, options, adaptive=bool(adaptive)
+            )
+        else:
+            transfer = await self._write_stream(
+                path,
+                streamable,
+                options,
+                use_mmap=bool(use_mmap),
+                adaptive=bool(adaptive),
+            )
+
+        if hasher is not None:
+            expected = hasher.hexdigest()
+            actual = await self.hash(path)
+            if actual != expected:
+                raise IntegrityError(path, expected, actual)
+
+        if metrics is not None:
+            add_metrics(metrics, transfer)
+
+    async def _write_stream(
+        self,
+        path: str,
+        streamable: Streamable,
+        options: dict[str, Any],
+        *,
+        use_mmap: bool = False,
+        adaptive: bool = True,
+    ) -> StreamMetrics:
+        stream_id, writer = await start_stream(self._rpc)
+
+        params: dict[str, Any] = {"path": path, "contentStreamId": stream_id}
         if options:
             params["options"] = convert_to_camel_case(options)
 
         # Send data concurrently with the RPC call to avoid deadlock:
         # the server waits for stream data before responding to writeFile.
-        async def _send() -> None:
+        async def _send() -> StreamMetrics:
             try:
-                await complete_stream(writer, streamable)
+                return await complete_stream(
+                    writer, streamable, use_mmap=use_mmap, adaptive=adaptive
+                )
             except Exception as e:
                 await writer.error(str(e))
+                return empty_metrics()
 
         task = self._rpc._loop.create_task(_send())
         try:
             await self._rpc.call("writeFile", params)
         finally:
-            await task
+            metrics = await task
+        return metrics
+
+    async def _write_striped(
+        self,
+        path: str,
+        data: Union[bytes, BinaryIO],
+        size: int,
+        stripes: list[tuple[int, int]],
+        *,
+        create: Optional[bool],
+        create_new: Optional[bool],
+        mode: Optional[int],
+        verify: Optional[bool],
+        adaptive: bool,
+    ) -> StreamMetrics:
+        start = 0 if isinstance(data, bytes) else data.tell()
+
+        # Create and size the file up front so every range is written in place
+        file = await self.open(
+            path,
+            write=True,
+            truncate=True,
+            create=create if create is not None else True,
+            create_new=create_new,
+            mode=mode,
+        )
+        try:
+            await file.truncate(size)
+        finally:
+            await file.close()
+
+        metrics = empty_metrics()
+
+        async def _write(offset: int, length: int) -> None:
+            assert self._connect is not None
+            chunks = _range_chunks(data, start + offset, length)
+            async with self._connect() as fs:
+                add_metrics(
+                    metrics,
+                    await fs._write_range(path, offset, chunks, adaptive=adaptive),
+                )
+
+        await _run_stripes([_write(offset, length) for offset, length in stripes])
+
+        if not isinstance(data, bytes):
+            data.seek(start + size)
+
+        if verify:
+            expected = await asyncio.to_thread(_sha256_range, data, start, size)
+            actual = await self.hash(path)
+            if actual != expected:
+                raise IntegrityError(path, expected, actual)
+
+        return metrics
+
+    async def _write_range(
+        self,
+        path: str,
+        offset: int,
+        chunks: AsyncIterable[Union[bytes, memoryview]],
+        *,
+        adaptive: bool = True,
+    ) -> StreamMetrics:
+        """Write the chunks into an existing file, starting at `offset`."""
+        stream_id, writer = await start_stream(self._rpc)
+        process = await self._spawn_helper(
+            "spawnDeno",
+            {
+                "code": _RANGE_WRITE_SCRIPT,
+                "extension": "ts",
+                "script_args": [path, str(offset)],
+                "stdin": "piped",
+                "stdinStreamId": stream_id,
+            },
+        )
+
+        try:
+            metrics = await complete_stream(
+                writer, cast(AsyncIterable[bytes], chunks), adaptive=adaptive
+            )
+        except BaseException as e:
+            await writer.error(str(e))
+            await process.kill()
+            raise
+
+        stderr = await process.stderr.read()
+        status = await process.wait()
+        if not status["success"]:
+            raise Exception(f"Failed to write {path}: {stderr.decode().strip()}")
+        return metrics
+
+    async def _write_compressed(
+        self,
+        path: str,
+        streamable: Streamable,
+        compression: Compression,
+        options: dict[str, Any],
+        *,
+        adaptive: bool = True,
+    ) -> StreamMetrics:
+        stream_id, writer = await start_stream(self._rpc)
+        process = await self._spawn_helper(
+            "spawnDeno",
+            {
+                "code": _DECOMPRESS_SCRIPT,
+                "extension": "ts",
+                "script_args": [
+                    path,
+                    compression,
+                    json.dumps(convert_to_camel_case(options)),
+                ],
+                "stdin": "piped",
+                "stdinStreamId": stream_id,
+            },
+        )
+
+        try:
+            compressed = compress_chunks(iter_chunks(streamable), compression)
+            metrics = await complete_stream(writer, compressed, adaptive=adaptive)
+        except BaseException as e:
+            await writer.error(str(e))
+            await process.kill()
+            raise
+
+        stderr = await process.stderr.read()
+        status = await process.wait()
+        if not status["success"]:
+            raise Exception(f"Failed to write {path}: {stderr.decode().strip()}")
+        return metrics
 
     async def read_text_file(
         self,
@@ -552,6 +1148,116 @@ class AsyncSandboxFs:
 
         return result
 
+    async def iter_walk(
+        self,
+        path: str,
+        *,
+        max_depth: Optional[int] = None,
+        include_files: Optional[bool] = None,
+        include_dirs: Optional[bool] = None,
+        include_symlinks: Optional[bool] = None,
+        exts: Optional[list[str]] = None,
+        match: Optional[list[Pattern]] = None,
+        skip: Optional[list[Pattern]] = None,
+        concurrency: int = 8,
+    ) -> AsyncIterator[WalkEntry]:
+        """Recursively walk a directory tree, yielding entries as they are discovered.
+
+        Unlike `walk`, the tree is listed breadth-first with one `read_dir` call per
+        directory, so the first entries arrive before the whole tree has been read
+        and memory stays bounded by the directories in flight. Entries are yielded
+        in the order directory listings complete. Breaking out of the loop stops
+        any further directory listings. Symbolic links are never followed. If
+        `path` is a file, it is the only entry.
+
+        Args:
+            path: The path to the directory to walk.
+            max_depth: The maximum depth to traverse. Default: Infinity.
+            include_files: Whether to include files in the results. Default: true.
+            include_dirs: Whether to include directories in the results. Default: true.
+            include_symlinks: Whether to include symbolic links in the results. Default: true.
+            exts: If provided, only files with the specified extensions will be included. Example: ['.ts', '.js']
+            match: List of regular expression patterns used to filter entries. If specified, entries that do not match the patterns specified by this option are excluded.
+            skip: List of regular expression patterns used to filter entries. If specified, entries that match the patterns specified by this option are excluded.
+            concurrency: The maximum number of directories listed at the same time. Default: 8.
+        """
+        depth_limit = max_depth if max_depth is not None else float("inf")
+        files = include_files if include_files is not None else True
+        dirs = include_dirs if include_dirs is not None else True
+        symlinks = include_symlinks if include_symlinks is not None else True
+
+        if depth_limit < 0:
+            return
+
+        root = posixpath.normpath(path)
+        queue: deque[tuple[str, int]] = deque()
+        if depth_limit >= 1 and _walk_include(root, None, None, skip):
+            queue.append((root, 0))
+
+        pending: dict[asyncio.Task[list[DirEntry]], tuple[str, int]] = {}
+        try:
+            # Start listing the root before statting it so both round trips overlap
+            while queue and len(pending) < concurrency:
+                dir_path, depth = queue.popleft()
+                task = self._rpc._loop.create_task(self.read_dir(dir_path))
+                pending[task] = (dir_path, depth)
+
+            info = await self.stat(root)
+            if not info["is_directory"]:
+                # A file root is the only entry, as with `walk`
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                pending.clear()
+                include = symlinks if info["is_symlink"] else files
+            else:
+                include = dirs
+            if include and _walk_include(root, exts, match, skip):
+                yield WalkEntry(
+                    path=root,
+                    name=posixpath.basename(root),
+                    is_file=info["is_file"],
+                    is_directory=info["is_directory"],
+                    is_symlink=info["is_symlink"],
+                )
+
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    dir_path, depth = pending.pop(task)
+                    for entry in task.result():
+                        entry_path = posixpath.join(dir_path, entry["name"])
+                        if entry["is_symlink"]:
+                            include = symlinks
+                        elif entry["is_directory"]:
+                            include = dirs
+                            if depth + 1 < depth_limit and _walk_include(
+                                entry_path, None, None, skip
+                            ):
+                                queue.append((entry_path, depth + 1))
+                        else:
+                            include = files
+
+                        if include and _walk_include(entry_path, exts, match, skip):
+                            yield WalkEntry(
+                                path=entry_path,
+                                name=entry["name"],
+                                is_file=entry["is_file"],
+                                is_directory=entry["is_directory"],
+                                is_symlink=entry["is_symlink"],
+                            )
+
+                while queue and len(pending) < concurrency:
+                    dir_path, depth = queue.popleft()
+                    task = self._rpc._loop.create_task(self.read_dir(dir_path))
+                    pending[task] = (dir_path, depth)
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
     async def expand_glob(
         self,
         glob: str,
@@ -603,6 +1309,86 @@ class AsyncSandboxFs:
 
         return result
 
+    async def iter_glob(
+        self,
+        glob: str,
+        *,
+        root: Optional[str] = None,
+        exclude: Optional[list[str]] = None,
+        include_dirs: Optional[bool] = None,
+        extended: Optional[bool] = None,
+        globstar: Optional[bool] = None,
+        case_insensitive: Optional[bool] = None,
+        concurrency: int = 8,
+    ) -> AsyncIterator[str]:
+        """Expand a glob pattern, yielding absolute paths as they are discovered.
+
+        The pattern is matched locally while walking the sandbox filesystem with
+        `iter_walk`, starting from the longest directory prefix that contains no
+        glob syntax. Excluded directories are not descended into. Symbolic links
+        are never followed.
+
+        Args:
+            glob: The glob pattern to expand.
+            root: The root directory from which to expand the glob pattern. Default is the current working directory.
+            exclude: An array of glob patterns to exclude from the results.
+            include_dirs: Whether to include directories in the results. Default: true.
+            extended: Whether to enable extended glob syntax, see https://www.linuxjournal.com/content/bash-extended-globbing. Default: true.
+            globstar: Globstar syntax. See https://www.linuxjournal.com/content/globstar-new-bash-globbing-option. If false, `**` is treated like `*`. Default: true.
+            case_insensitive: Whether the glob matching should be case insensitive. Default: false.
+            concurrency: The maximum number of directories listed at the same time. Default: 8.
+        """
+        options = {
+            "extended": extended if extended is not None else True,
+            "globstar": globstar if globstar is not None else True,
+            "case_insensitive": (
+                case_insensitive if case_insensitive is not None else False
+            ),
+        }
+        dirs = include_dirs if include_dirs is not None else True
+
+        root_path = await self.real_path(root if root is not None else ".")
+        segments = split_glob(posixpath.join(root_path, glob), "/")
+
+        fixed: list[str] = []
+        for segment in segments:
+            if is_glob(segment):
+                break
+            fixed.append(segment)
+        rest = segments[len(fixed) :]
+        base = posixpath.normpath("/".join(fixed) or "/")
+
+        try:
+            info = await self.lstat(base)
+        except Exception:
+            # Nothing to expand if the base directory does not exist
+            return
+
+        if not rest:
+            if dirs or not info["is_directory"]:
+                yield base
+            return
+
+        pattern = glob_to_regex(posixpath.join(base, *rest), **options)
+        skip = [
+            glob_to_regex(posixpath.join(root_path, e), **options)
+            for e in exclude or []
+        ]
+        unbounded = options["globstar"] and "**" in rest
+
+        async with aclosing(
+            self.iter_walk(
+                base,
+                max_depth=None if unbounded else len(rest),
+                include_dirs=dirs,
+                skip=skip or None,
+                concurrency=concurrency,
+            )
+        ) as entries:
+            async for entry in entries:
+                if pattern.match(entry["path"]):
+                    yield entry["path"]
+
     async def link(self, target: str, path: str) -> None:
         """Create a hard link pointing to an existing file."""
 
@@ -735,15 +1521,166 @@ class AsyncSandboxFs:
         params = {"path": path, "atime": atime, "mtime": mtime}
         await self._rpc.call("utime", params)
 
-    async def upload(self, local_path: str, sandbox_path: str) -> None:
+    @overload
+    async def hash(self, paths: str, *, algorithm: HashAlgorithm = ...) -> str: ...
+
+    @overload
+    async def hash(
+        self, paths: list[str], *, algorithm: HashAlgorithm = ...
+    ) -> dict[str, str]: ...
+
+    async def hash(
+        self, paths: Union[str, list[str]], *, algorithm: HashAlgorithm = "sha256"
+    ) -> Union[str, dict[str, str]]:
+        """Compute hex digests of files inside the sandbox, without downloading them.
+
+        Files are hashed by the sandbox's coreutils (`sha256sum` and friends), in one
+        process per batch of paths, with at most four processes running at once.
+
+        Args:
+            paths: A path, or a list of paths to hash in a single batch.
+            algorithm: The hash algorithm to use. Default: 'sha256'.
+
+        Returns:
+            The digest for a single path, or a mapping of path to digest.
+        """
+        if isinstance(paths, str):
+            digests = await self._hash_batch([paths], algorithm)
+            return digests[0]
+
+        batches = [
+            paths[i : i + _HASH_BATCH_SIZE]
+            for i in range(0, len(paths), _HASH_BATCH_SIZE)
+        ]
+        limit = asyncio.Semaphore(_HASH_CONCURRENCY)
+
+        async def _hash(batch: list[str]) -> list[str]:
+            async with limit:
+                return await self._hash_batch(batch, algorithm)
+
+        results = await asyncio.gather(*(_hash(batch) for batch in batches))
+        return {
+            path: digest
+            for batch, digests in zip(batches, results)
+            for path, digest in zip(batch, digests)
+        }
+
+    async def _hash_batch(
+        self, paths: list[str], algorithm: HashAlgorithm
+    ) -> list[str]:
+        process = await self._spawn_helper(
+            "spawn",
+            {
+                "command": f"{algorithm}sum",
+                # --zero ends records with NUL and disables escaping of odd filenames
+                "args": ["--zero", "--", *paths],
+            },
+        )
+        stdout, stderr = await asyncio.gather(
+            process.stdout.read(), process.stderr.read()
+        )
+        status = await process.wait()
+        if not status["success"]:
+            raise Exception(f"Failed to hash files: {stderr.decode().strip()}")
+
+        # Each record is "<digest>  <path>"; records come back in argument order
+        records = stdout.split(b"\0")[: len(paths)]
+        return [record.split(b" ", 1)[0].decode("ascii") for record in records]
+
+    async def watch(
+        self,
+        paths: Union[str, list[str]],
+        *,
+        recursive: Optional[bool] = None,
+        debounce_ms: Optional[int] = None,
+    ) -> AsyncFsWatcher:
+        """Watch files or directories for changes.
+
+        Changes are reported by a `Deno.watchFs` process running in the sandbox, so
+        no polling traffic is generated. Events are returned once the watcher is
+        ready; changes made before that are not reported.
+
+        Args:
+            paths: The path or paths to watch.
+            recursive: Whether to watch directories recursively. Default: true.
+            debounce_ms: How long a path has to stay unchanged before its event is emitted. Default: 50.
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+
+        process = await self._spawn_helper(
+            "spawnDeno",
+            {
+                "code": _WATCH_SCRIPT,
+                "extension": "ts",
+                "script_args": [
+                    json.dumps(paths),
+                    "false" if recursive is False else "true",
+                    str(debounce_ms if debounce_ms is not None else 50),
+                ],
+            },
+        )
+
+        # The script prints a marker line once Deno.watchFs is set up
+        if not await process.stdout.readline():
+            stderr = await process.stderr.read()
+            await process.kill()
+            raise Exception(f"Failed to watch {paths}: {stderr.decode().strip()}")
+
+        return AsyncFsWatcher(process)
+
+    async def _spawn_helper(
+        self, method: Literal["spawn", "spawnDeno"], params: dict[str, Any]
+    ) -> AsyncChildProcess:
+        """Spawn a short-lived helper process with piped output."""
+
+        result = await self._rpc.call(
+            method, {**params, "stdout": "piped", "stderr": "piped"}
+        )
+        opts = RemoteProcessOptions(stdout_inherit=False, stderr_inherit=False)
+        process = await AsyncChildProcess.create(
+            result, self._rpc, opts, self._processes
+        )
+        self._processes[process.pid] = process
+        return process
+
+    async def upload(
+        self,
+        local_path: str,
+        sandbox_path: str,
+        *,
+        verify: Optional[bool] = None,
+        compression: Optional[Literal["gzip", "deflate", "auto"]] = None,
+        parallel_connections: Optional[int] = None,
+        use_mmap: Optional[bool] = None,
+        adaptive: Optional[bool] = None,
+        metrics: Optional[StreamMetrics] = None,
+    ) -> None:
         """Upload a file, directory, or symlink from local filesystem to the sandbox.
 
         Recursively uploads directories and their contents.
         Preserves symlinks by creating corresponding symlinks in the sandbox.
+        `verify`, `compression`, `parallel_connections`, `use_mmap`,
+        `adaptive` and `metrics` are applied to every file, see `write_file`;
+        `metrics` collects the combined metrics of every file transfer.
         """
-        await self._upload_item(local_path, sandbox_path)
+        await self._upload_item(
+            local_path,
+            sandbox_path,
+            verify=verify,
+            compression=compression,
+            parallel_connections=parallel_connections,
+            use_mmap=use_mmap,
+            adaptive=adaptive,
+            metrics=metrics,
+        )
 
-    async def _upload_item(self, local_path: str, sandbox_path: str) -> None:
+    async def _upload_item(
+        self,
+        local_path: str,
+        sandbox_path: str,
+        **write_options: Any,
+    ) -> None:
         """Internal method to upload a single item (file, directory, or symlink)."""
         if os.path.islink(local_path):
             # It's a symlink - read the target and create a symlink in sandbox
@@ -755,11 +1692,13 @@ class AsyncSandboxFs:
             for entry in os.listdir(local_path):
                 entry_local_path = os.path.join(local_path, entry)
                 entry_sandbox_path = f"{sandbox_path}/{entry}"
-                await self._upload_item(entry_local_path, entry_sandbox_path)
+                await self._upload_item(
+                    entry_local_path, entry_sandbox_path, **write_options
+                )
         elif os.path.isfile(local_path):
             # It's a file - stream it to write_file
             with open(local_path, "rb") as f:
-                await self.write_file(sandbox_path, f)
+                await self.write_file(sandbox_path, f, **write_options)
         else:
             raise FileNotFoundError(f"Local path does not exist: {local_path}")
 
@@ -834,24 +1773,41 @@ class AsyncSandboxFs:
 class SandboxFs:
     """Filesystem operations inside the sandbox."""
 
-    def __init__(self, rpc: AsyncRpcClient, bridge: AsyncBridge):
+    def __init__(
+        self,
+        rpc: AsyncRpcClient,
+        bridge: AsyncBridge,
+        connect: Optional[ConnectFs] = None,
+        processes: Optional[dict[int, AsyncChildProcess]] = None,
+    ):
         self._rpc = rpc
         self._bridge = bridge
-        self._async = AsyncSandboxFs(rpc)
+        self._async = AsyncSandboxFs(rpc, connect, processes)
 
     def read_file(
         self,
         path: str,
         *,
         signal: Optional[AbortSignal] = None,
+        compression: Optional[Compression] = None,
+        parallel_connections: Optional[int] = None,
     ) -> bytes:
         """Reads the entire contents of a file as bytes.
 
         Args:
             path: The path to the file to read.
             signal: An optional abort signal to cancel the operation.
+            compression: Compress the file inside the sandbox and decompress it locally as it streams in. Default: no compression.
+            parallel_connections: Open this many additional connections to the sandbox and read the file as that many ranges in parallel. Files under 16 MiB are read over the main connection. Default: one connection.
         """
-        return self._bridge.run(self._async.read_file(path, signal=signal))
+        return self._bridge.run(
+            self._async.read_file(
+                path,
+                signal=signal,
+                compression=compression,
+                parallel_connections=parallel_connections,
+            )
+        )
 
     def write_file(
         self,
@@ -862,6 +1818,12 @@ class SandboxFs:
         append: Optional[bool] = None,
         create_new: Optional[bool] = None,
         mode: Optional[int] = None,
+        verify: Optional[bool] = None,
+        compression: Optional[Literal["gzip", "deflate", "auto"]] = None,
+        parallel_connections: Optional[int] = None,
+        use_mmap: Optional[bool] = None,
+        adaptive: Optional[bool] = None,
+        metrics: Optional[StreamMetrics] = None,
     ) -> None:
         """Write bytes to file. Accepts bytes, sync iterables, or file objects.
 
@@ -872,8 +1834,14 @@ class SandboxFs:
             append: Append content instead of overwriting existing contents.
             create_new: Fail if the file already exists.
             mode: Set the file permission mode.
+            verify: Hash the data while it is sent and compare it against a SHA-256 computed inside the sandbox. Raises IntegrityError on mismatch. Default: false.
+            compression: Compress the data on the way to the sandbox, where it is decompressed before being written. 'auto' uses gzip unless a sample of the data shows it is already compressed. Default: no compression.
+            parallel_connections: Open this many additional connections to the sandbox and write the data as that many ranges in parallel. Only bytes and regular files of at least 16 MiB are striped; anything else is written over the main connection. Default: one connection.
+            use_mmap: Memory-map regular files and send slices of the mapping instead of reading chunks into memory. Applies without compression or verify. Default: false.
+            adaptive: Tune the chunk size to the connection's throughput while sending, see AdaptiveChunkSize. Default: false.
+            metrics: Metrics to add this transfer's to, e.g. from `empty_metrics()`. With compression, `bytes` counts compressed bytes.
         """
-        self._bridge.run(
+        return self._bridge.run(
             self._async.write_file(
                 path,
                 data,
@@ -881,6 +1849,12 @@ class SandboxFs:
                 append=append,
                 create_new=create_new,
                 mode=mode,
+                verify=verify,
+                compression=compression,
+                parallel_connections=parallel_connections,
+                use_mmap=use_mmap,
+                adaptive=adaptive,
+                metrics=metrics,
             )
         )
 
@@ -1028,6 +2002,46 @@ class SandboxFs:
             )
         )
 
+    def iter_walk(
+        self,
+        path: str,
+        *,
+        max_depth: Optional[int] = None,
+        include_files: Optional[bool] = None,
+        include_dirs: Optional[bool] = None,
+        include_symlinks: Optional[bool] = None,
+        exts: Optional[list[str]] = None,
+        match: Optional[list[Pattern]] = None,
+        skip: Optional[list[Pattern]] = None,
+        concurrency: int = 8,
+    ) -> Iterator[WalkEntry]:
+        """Recursively walk a directory tree, yielding entries as they are discovered.
+
+        Args:
+            path: The path to the directory to walk.
+            max_depth: The maximum depth to traverse. Default: Infinity.
+            include_files: Whether to include files in the results. Default: true.
+            include_dirs: Whether to include directories in the results. Default: true.
+            include_symlinks: Whether to include symbolic links in the results. Default: true.
+            exts: If provided, only files with the specified extensions will be included. Example: ['.ts', '.js']
+            match: List of regular expression patterns used to filter entries. If specified, entries that do not match the patterns specified by this option are excluded.
+            skip: List of regular expression patterns used to filter entries. If specified, entries that match the patterns specified by this option are excluded.
+            concurrency: The maximum number of directories listed at the same time. Default: 8.
+        """
+        return self._bridge.iterate(
+            self._async.iter_walk(
+                path,
+                max_depth=max_depth,
+                include_files=include_files,
+                include_dirs=include_dirs,
+                include_symlinks=include_symlinks,
+                exts=exts,
+                match=match,
+                skip=skip,
+                concurrency=concurrency,
+            )
+        )
+
     def expand_glob(
         self,
         glob: str,
@@ -1068,6 +2082,43 @@ class SandboxFs:
             )
         )
 
+    def iter_glob(
+        self,
+        glob: str,
+        *,
+        root: Optional[str] = None,
+        exclude: Optional[list[str]] = None,
+        include_dirs: Optional[bool] = None,
+        extended: Optional[bool] = None,
+        globstar: Optional[bool] = None,
+        case_insensitive: Optional[bool] = None,
+        concurrency: int = 8,
+    ) -> Iterator[str]:
+        """Expand a glob pattern, yielding absolute paths as they are discovered.
+
+        Args:
+            glob: The glob pattern to expand.
+            root: The root directory from which to expand the glob pattern. Default is the current working directory.
+            exclude: An array of glob patterns to exclude from the results.
+            include_dirs: Whether to include directories in the results. Default: true.
+            extended: Whether to enable extended glob syntax, see https://www.linuxjournal.com/content/bash-extended-globbing. Default: true.
+            globstar: Globstar syntax. See https://www.linuxjournal.com/content/globstar-new-bash-globbing-option. If false, `**` is treated like `*`. Default: true.
+            case_insensitive: Whether the glob matching should be case insensitive. Default: false.
+            concurrency: The maximum number of directories listed at the same time. Default: 8.
+        """
+        return self._bridge.iterate(
+            self._async.iter_glob(
+                glob,
+                root=root,
+                exclude=exclude,
+                include_dirs=include_dirs,
+                extended=extended,
+                globstar=globstar,
+                case_insensitive=case_insensitive,
+                concurrency=concurrency,
+            )
+        )
+
     def link(self, target: str, path: str) -> None:
         """Create a hard link pointing to an existing file."""
         self._bridge.run(self._async.link(target, path))
@@ -1148,9 +2199,72 @@ class SandboxFs:
         """Change the access and modification times of a file."""
         self._bridge.run(self._async.utime(path, atime, mtime))
 
-    def upload(self, local_path: str, sandbox_path: str) -> None:
+    @overload
+    def hash(self, paths: str, *, algorithm: HashAlgorithm = ...) -> str: ...
+
+    @overload
+    def hash(
+        self, paths: list[str], *, algorithm: HashAlgorithm = ...
+    ) -> dict[str, str]: ...
+
+    def hash(
+        self, paths: Union[str, list[str]], *, algorithm: HashAlgorithm = "sha256"
+    ) -> Union[str, dict[str, str]]:
+        """Compute hex digests of files inside the sandbox, without downloading them.
+
+        Args:
+            paths: A path, or a list of paths to hash in a single batch.
+            algorithm: The hash algorithm to use. Default: 'sha256'.
+
+        Returns:
+            The digest for a single path, or a mapping of path to digest.
+        """
+        return self._bridge.run(self._async.hash(paths, algorithm=algorithm))
+
+    def watch(
+        self,
+        paths: Union[str, list[str]],
+        *,
+        recursive: Optional[bool] = None,
+        debounce_ms: Optional[int] = None,
+    ) -> FsWatcher:
+        """Watch files or directories for changes.
+
+        Args:
+            paths: The path or paths to watch.
+            recursive: Whether to watch directories recursively. Default: true.
+            debounce_ms: How long a path has to stay unchanged before its event is emitted. Default: 50.
+        """
+        async_watcher = self._bridge.run(
+            self._async.watch(paths, recursive=recursive, debounce_ms=debounce_ms)
+        )
+        return FsWatcher(self._bridge, async_watcher)
+
+    def upload(
+        self,
+        local_path: str,
+        sandbox_path: str,
+        *,
+        verify: Optional[bool] = None,
+        compression: Optional[Literal["gzip", "deflate", "auto"]] = None,
+        parallel_connections: Optional[int] = None,
+        use_mmap: Optional[bool] = None,
+        adaptive: Optional[bool] = None,
+        metrics: Optional[StreamMetrics] = None,
+    ) -> None:
         """Upload a file, directory, or symlink from local filesystem to the sandbox."""
-        self._bridge.run(self._async.upload(local_path, sandbox_path))
+        return self._bridge.run(
+            self._async.upload(
+                local_path,
+                sandbox_path,
+                verify=verify,
+                compression=compression,
+                parallel_connections=parallel_connections,
+                use_mmap=use_mmap,
+                adaptive=adaptive,
+                metrics=metrics,
+            )
+        )
 
     def download(self, local_path: str, sandbox_path: str) -> None:
         """Download a file or directory from the sandbox."""
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+from typing import AsyncIterator, Optional, Union
+
+import httpx
+
+from .errors import ProcessAlreadyExited
+from .process import AsyncDenoProcess
+from .rpc import AsyncFetchResponse, RequestContent
+from .sandbox import AsyncSandbox
+
+# Headers that describe the connection or the encoded message rather than the
+# request, which fetch inside the sandbox sets itself
+_HOP_BY_HOP_HEADERS = frozenset(
+    {"connection", "content-length", "host", "keep-alive", "transfer-encoding"}
+)
+
+
+class _ResponseStream(httpx.AsyncByteStream):
+    def __init__(self, response: AsyncFetchResponse, request: httpx.Request):
+        self._response = response
+        self._request = request
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self._response.aiter_bytes():
+                yield chunk
+        except Exception as e:
+            raise httpx.ReadError(str(e), request=self._request) from e
+
+    async def aclose(self) -> None:
+        await self._response.aclose()
+
+
+class SandboxTransport(httpx.AsyncBaseTransport):
+    """An httpx transport that sends requests to a Deno process with `fetch()`.
+
+    Lets `httpx.AsyncClient` code drive an app served in the sandbox without
+    exposing it with `expose_http()`. Request and response bodies are streamed.
+    Redirects are left to the client, and the client's read timeout bounds the
+    wait for response headers. A request that times out or is cancelled stops
+    waiting and drops its response body, but the fetch in the sandbox runs
+    to completion.
+
+    Usage:
+        async with httpx.AsyncClient(
+            transport=SandboxTransport(process), base_url="http://localhost"
+        ) as client:
+            response = await client.get("/")
+    """
+
+    def __init__(self, target: Union[AsyncDenoProcess, AsyncSandbox]):
+        """Create a transport.
+
+        Args:
+            target: The Deno process to send requests to, or a sandbox to fetch from.
+        """
+        self._target = target
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        headers: dict[str, str] = {}
+        for name, value in request.headers.multi_items():
+            if name.lower() in _HOP_BY_HOP_HEADERS:
+                continue
+            headers[name] = f"{headers[name]}, {value}" if name in headers else value
+
+        content: Optional[RequestContent] = None
+        if "transfer-encoding" in request.headers:
+            content = request.stream
+        elif int(request.headers.get("content-length", "0")) > 0:
+            try:
+                content = request.content
+            except httpx.RequestNotRead:
+                content = request.stream
+
+        timeout = request.extensions.get("timeout", {}).get("read")
+        try:
+            response = await asyncio.wait_for(
+                self._target.fetch(
+                    str(request.url),
+                    method=request.method,
+                    headers=headers,
+                    redirect="manual",
+                    content=content,
+                ),
+                timeout,
+            )
+        except asyncio.TimeoutError as e:
+            raise httpx.ReadTimeout(
+                "Timed out waiting for a response", request=request
+            ) from e
+        except ProcessAlreadyExited as e:
+            raise httpx.ConnectError(str(e), request=request) from e
+        except Exception as e:
+            raise httpx.TransportError(str(e), request=request) from e
+
+        response_headers = response.headers
+        if any(name.lower() == "content-encoding" for name, _ in response_headers):
+            # fetch has already decoded the body, so these describe the wrong bytes
+            response_headers = [
+                (name, value)
+                for name, value in response_headers
+                if name.lower() not in ("content-encoding", "content-length")
+            ]
+
+        return httpx.Response(
+            response.status_code,
+            headers=response_headers,
+            stream=_ResponseStream(response, request),
+            extensions={
+                "http_version": b"HTTP/1.1",
+                "reason_phrase": response.status_text.encode(),
+            },
+        )
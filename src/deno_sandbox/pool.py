@@ -0,0 +1,479 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    TypedDict,
+    Union,
+)
+
+from .bridge import AsyncBridge
+from .process import CALL_BATCH_SIZE, AsyncDenoRepl
+from .utils import batched
+
+
+class ReplPoolMetrics(TypedDict):
+    size: int
+    """The maximum number of REPL processes the pool keeps."""
+
+    idle: int
+    """REPL processes ready to be used."""
+
+    hits: int
+    """Acquisitions served by an already running REPL."""
+
+    misses: int
+    """Acquisitions that had to wait for a new REPL to start."""
+
+    evals: int
+    """Expressions evaluated through the pool."""
+
+    errors: int
+    """Evaluations that raised."""
+
+    resets: int
+    """REPLs replaced after use to isolate state between evaluations."""
+
+    discarded: int
+    """REPLs dropped because they had exited or failed a health check."""
+
+    eval_seconds_total: float
+    """Time spent evaluating, including waiting for a REPL."""
+
+    eval_seconds_mean: float
+    """The mean evaluation latency."""
+
+
+class AsyncReplPool:
+    """A pool of warm Deno REPL processes, used by `deno.eval()`.
+
+    REPLs are started on demand, up to `size`, and kept running between
+    evaluations so expressions don't pay Deno's startup time. With `reset`,
+    a REPL that ran a stateful evaluation is replaced by a fresh one started
+    in the background, so globals never leak from one evaluation to the next.
+    Evaluations marked stateless reuse the REPL as is.
+    """
+
+    def __init__(
+        self,
+        create: Callable[[], Awaitable[AsyncDenoRepl]],
+        loop: asyncio.AbstractEventLoop,
+        *,
+        size: int = 2,
+        reset: bool = True,
+    ):
+        self.size = size
+        """The maximum number of REPL processes to keep. Can be changed at any time."""
+        self.reset = reset
+        """Replace REPLs after stateful evaluations. Can be changed at any time."""
+
+        self._create = create
+        self._loop = loop
+        self._idle: deque[AsyncDenoRepl] = deque()
+        # REPLs that are idle, in use or starting
+        self._count = 0
+        self._available = asyncio.Condition()
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._closed = False
+        self._metrics = ReplPoolMetrics(
+            size=size,
+            idle=0,
+            hits=0,
+            misses=0,
+            evals=0,
+            errors=0,
+            resets=0,
+            discarded=0,
+            eval_seconds_total=0.0,
+            eval_seconds_mean=0.0,
+        )
+
+    def metrics(self) -> ReplPoolMetrics:
+        metrics = ReplPoolMetrics(**self._metrics)
+        metrics["size"] = self.size
+        metrics["idle"] = len(self._idle)
+        if metrics["evals"]:
+            metrics["eval_seconds_mean"] = (
+                metrics["eval_seconds_total"] / metrics["evals"]
+            )
+        return metrics
+
+    @asynccontextmanager
+    async def acquire(self, *, stateless: bool = False) -> AsyncIterator[AsyncDenoRepl]:
+        """Borrow a REPL from the pool for the duration of the block.
+
+        Args:
+            stateless: The block leaves no state behind in the REPL, so it can be reused without a reset.
+        """
+        repl = await self._acquire()
+        try:
+            yield repl
+        except BaseException:
+            # The REPL may be mid-evaluation or in an unknown state
+            await self._release(repl, replace=True)
+            raise
+        await self._release(repl, replace=self.reset and not stateless)
+
+    async def eval(self, code: str, *, stateless: bool = False) -> Any:
+        """Evaluate code in a pooled REPL and return the result.
+
+        Args:
+            code: The code to evaluate.
+            stateless: The code has no side effects, e.g. a pure expression, so the REPL can be reused without a reset.
+        """
+        started = time.perf_counter()
+        try:
+            async with self.acquire(stateless=stateless) as repl:
+                return await repl.eval(code)
+        except BaseException:
+            self._metrics["errors"] += 1
+            raise
+        finally:
+            self._metrics["evals"] += 1
+            self._metrics["eval_seconds_total"] += time.perf_counter() - started
+
+    async def call_many(
+        self,
+        fn: str,
+        args: Iterable[Sequence[Any]],
+        *,
+        batch_size: int = CALL_BATCH_SIZE,
+        concurrency: Optional[int] = None,
+    ) -> list[Any]:
+        """Call a function once per argument list, spreading batches across pooled REPLs.
+
+        Args:
+            fn: A JavaScript function expression, or the name of a global function.
+            args: The argument list for each call.
+            batch_size: Calls to send per round trip. Default: 1000.
+            concurrency: Batches to run at once, each in its own REPL. Default: the pool size.
+        """
+        results: list[Any] = []
+        batches = batched(args, batch_size)
+        async for batch in self._call_batches(fn, batches, concurrency):
+            results.extend(batch)
+        return results
+
+    async def map(
+        self,
+        fn: str,
+        items: Iterable[Any],
+        *,
+        batch_size: int = CALL_BATCH_SIZE,
+        concurrency: Optional[int] = None,
+    ) -> AsyncIterator[Any]:
+        """Apply a one-argument function to each item across pooled REPLs, yielding results in order.
+
+        Args:
+            fn: A JavaScript function expression, or the name of a global function.
+            items: The argument for each call.
+            batch_size: Calls to send per round trip. Default: 1000.
+            concurrency: Batches to run at once, each in its own REPL. Default: the pool size.
+        """
+        batches = batched(([item] for item in items), batch_size)
+        async for batch in self._call_batches(fn, batches, concurrency):
+            for result in batch:
+                yield result
+
+    async def _call_batches(
+        self,
+        fn: str,
+        batches: Iterator[list[Sequence[Any]]],
+        concurrency: Optional[int],
+    ) -> AsyncIterator[list[Any]]:
+        """Run batches in parallel REPLs, yielding their results in submission order.
+
+        At most twice `concurrency` batches are started ahead of the one the
+        caller is waiting for, so a slow consumer or a slow batch bounds memory.
+        """
+        workers_count = concurrency or self.size
+        numbered = enumerate(batches)
+        # Released as each batch is yielded; limits batches running or waiting
+        # in `done` and `ready` however far the others get ahead
+        window = asyncio.Semaphore(2 * workers_count)
+        done: asyncio.Queue[Union[tuple[int, list[Any]], BaseException, None]]
+        done = asyncio.Queue(maxsize=workers_count)
+
+        async def _next() -> Optional[tuple[int, list[Sequence[Any]]]]:
+            await window.acquire()
+            return next(numbered, None)
+
+        async def _worker() -> None:
+            try:
+                # Only take a REPL once there is a batch for it, so workers
+                # beyond the number of batches don't start REPLs for nothing
+                if (item := await _next()) is None:
+                    return
+                # The call helper a batch installs is harmless to keep, so
+                # the REPL goes back to the pool without a reset
+                async with self.acquire(stateless=True) as repl:
+                    while item is not None:
+                        index, batch = item
+                        results = await repl.call_many(fn, batch, batch_size=len(batch))
+                        await done.put((index, results))
+                        item = await _next()
+            except Exception as e:
+                await done.put(e)
+            finally:
+                await done.put(None)
+
+        workers = [self._loop.create_task(_worker()) for _ in range(workers_count)]
+        ready: dict[int, list[Any]] = {}
+        next_index = 0
+        running = len(workers)
+        try:
+            while running:
+                item = await done.get()
+                if item is None:
+                    running -= 1
+                    continue
+                if isinstance(item, BaseException):
+                    raise item
+                ready[item[0]] = item[1]
+                while next_index in ready:
+                    yield ready.pop(next_index)
+                    next_index += 1
+                    window.release()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def health_check(self, timeout: float = 5.0) -> int:
+        """Evaluate a trivial expression in every idle REPL, dropping unresponsive ones.
+
+        Args:
+            timeout: Seconds to wait for each REPL to respond.
+
+        Returns:
+            The number of REPLs dropped.
+        """
+        async with self._available:
+            repls = list(self._idle)
+            self._idle.clear()
+
+        async def _check(repl: AsyncDenoRepl) -> bool:
+            try:
+                return await asyncio.wait_for(repl.eval("1"), timeout) == 1
+            except Exception:
+                return False
+
+        healthy = await asyncio.gather(*(_check(repl) for repl in repls))
+        dropped = 0
+        async with self._available:
+            for repl, ok in zip(repls, healthy):
+                if ok:
+                    self._idle.append(repl)
+                else:
+                    dropped += 1
+                    self._count -= 1
+                    self._metrics["discarded"] += 1
+                    self._spawn_background(self._close(repl))
+            self._available.notify_all()
+        return dropped
+
+    async def close(self) -> None:
+        """Close every idle REPL and stop starting new ones."""
+        repls = self.shutdown()
+        await asyncio.gather(
+            *(self._close(repl) for repl in repls), return_exceptions=True
+        )
+
+    def shutdown(self) -> list[AsyncDenoRepl]:
+        """Stop the pool and forget its REPLs without closing them.
+
+        For when the REPLs are killed some other way, such as by closing the
+        sandbox. Returns the REPLs that were idle.
+        """
+        self._closed = True
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        repls = list(self._idle)
+        self._idle.clear()
+        self._count = 0
+        return repls
+
+    async def _acquire(self) -> AsyncDenoRepl:
+        if self._closed:
+            raise RuntimeError("REPL pool is closed")
+        async with self._available:
+            while True:
+                while self._idle:
+                    repl = self._idle.popleft()
+                    if not repl.exited:
+                        self._metrics["hits"] += 1
+                        return repl
+                    # The process exited while idle
+                    self._count -= 1
+                    self._metrics["discarded"] += 1
+                if self._count < self.size:
+                    self._count += 1
+                    break
+                await self._available.wait()
+
+        self._metrics["misses"] += 1
+        try:
+            return await self._create()
+        except BaseException:
+            async with self._available:
+                self._count -= 1
+                self._available.notify()
+            raise
+
+    async def _release(self, repl: AsyncDenoRepl, *, replace: bool) -> None:
+        if self._closed:
+            await self._close(repl)
+            return
+        if replace or repl.exited:
+            if repl.exited:
+                self._metrics["discarded"] += 1
+            else:
+                self._metrics["resets"] += 1
+            self._spawn_background(self._close(repl))
+            self._spawn_background(self._replace())
+            return
+
+        async with self._available:
+            if self._count > self.size:
+                # The pool was shrunk while this REPL was in use
+                self._count -= 1
+                self._spawn_background(self._close(repl))
+            else:
+                self._idle.append(repl)
+            self._available.notify()
+
+    async def _replace(self) -> None:
+        """Start a REPL to take over the slot of one that was discarded."""
+        try:
+            repl = await self._create()
+        except Exception:
+            async with self._available:
+                self._count -= 1
+                self._available.notify()
+            return
+
+        if self._closed:
+            await self._close(repl)
+            return
+        async with self._available:
+            self._idle.append(repl)
+            self._available.notify()
+
+    async def _close(self, repl: AsyncDenoRepl) -> None:
+        try:
+            await repl.close()
+        except Exception:
+            try:
+                await repl.kill()
+            except Exception:
+                pass
+
+    def _spawn_background(self, coro: Coroutine[Any, Any, None]) -> None:
+        task = self._loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+class ReplPool:
+    def __init__(self, bridge: AsyncBridge, async_pool: AsyncReplPool):
+        self._bridge = bridge
+        self._async = async_pool
+
+    @property
+    def size(self) -> int:
+        """The maximum number of REPL processes to keep."""
+        return self._async.size
+
+    @size.setter
+    def size(self, value: int) -> None:
+        self._async.size = value
+
+    @property
+    def reset(self) -> bool:
+        """Replace REPLs after stateful evaluations."""
+        return self._async.reset
+
+    @reset.setter
+    def reset(self, value: bool) -> None:
+        self._async.reset = value
+
+    def metrics(self) -> ReplPoolMetrics:
+        return self._async.metrics()
+
+    def eval(self, code: str, *, stateless: bool = False) -> Any:
+        """Evaluate code in a pooled REPL and return the result.
+
+        Args:
+            code: The code to evaluate.
+            stateless: The code has no side effects, e.g. a pure expression, so the REPL can be reused without a reset.
+        """
+        return self._bridge.run(self._async.eval(code, stateless=stateless))
+
+    def call_many(
+        self,
+        fn: str,
+        args: Iterable[Sequence[Any]],
+        *,
+        batch_size: int = CALL_BATCH_SIZE,
+        concurrency: Optional[int] = None,
+    ) -> list[Any]:
+        """Call a function once per argument list, spreading batches across pooled REPLs.
+
+        Args:
+            fn: A JavaScript function expression, or the name of a global function.
+            args: The argument list for each call.
+            batch_size: Calls to send per round trip. Default: 1000.
+            concurrency: Batches to run at once, each in its own REPL. Default: the pool size.
+        """
+        return self._bridge.run(
+            self._async.call_many(
+                fn, args, batch_size=batch_size, concurrency=concurrency
+            )
+        )
+
+    def map(
+        self,
+        fn: str,
+        items: Iterable[Any],
+        *,
+        batch_size: int = CALL_BATCH_SIZE,
+        concurrency: Optional[int] = None,
+    ) -> Iterator[Any]:
+        """Apply a one-argument function to each item across pooled REPLs, yielding results in order.
+
+        Args:
+            fn: A JavaScript function expression, or the name of a global function.
+            items: The argument for each call.
+            batch_size: Calls to send per round trip. Default: 1000.
+            concurrency: Batches to run at once, each in its own REPL. Default: the pool size.
+        """
+        return self._bridge.iterate(
+            self._async.map(fn, items, batch_size=batch_size, concurrency=concurrency)
+        )
+
+    def health_check(self, timeout: float = 5.0) -> int:
+        """Evaluate a trivial expression in every idle REPL, dropping unresponsive ones.
+
+        Args:
+            timeout: Seconds to wait for each REPL to respond.
+
+        Returns:
+            The number of REPLs dropped.
+        """
+        return self._bridge.run(self._async.health_check(timeout))
+
+    def close(self) -> None:
+        """Close every idle REPL and stop starting new ones."""
+        self._bridge.run(self._async.close())
@@ -1,9 +1,31 @@
 from __future__ import annotations
 
 import asyncio
+import binascii
+import codecs
+import itertools
+import json
+import os
 import sys
-from typing import Any, BinaryIO, Callable, Optional, TypedDict, TypeVar, cast
-from typing_extensions import Literal
+import threading
+import time
+import uuid
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    BinaryIO,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    TypedDict,
+    TypeVar,
+    Union,
+    cast,
+)
+from typing_extensions import Literal, NotRequired, TypeAlias
 
 from .bridge import AsyncBridge
 from .errors import ProcessAlreadyExited
@@ -11,7 +33,10 @@ from .rpc import (
     AsyncFetchResponse,
     AsyncRpcClient,
     FetchResponse,
+    RequestContent,
 )
+from .stream import AsyncStreamWriter, complete_stream, start_stream
+from .utils import batched
 
 T = TypeVar("T")
 
@@ -20,9 +45,94 @@ class AbortSignal:
     pass
 
 
+class RingBuffer:
+    """Keeps the most recent `capacity` bytes written to it.
+
+    Appends copy into a fixed bytearray and never reallocate, so retaining the
+    tail of a long-running process's output costs constant memory.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._end = 0
+        self._size = 0
+        self.total = 0
+        """The number of bytes written over the buffer's lifetime."""
+        # Output is written on the event loop but may be read from another thread
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def write(self, data: Union[bytes, bytearray, memoryview]) -> None:
+        with memoryview(data) as view, self._lock:
+            self.total += len(view)
+            if len(view) >= self.capacity:
+                self._buffer[:] = view[len(view) - self.capacity :]
+                self._end = 0
+                self._size = self.capacity
+                return
+
+            first = min(len(view), self.capacity - self._end)
+            self._buffer[self._end : self._end + first] = view[:first]
+            self._buffer[: len(view) - first] = view[first:]
+            self._end = (self._end + len(view)) % self.capacity
+            self._size = min(self.capacity, self._size + len(view))
+
+    def tail(self, n: Optional[int] = None) -> bytes:
+        """Return the last `n` retained bytes, or all of them."""
+        with self._lock:
+            n = self._size if n is None else max(0, min(n, self._size))
+            start = (self._end - n) % self.capacity
+            if start + n <= self.capacity:
+                return bytes(self._buffer[start : start + n])
+            return bytes(self._buffer[start:]) + bytes(self._buffer[: self._end])
+
+    def tail_lines(self, n: int, errors: str = "replace") -> list[str]:
+        """Return the last `n` retained lines of UTF-8 text.
+
+        The first line may be partial if older output has been overwritten.
+        """
+        data = self.tail()
+        if n <= 0 or not data:
+            return []
+        end = len(data) - 1 if data.endswith(b"\n") else len(data)
+        start = end
+        for _ in range(n):
+            start = data.rfind(b"\n", 0, start)
+            if start == -1:
+                break
+        return data[start + 1 : end].decode("utf-8", errors).split("\n")
+
+
+OutputSink: TypeAlias = Union[
+    BinaryIO,
+    "os.PathLike[str]",
+    RingBuffer,
+    "asyncio.Queue[bytes]",
+    Callable[[bytes], Awaitable[None]],
+]
+"""A local destination for process output: a binary file object, a path
+(opened for writing, with writes done in a worker thread), an asyncio.Queue
+(receives chunks, then b"" at end of output), a RingBuffer, or an async
+callback."""
+
+_OUTPUT_READ_SIZE = 64 * 1024
+_OUTPUT_FLUSH_INTERVAL = 0.05
+_PATH_SINK_BUFFER_SIZE = 1024 * 1024
+_INPUT_CHUNK_SIZE = 64 * 1024
+
+
 class RemoteProcessOptions(TypedDict):
     stdout_inherit: bool
     stderr_inherit: bool
+    stdout_sink: NotRequired[OutputSink]
+    stderr_sink: NotRequired[OutputSink]
+    read_size: NotRequired[int]
+    flush_interval: NotRequired[float]
 
 
 class ProcessSpawnResult(TypedDict):
@@ -47,6 +157,268 @@ class ChildProcessStatus(TypedDict):
     signal: AbortSignal | None
 
 
+class ProcessEvent(TypedDict):
+    stream: Literal["stdout", "stderr"]
+    """The stream the line was written to."""
+
+    line: str
+    """The line, without its trailing newline."""
+
+    timestamp: float
+    """When the client received the line, as a `time.time()` value."""
+
+
+_LINE_READ_SIZE = 64 * 1024
+
+
+class ProcessOutputReader(asyncio.StreamReader):
+    """A StreamReader for process output, with line and NDJSON iterators.
+
+    The iterators read large chunks and split them incrementally, so unlike
+    `readline()` they have no line length limit.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.received_at: Optional[float] = None
+        """When data was last received for this stream, as a `time.time()` value."""
+
+    def feed_data(self, data: bytes) -> None:
+        self.received_at = time.time()
+        super().feed_data(data)
+
+    async def lines(
+        self, *, keepends: bool = False, errors: str = "replace"
+    ) -> AsyncIterator[str]:
+        """Iterate over the stream as lines of UTF-8 text.
+
+        Args:
+            keepends: Keep the trailing newline on each line.
+            errors: How to handle invalid UTF-8, as for `bytes.decode`.
+        """
+        async for line, _ in self._timed_lines(keepends, errors):
+            yield line
+
+    async def _timed_lines(
+        self, keepends: bool = False, errors: str = "replace"
+    ) -> AsyncIterator[tuple[str, Optional[float]]]:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors)
+        # Fragments of a line that spans several chunks, joined once it ends
+        partial: list[str] = []
+        end = "\n" if keepends else ""
+
+        while chunk := await self.read(_LINE_READ_SIZE):
+            text = decoder.decode(chunk)
+            start = 0
+            while (newline := text.find("\n", start)) != -1:
+                partial.append(text[start:newline])
+                yield "".join(partial) + end, self.received_at
+                partial.clear()
+                start = newline + 1
+            if start < len(text):
+                partial.append(text[start:])
+
+        partial.append(decoder.decode(b"", final=True))
+        tail = "".join(partial)
+        if tail:
+            yield tail, self.received_at
+
+    async def iter_ndjson(self, *, errors: str = "strict") -> AsyncIterator[Any]:
+        """Iterate over the stream as newline-delimited JSON values.
+
+        Values are decoded in place from each received chunk rather than from
+        per-line copies. Blank lines are skipped.
+
+        Args:
+            errors: How to handle invalid UTF-8, as for `bytes.decode`.
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")(errors)
+        raw_decode = json.JSONDecoder().raw_decode
+        # Fragments of a value that spans several chunks, joined once it ends
+        partial: list[str] = []
+
+        while True:
+            chunk = await self.read(_LINE_READ_SIZE)
+            final = not chunk
+            text = decoder.decode(chunk, final=final)
+            if not final and "\n" not in text:
+                if text:
+                    partial.append(text)
+                continue
+            if partial:
+                partial.append(text)
+                buffer = "".join(partial)
+                partial.clear()
+            else:
+                buffer = text
+
+            position = 0
+            while True:
+                newline = buffer.find("\n", position)
+                if newline == -1:
+                    if not final:
+                        break
+                    newline = len(buffer)
+                if buffer[position:newline].strip():
+                    value, end = raw_decode(buffer, _skip_space(buffer, position))
+                    if buffer[end:newline].strip():
+                        raise json.JSONDecodeError(
+                            "Extra data after NDJSON value", buffer, end
+                        )
+                    yield value
+                position = newline + 1
+                if position >= len(buffer):
+                    break
+
+            if final:
+                return
+            if position < len(buffer):
+                partial.append(buffer[position:])
+
+
+def _skip_space(text: str, position: int) -> int:
+    while position < len(text) and text[position] in " \t\r":
+        position += 1
+    return position
+
+
+class ProcessInputWriter:
+    """Writes to the stdin of a process spawned with stdin="piped".
+
+    Like asyncio.StreamWriter, `write()` buffers locally and `drain()` sends
+    the buffer. Each frame waits for its turn in the transport's outbound queue
+    and for the socket to drain, so pairing every `write()` with a `drain()`
+    keeps memory bounded however much data is pumped through.
+    """
+
+    def __init__(self, writer: AsyncStreamWriter, chunk_size: int = _INPUT_CHUNK_SIZE):
+        self._writer = writer
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+        self._lock = asyncio.Lock()
+        self._closing = False
+
+    @property
+    def buffered(self) -> int:
+        """The number of bytes written but not yet sent."""
+        return len(self._buffer)
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def write(self, data: Union[bytes, bytearray, memoryview]) -> None:
+        """Buffer data to be sent by the next `drain()`."""
+        if self._closing:
+            raise RuntimeError("stdin is closed")
+        self._buffer += data
+
+    async def drain(self) -> None:
+        """Send all buffered data, waiting for the connection to accept it."""
+        async with self._lock:
+            while self._buffer:
+                # Swap the buffer out so writes made while sending don't
+                # resize a buffer that is still being read
+                pending, self._buffer = self._buffer, bytearray()
+                with memoryview(pending) as view:
+                    for offset in range(0, len(view), self._chunk_size):
+                        await self._writer.enqueue(
+                            view[offset : offset + self._chunk_size]
+                        )
+
+    async def close(self) -> None:
+        """Send any buffered data, then end the stream so the process sees EOF."""
+        if self._closing:
+            return
+        self._closing = True
+        await self.drain()
+        await self._writer.end()
+
+
+class CompletedProcess(TypedDict):
+    """The result of running a process to completion with `run()`."""
+
+    success: bool
+    """Whether the process exited with a zero exit code."""
+
+    code: Optional[int]
+    """The exit code, or None if the process was killed after timing out."""
+
+    signal: AbortSignal | None
+    """The signal that caused the process to exit, if any."""
+
+    stdout: bytes
+    """Captured stdout. Holds only the first `max_output` bytes if stdout_path is set."""
+
+    stderr: bytes
+    """Captured stderr. Holds only the first `max_output` bytes if stderr_path is set."""
+
+    stdout_path: Optional[str]
+    """Local temporary file with the complete stdout, when it exceeded `max_output`."""
+
+    stderr_path: Optional[str]
+    """Local temporary file with the complete stderr, when it exceeded `max_output`."""
+
+    timed_out: bool
+    """Whether the process was killed because it exceeded the timeout."""
+
+
+class BatchProcessResult(CompletedProcess):
+    """The result of one command run by `run_many()`."""
+
+    index: int
+    """The position of the command in the submitted commands."""
+
+    args: list[str]
+    """The command and its arguments."""
+
+    duration: float
+    """Seconds from spawning the process to collecting its result."""
+
+    error: Optional[Exception]
+    """The error that stopped the command from being run or collected, if any."""
+
+
+class BatchStats(TypedDict):
+    """Aggregate timing for a `run_many()` batch."""
+
+    total: int
+    """The number of commands run."""
+
+    succeeded: int
+    """The number of commands that exited with a zero exit code."""
+
+    failed: int
+    """The number of commands that exited with a non-zero exit code, timed out or raised an error."""
+
+    errored: int
+    """The number of commands that raised an error instead of completing."""
+
+    timed_out: int
+    """The number of commands killed because they exceeded the timeout."""
+
+    wall_seconds: float
+    """Seconds from starting the batch to the last command finishing."""
+
+    process_seconds: float
+    """The sum of every command's duration."""
+
+    mean_seconds: float
+    """The mean command duration."""
+
+    max_seconds: float
+    """The longest command duration."""
+
+
+class BatchResult(TypedDict):
+    """The results of `run_many()`."""
+
+    results: list[BatchProcessResult]
+    """One result per command, in submission or completion order."""
+
+    stats: BatchStats
+    """Aggregate timing for the batch."""
+
+
 class AsyncChildProcess:
     def __init__(
         self,
@@ -57,9 +429,10 @@ class AsyncChildProcess:
         rpc: AsyncRpcClient,
         _stdout_task: Optional[asyncio.Task] = None,
         _stderr_task: Optional[asyncio.Task] = None,
-        _process_list: Optional[list["AsyncChildProcess"]] = None,
+        _registry: Optional[dict[int, "AsyncChildProcess"]] = None,
     ):
         self.pid = pid
+        self.stdin: Optional[ProcessInputWriter] = None
         self.stdout = stdout
         self.stderr = stderr
         self._wait_task = wait_task
@@ -67,12 +440,101 @@ class AsyncChildProcess:
         self._rpc = rpc
         self._stdout_task = _stdout_task
         self._stderr_task = _stderr_task
-        self._process_list = _process_list
-
-    def _remove_from_list(self) -> None:
-        """Remove this process from the tracking list."""
-        if self._process_list is not None and self in self._process_list:
-            self._process_list.remove(self)
+        self._registry = _registry
+        # RingBuffer sinks by stream, read with tail()
+        self._tails: dict[str, RingBuffer] = {}
+        # Pumps whose output wait() lets finish; queue sinks are drained by the caller
+        self._delivery_tasks: list[asyncio.Task] = []
+
+    async def iter_ndjson(self) -> AsyncIterator[Any]:
+        """Iterate over stdout as newline-delimited JSON values. Requires stdout="piped"."""
+        reader = cast(ProcessOutputReader, self.stdout)
+        async for value in reader.iter_ndjson():
+            yield value
+
+    def tail(
+        self,
+        n_bytes: Optional[int] = None,
+        stream: Optional[Literal["stdout", "stderr"]] = None,
+    ) -> bytes:
+        """Return the last `n_bytes` of retained output, or all of it.
+
+        Args:
+            n_bytes: The number of bytes to return. Default: everything retained.
+            stream: The stream to read, which must have been spawned with "tail". Default: stdout if it was, otherwise stderr.
+        """
+        return self._tail_buffer(stream).tail(n_bytes)
+
+    def tail_lines(
+        self, n: int, stream: Optional[Literal["stdout", "stderr"]] = None
+    ) -> list[str]:
+        """Return the last `n` lines of retained output.
+
+        Args:
+            n: The number of lines to return.
+            stream: The stream to read, which must have been spawned with "tail". Default: stdout if it was, otherwise stderr.
+        """
+        return self._tail_buffer(stream).tail_lines(n)
+
+    def _tail_buffer(self, stream: Optional[str]) -> RingBuffer:
+        if stream is None:
+            stream = "stdout" if "stdout" in self._tails else "stderr"
+        buffer = self._tails.get(stream)
+        if buffer is None:
+            raise ValueError(f'Process was not spawned with {stream}="tail"')
+        return buffer
+
+    async def events(self) -> AsyncIterator[ProcessEvent]:
+        """Iterate over stdout and stderr lines as they arrive, merged and tagged.
+
+        Requires stdout="piped" and stderr="piped".
+        """
+        queue: asyncio.Queue[Optional[ProcessEvent]] = asyncio.Queue(maxsize=256)
+
+        async def _pump(
+            stream: Literal["stdout", "stderr"], reader: ProcessOutputReader
+        ) -> None:
+            cancelled = False
+            try:
+                async for line, received_at in reader._timed_lines():
+                    timestamp = received_at if received_at is not None else time.time()
+                    await queue.put(
+                        ProcessEvent(stream=stream, line=line, timestamp=timestamp)
+                    )
+            except asyncio.CancelledError:
+                # The consumer has stopped and would never make room for the marker
+                cancelled = True
+                raise
+            finally:
+                if not cancelled:
+                    await queue.put(None)
+
+        pumps = [
+            self._rpc._loop.create_task(
+                _pump("stdout", cast(ProcessOutputReader, self.stdout))
+            ),
+            self._rpc._loop.create_task(
+                _pump("stderr", cast(ProcessOutputReader, self.stderr))
+            ),
+        ]
+        try:
+            remaining = len(pumps)
+            while remaining:
+                event = await queue.get()
+                if event is None:
+                    remaining -= 1
+                else:
+                    yield event
+        finally:
+            for pump in pumps:
+                pump.cancel()
+            await asyncio.gather(*pumps, return_exceptions=True)
+
+    def _unregister(self) -> None:
+        """Remove this process from the sandbox's process registry."""
+        # The pid may already belong to a newer process if this one was reaped
+        if self._registry is not None and self._registry.get(self.pid) is self:
+            del self._registry[self.pid]
 
     @classmethod
     async def create(
@@ -80,14 +542,28 @@ class AsyncChildProcess:
         res: ProcessSpawnResult,
         rpc: AsyncRpcClient,
         options: RemoteProcessOptions,
-        process_list: Optional[list[AsyncChildProcess]] = None,
+        registry: Optional[dict[int, AsyncChildProcess]] = None,
     ) -> AsyncChildProcess:
-        return create_process_like(cls, res, rpc, options, process_list)
+        return create_process_like(cls, res, rpc, options, registry)
+
+    @property
+    def exited(self) -> bool:
+        """Whether the process has exited and its exit status is available."""
+        return self._wait_task.done()
 
     async def wait(self) -> ChildProcessStatus:
+        """Wait for the process to exit and return its status.
+
+        Output delivered to "inherit", "tail", file, path or callback sinks has
+        been fully written when this returns. An asyncio.Queue sink receives
+        its closing b"" once its output is done, which may be later.
+        """
         raw = await self._wait_task
         result = cast(ProcessWaitResult, raw)
-        self._remove_from_list()
+        if self._delivery_tasks:
+            # asyncio.wait, unlike gather, leaves the pumps running if this is cancelled
+            await asyncio.wait(self._delivery_tasks)
+        self._unregister()
         return ChildProcessStatus(
             success=result["success"], code=result["code"], signal=result["signal"]
         )
@@ -108,7 +584,8 @@ class AsyncChildProcess:
         if self._stderr_task is not None:
             self._stderr_task.cancel()
 
-        self._remove_from_list()
+        self._rpc._streams.release_owner(self)
+        self._unregister()
 
     async def __aenter__(self):
         return self
@@ -117,21 +594,94 @@ class AsyncChildProcess:
         await self.kill()
 
 
-async def _pipe_stream(reader: asyncio.StreamReader, writer: BinaryIO):
-    """Helper to pump data from the StreamReader to a local binary stream."""
-    try:
-        while not reader.at_eof():
-            data = await reader.read(1024)
-            if not data:
-                break
+async def _pipe_stream(
+    reader: asyncio.StreamReader,
+    sink: OutputSink,
+    read_size: int = _OUTPUT_READ_SIZE,
+    flush_interval: float = _OUTPUT_FLUSH_INTERVAL,
+):
+    """Helper to pump data from the StreamReader to a local sink.
 
-            writer.write(data)
-            writer.flush()
+    File objects are flushed at most once per `flush_interval`, and again when
+    output pauses, rather than after every chunk.
+    """
+    try:
+        if isinstance(sink, RingBuffer):
+            while data := await reader.read(read_size):
+                sink.write(data)
+        elif isinstance(sink, asyncio.Queue):
+            await _pipe_to_queue(reader, sink, read_size)
+        elif isinstance(sink, os.PathLike):
+            await _pipe_to_path(reader, sink, read_size)
+        elif hasattr(sink, "write"):
+            await _pipe_to_file(reader, cast(BinaryIO, sink), read_size, flush_interval)
+        else:
+            callback = cast(Callable[[bytes], Awaitable[None]], sink)
+            while data := await reader.read(read_size):
+                await callback(data)
     except Exception:
         # Handle potential connection drops or closed pipes silently
         pass
 
 
+async def _pipe_to_file(
+    reader: asyncio.StreamReader,
+    writer: BinaryIO,
+    read_size: int,
+    flush_interval: float,
+) -> None:
+    loop = asyncio.get_running_loop()
+    last_flush = time.monotonic()
+    pending_flush: Optional[asyncio.TimerHandle] = None
+
+    def _flush() -> None:
+        nonlocal last_flush, pending_flush
+        pending_flush = None
+        last_flush = time.monotonic()
+        try:
+            writer.flush()
+        except Exception:
+            pass
+
+    try:
+        while data := await reader.read(read_size):
+            writer.write(data)
+            if time.monotonic() - last_flush >= flush_interval:
+                if pending_flush is not None:
+                    pending_flush.cancel()
+                _flush()
+            elif pending_flush is None:
+                # Make sure output that arrives just before a pause is not held back
+                pending_flush = loop.call_later(flush_interval, _flush)
+    finally:
+        if pending_flush is not None:
+            pending_flush.cancel()
+        _flush()
+
+
+async def _pipe_to_path(
+    reader: asyncio.StreamReader, path: os.PathLike[str], read_size: int
+) -> None:
+    file = await asyncio.to_thread(open, path, "wb", buffering=_PATH_SINK_BUFFER_SIZE)
+    try:
+        while data := await reader.read(read_size):
+            await asyncio.to_thread(file.write, data)
+    finally:
+        await asyncio.to_thread(file.close)
+
+
+async def _pipe_to_queue(
+    reader: asyncio.StreamReader, queue: asyncio.Queue[bytes], read_size: int
+) -> None:
+    try:
+        while data := await reader.read(read_size):
+            await queue.put(data)
+    finally:
+        # A bounded queue may be full; the consumer relies on the closing b"",
+        # so wait for room, even if this pump is being cancelled
+        await asyncio.shield(queue.put(b""))
+
+
 def create_process_like(
     cls: Callable[
         [
@@ -142,38 +692,57 @@ def create_process_like(
             AsyncRpcClient,
             Optional[asyncio.Task],
             Optional[asyncio.Task],
-            Optional[list[AsyncChildProcess]],
+            Optional[dict[int, AsyncChildProcess]],
         ],
         T,
     ],
     res: ProcessSpawnResult,
     rpc: AsyncRpcClient,
     options: RemoteProcessOptions,
-    process_list: Optional[list[AsyncChildProcess]] = None,
+    registry: Optional[dict[int, AsyncChildProcess]] = None,
 ) -> T:
     pid = res["pid"]
 
-    stdout = asyncio.StreamReader()
-    stderr = asyncio.StreamReader()
-
-    rpc._pending_processes[res["stdout_stream_id"]] = stdout
-    rpc._pending_processes[res["stderr_stream_id"]] = stderr
+    stdout = ProcessOutputReader()
+    stderr = ProcessOutputReader()
 
     wait_task = rpc._loop.create_task(rpc.call("processWait", {"pid": pid}))
 
     stdout_task: Optional[asyncio.Task] = None
     stderr_task: Optional[asyncio.Task] = None
 
-    if options.get("stdout_inherit"):
-        stdout_coro = _pipe_stream(stdout, sys.stdout.buffer)
+    read_size = options.get("read_size", _OUTPUT_READ_SIZE)
+    flush_interval = options.get("flush_interval", _OUTPUT_FLUSH_INTERVAL)
+
+    stdout_sink = options.get("stdout_sink")
+    if stdout_sink is None and options.get("stdout_inherit"):
+        stdout_sink = sys.stdout.buffer
+    if stdout_sink is not None:
+        stdout_coro = _pipe_stream(stdout, stdout_sink, read_size, flush_interval)
         stdout_task = rpc._loop.create_task(stdout_coro)
-    if options.get("stderr_inherit"):
-        stderr_coro = _pipe_stream(stderr, sys.stderr.buffer)
+
+    stderr_sink = options.get("stderr_sink")
+    if stderr_sink is None and options.get("stderr_inherit"):
+        stderr_sink = sys.stderr.buffer
+    if stderr_sink is not None:
+        stderr_coro = _pipe_stream(stderr, stderr_sink, read_size, flush_interval)
         stderr_task = rpc._loop.create_task(stderr_coro)
 
     instance = cls(
-        pid, stdout, stderr, wait_task, rpc, stdout_task, stderr_task, process_list
+        pid, stdout, stderr, wait_task, rpc, stdout_task, stderr_task, registry
     )
+    instance._tails = {
+        name: sink
+        for name, sink in (("stdout", stdout_sink), ("stderr", stderr_sink))
+        if isinstance(sink, RingBuffer)
+    }
+    instance._delivery_tasks = [
+        task
+        for task, sink in ((stdout_task, stdout_sink), (stderr_task, stderr_sink))
+        if task is not None and not isinstance(sink, asyncio.Queue)
+    ]
+    rpc._streams.register(res["stdout_stream_id"], stdout, instance)
+    rpc._streams.register(res["stderr_stream_id"], stderr, instance)
 
     return instance
 
@@ -194,6 +763,45 @@ class SyncStreamReader:
     def readexactly(self, n: int) -> bytes:
         return self._bridge.run(self._reader.readexactly(n))
 
+    def lines(
+        self, *, keepends: bool = False, errors: str = "replace"
+    ) -> Iterator[str]:
+        """Iterate over the stream as lines of UTF-8 text.
+
+        Args:
+            keepends: Keep the trailing newline on each line.
+            errors: How to handle invalid UTF-8, as for `bytes.decode`.
+        """
+        reader = cast(ProcessOutputReader, self._reader)
+        return self._bridge.iterate(reader.lines(keepends=keepends, errors=errors))
+
+    def iter_ndjson(self, *, errors: str = "strict") -> Iterator[Any]:
+        """Iterate over the stream as newline-delimited JSON values."""
+        reader = cast(ProcessOutputReader, self._reader)
+        return self._bridge.iterate(reader.iter_ndjson(errors=errors))
+
+
+class SyncStreamWriter:
+    """Wraps ProcessInputWriter to provide synchronous write methods."""
+
+    def __init__(self, bridge: AsyncBridge, writer: ProcessInputWriter):
+        self._bridge = bridge
+        self._writer = writer
+
+    def write(self, data: Union[bytes, bytearray, memoryview]) -> None:
+        """Write data, returning once the connection has accepted it."""
+        self._bridge.run(self._write(data))
+
+    async def _write(self, data: Union[bytes, bytearray, memoryview]) -> None:
+        self._writer.write(data)
+        await self._writer.drain()
+
+    def drain(self) -> None:
+        self._bridge.run(self._writer.drain())
+
+    def close(self) -> None:
+        self._bridge.run(self._writer.close())
+
 
 class ChildProcess:
     def __init__(
@@ -206,6 +814,11 @@ class ChildProcess:
         self._bridge = bridge
 
         self._async_proc = async_proc
+        self.stdin = (
+            SyncStreamWriter(bridge, async_proc.stdin)
+            if async_proc.stdin is not None
+            else None
+        )
         self.stdout = SyncStreamReader(bridge, self._async_proc.stdout)
         self.stderr = SyncStreamReader(bridge, self._async_proc.stderr)
         self.returncode: int | None = None
@@ -217,6 +830,41 @@ class ChildProcess:
     def wait(self) -> ChildProcessStatus:
         return self._bridge.run(self._async_proc.wait())
 
+    def iter_ndjson(self) -> Iterator[Any]:
+        """Iterate over stdout as newline-delimited JSON values. Requires stdout="piped"."""
+        return self._bridge.iterate(self._async_proc.iter_ndjson())
+
+    def tail(
+        self,
+        n_bytes: Optional[int] = None,
+        stream: Optional[Literal["stdout", "stderr"]] = None,
+    ) -> bytes:
+        """Return the last `n_bytes` of retained output, or all of it.
+
+        Args:
+            n_bytes: The number of bytes to return. Default: everything retained.
+            stream: The stream to read, which must have been spawned with "tail". Default: stdout if it was, otherwise stderr.
+        """
+        return self._async_proc.tail(n_bytes, stream)
+
+    def tail_lines(
+        self, n: int, stream: Optional[Literal["stdout", "stderr"]] = None
+    ) -> list[str]:
+        """Return the last `n` lines of retained output.
+
+        Args:
+            n: The number of lines to return.
+            stream: The stream to read, which must have been spawned with "tail". Default: stdout if it was, otherwise stderr.
+        """
+        return self._async_proc.tail_lines(n, stream)
+
+    def events(self) -> Iterator[ProcessEvent]:
+        """Iterate over stdout and stderr lines as they arrive, merged and tagged.
+
+        Requires stdout="piped" and stderr="piped".
+        """
+        return self._bridge.iterate(self._async_proc.events())
+
     def __enter__(self):
         return self
 
@@ -234,10 +882,10 @@ class AsyncDenoProcess(AsyncChildProcess):
         rpc: AsyncRpcClient,
         stdout_task: Optional[asyncio.Task],
         stderr_task: Optional[asyncio.Task],
-        process_list: Optional[list[AsyncChildProcess]] = None,
+        registry: Optional[dict[int, AsyncChildProcess]] = None,
     ):
         super().__init__(
-            pid, stdout, stderr, wait_task, rpc, stdout_task, stderr_task, process_list
+            pid, stdout, stderr, wait_task, rpc, stdout_task, stderr_task, registry
         )
         self._listening_task: asyncio.Task | None = None
 
@@ -247,9 +895,9 @@ class AsyncDenoProcess(AsyncChildProcess):
         res: ProcessSpawnResult,
         rpc: AsyncRpcClient,
         options: RemoteProcessOptions,
-        process_list: Optional[list[AsyncChildProcess]] = None,
+        registry: Optional[dict[int, AsyncChildProcess]] = None,
     ) -> AsyncDenoProcess:
-        p = create_process_like(cls, res, rpc, options, process_list)
+        p = create_process_like(cls, res, rpc, options, registry)
 
         p._listening_task = rpc._loop.create_task(
             rpc.call("denoHttpWait", {"pid": p.pid})
@@ -276,9 +924,23 @@ class AsyncDenoProcess(AsyncChildProcess):
         method: Optional[str] = "GET",
         headers: Optional[dict[str, str]] = None,
         redirect: Optional[Literal["follow", "manual"]] = None,
+        *,
+        content: Optional[RequestContent] = None,
+        json: Any = None,
     ) -> AsyncFetchResponse:
-        """Fetch a URL from the Deno process."""
-        return await self._rpc.fetch(url, method, headers, redirect, self.pid)
+        """Fetch a URL from the Deno process.
+
+        Args:
+            url: The URL to fetch.
+            method: The HTTP method. Default: GET.
+            headers: Request headers.
+            redirect: Whether to follow redirects. Default: follow.
+            content: The request body: bytes, a str (sent as UTF-8), or a sync/async iterable or file object streamed to the sandbox.
+            json: A value to send as a JSON body, with a JSON content type unless one is given.
+        """
+        return await self._rpc.fetch(
+            url, method, headers, redirect, self.pid, content, json
+        )
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         if self._listening_task is not None:
@@ -306,24 +968,113 @@ class DenoProcess(ChildProcess):
         method: Optional[str] = "GET",
         headers: Optional[dict[str, str]] = None,
         redirect: Optional[Literal["follow", "manual"]] = None,
+        *,
+        content: Optional[RequestContent] = None,
+        json: Any = None,
     ) -> FetchResponse:
-        """Fetch a URL from the Deno process."""
+        """Fetch a URL from the Deno process.
+
+        Args:
+            url: The URL to fetch.
+            method: The HTTP method. Default: GET.
+            headers: Request headers.
+            redirect: Whether to follow redirects. Default: follow.
+            content: The request body: bytes, a str (sent as UTF-8), or a sync/async iterable or file object streamed to the sandbox.
+            json: A value to send as a JSON body, with a JSON content type unless one is given.
+        """
         async_response = self._bridge.run(
-            self._rpc.fetch(url, method, headers, redirect, self.pid)
+            self._rpc.fetch(url, method, headers, redirect, self.pid, content, json)
         )
-        return FetchResponse(async_response)
+        return FetchResponse(self._bridge, async_response)
+
+
+# Installed into a REPL on first use. Direct eval resolves `fn` in the REPL's
+# top-level scope, so it may name a function defined there or be an expression.
+_CALL_MANY_HELPER = """globalThis.__denoSandboxCallMany = async (fn, batch) => {
+  const f = eval(fn);
+  const results = [];
+  for (const args of batch) results.push(await f(...args));
+  return results;
+}; 1"""
+
+CALL_BATCH_SIZE = 1000
+
+# NumPy dtypes that have a TypedArray counterpart, which shares their layout
+_TYPED_ARRAYS = {
+    "int8": "Int8Array",
+    "uint8": "Uint8Array",
+    "int16": "Int16Array",
+    "uint16": "Uint16Array",
+    "int32": "Int32Array",
+    "uint32": "Uint32Array",
+    "int64": "BigInt64Array",
+    "uint64": "BigUint64Array",
+    "float32": "Float32Array",
+    "float64": "Float64Array",
+}
+_DTYPES = {typed: dtype for dtype, typed in _TYPED_ARRAYS.items()}
+
+_SEND_ARRAY_SCRIPT = """const bytes = await Deno.readFile(%(path)s);
+await Deno.remove(%(path)s);
+globalThis[%(name)s] = new %(type)s(
+  bytes.byteOffset %% %(type)s.BYTES_PER_ELEMENT ? bytes.slice().buffer : bytes.buffer,
+  bytes.byteOffset %% %(type)s.BYTES_PER_ELEMENT ? 0 : bytes.byteOffset,
+  bytes.byteLength / %(type)s.BYTES_PER_ELEMENT,
+);
+Object.defineProperty(globalThis[%(name)s], "shape", { value: %(shape)s });
+1"""
+
+_EVAL_ARRAY_SCRIPT = """await (async () => {
+  const value = await (%s);
+  if (!ArrayBuffer.isView(value) || value instanceof DataView) {
+    throw new TypeError("Expected the expression to produce a TypedArray");
+  }
+  const { Buffer } = await import("node:buffer");
+  const data = Buffer.from(value.buffer, value.byteOffset, value.byteLength);
+  return [value.constructor.name, value.shape ?? null, data.toString("base64")];
+})()"""
+
+
+def _import_numpy() -> Any:
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError("Array transfer requires NumPy to be installed") from e
+    return numpy
+
+
+def _array_dtype(np: Any, typed: str) -> Any:
+    """Return the little-endian dtype matching a TypedArray type."""
+    dtype = _DTYPES.get(typed)
+    if dtype is None:
+        # e.g. Uint8ClampedArray or Float16Array
+        raise ValueError(f"No NumPy dtype matches {typed}")
+    return np.dtype(dtype).newbyteorder("<")
+
+
+def _array_payload(np: Any, array: Any) -> tuple[str, memoryview]:
+    """Return the TypedArray type matching an array and its bytes in C order."""
+    typed = _TYPED_ARRAYS.get(array.dtype.name)
+    if typed is None:
+        raise ValueError(f"No TypedArray matches dtype {array.dtype}")
+    # TypedArrays are little-endian on every platform Deno runs on
+    data = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+    # Viewing as bytes works for zero-size and 0-d arrays, unlike memoryview.cast
+    return typed, memoryview(data.reshape(-1).view(np.uint8))
 
 
 class AsyncDenoRepl(AsyncChildProcess):
+    _call_many_ready = False
+
     @classmethod
     async def create(
         cls: type["AsyncDenoRepl"],
         res: ProcessSpawnResult,
         rpc: AsyncRpcClient,
         options: RemoteProcessOptions,
-        process_list: Optional[list[AsyncChildProcess]] = None,
+        registry: Optional[dict[int, AsyncChildProcess]] = None,
     ) -> AsyncDenoRepl:
-        return create_process_like(cls, res, rpc, options, process_list)
+        return create_process_like(cls, res, rpc, options, registry)
 
     async def eval(self, code: str) -> str:
         """Evaluate code in the REPL and return the output."""
@@ -341,6 +1092,132 @@ class AsyncDenoRepl(AsyncChildProcess):
 
         return result
 
+    async def send_array(self, name: str, array: Any) -> None:
+        """Make a NumPy array available in the REPL as a TypedArray global.
+
+        The array's buffer is streamed as binary rather than encoded element by
+        element. The TypedArray is flat, in C order; the array's shape is
+        available as its `shape` property. Requires NumPy.
+
+        Args:
+            name: The name of the global to define.
+            array: The array to send. Its dtype must be a (u)int8-64 or float32/64.
+        """
+        np = _import_numpy()
+        array = np.asarray(array)
+        typed, data = _array_payload(np, array)
+
+        path = f"/tmp/.deno_sandbox_array_{uuid.uuid4().hex}"
+        stream_id, writer = await start_stream(self._rpc)
+        send = self._rpc._loop.create_task(
+            complete_stream(writer, [data], adaptive=True)
+        )
+        try:
+            try:
+                await self._rpc.call(
+                    "writeFile", {"path": path, "contentStreamId": stream_id}
+                )
+            except BaseException:
+                send.cancel()
+                await asyncio.gather(send, return_exceptions=True)
+                raise
+            await send
+
+            await self.eval(
+                _SEND_ARRAY_SCRIPT
+                % {
+                    "path": json.dumps(path),
+                    "name": json.dumps(name),
+                    "type": typed,
+                    "shape": json.dumps(list(array.shape)),
+                }
+            )
+        except BaseException:
+            # The load script removes the staging file, unless it never ran
+            try:
+                await self._rpc.call("remove", {"path": path})
+            except Exception:
+                pass
+            raise
+
+    async def eval_array(self, code: str) -> Any:
+        """Evaluate an expression that produces a TypedArray and return it as a NumPy array.
+
+        The result is a read-only view of the received bytes, reshaped if the
+        TypedArray has a `shape` property (as arrays from `send_array` do).
+        Requires NumPy.
+
+        Args:
+            code: A JavaScript expression producing a TypedArray, or a promise of one.
+        """
+        np = _import_numpy()
+        typed, shape, data = await self.eval(_EVAL_ARRAY_SCRIPT % code)
+        dtype = _array_dtype(np, typed)
+        array = np.frombuffer(binascii.a2b_base64(data), dtype=dtype)
+        return array.reshape(shape) if shape is not None else array
+
+    async def call_many(
+        self,
+        fn: str,
+        args: Iterable[Sequence[Any]],
+        *,
+        batch_size: int = CALL_BATCH_SIZE,
+    ) -> list[Any]:
+        """Call a function once per argument list, shipping the calls in batches.
+
+        Args:
+            fn: The name of a function defined in the REPL, or a JavaScript function expression.
+            args: The argument list for each call.
+            batch_size: Calls to send per round trip. Default: 1000.
+        """
+        results: list[Any] = []
+        async for batch in self._call_batches(fn, batched(args, batch_size)):
+            results.extend(batch)
+        return results
+
+    async def map(
+        self,
+        fn: str,
+        items: Iterable[Any],
+        *,
+        batch_size: int = CALL_BATCH_SIZE,
+    ) -> AsyncIterator[Any]:
+        """Apply a one-argument function to each item, yielding results as batches return.
+
+        Args:
+            fn: The name of a function defined in the REPL, or a JavaScript function expression.
+            items: The argument for each call.
+            batch_size: Calls to send per round trip. Default: 1000.
+        """
+        batches = batched(([item] for item in items), batch_size)
+        async for batch in self._call_batches(fn, batches):
+            for result in batch:
+                yield result
+
+    async def _call_batches(
+        self, fn: str, batches: Iterator[list[Sequence[Any]]]
+    ) -> AsyncIterator[list[Any]]:
+        """Run batches in order, sending the next one while the previous is evaluated."""
+        if not self._call_many_ready:
+            await self.eval(_CALL_MANY_HELPER)
+            self._call_many_ready = True
+
+        def _send(batch: list[Sequence[Any]]) -> asyncio.Task[Any]:
+            args = [fn, [list(call_args) for call_args in batch]]
+            return self._rpc._loop.create_task(self.call("__denoSandboxCallMany", args))
+
+        pending = [_send(batch) for batch in itertools.islice(batches, 2)]
+        try:
+            while pending:
+                results = await pending.pop(0)
+                if (batch := next(batches, None)) is not None:
+                    pending.append(_send(batch))
+                yield results
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
     async def close(self) -> None:
         """Close the REPL process."""
 
@@ -350,7 +1227,8 @@ class AsyncDenoRepl(AsyncChildProcess):
             self._stdout_task.cancel()
         if self._stderr_task is not None:
             self._stderr_task.cancel()
-        self._remove_from_list()
+        self._rpc._streams.release_owner(self)
+        self._unregister()
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.close()
@@ -378,6 +1256,55 @@ class DenoRepl:
         """Call a function in the REPL process."""
         return self._bridge.run(self._async.call(fn, args))
 
+    def send_array(self, name: str, array: Any) -> None:
+        """Make a NumPy array available in the REPL as a TypedArray global.
+
+        Args:
+            name: The name of the global to define.
+            array: The array to send. Its dtype must be a (u)int8-64 or float32/64.
+        """
+        self._bridge.run(self._async.send_array(name, array))
+
+    def eval_array(self, code: str) -> Any:
+        """Evaluate an expression that produces a TypedArray and return it as a NumPy array.
+
+        Args:
+            code: A JavaScript expression producing a TypedArray, or a promise of one.
+        """
+        return self._bridge.run(self._async.eval_array(code))
+
+    def call_many(
+        self,
+        fn: str,
+        args: Iterable[Sequence[Any]],
+        *,
+        batch_size: int = CALL_BATCH_SIZE,
+    ) -> list[Any]:
+        """Call a function once per argument list, shipping the calls in batches.
+
+        Args:
+            fn: The name of a function defined in the REPL, or a JavaScript function expression.
+            args: The argument list for each call.
+            batch_size: Calls to send per round trip. Default: 1000.
+        """
+        return self._bridge.run(self._async.call_many(fn, args, batch_size=batch_size))
+
+    def map(
+        self,
+        fn: str,
+        items: Iterable[Any],
+        *,
+        batch_size: int = CALL_BATCH_SIZE,
+    ) -> Iterator[Any]:
+        """Apply a one-argument function to each item, yielding results as batches return.
+
+        Args:
+            fn: The name of a function defined in the REPL, or a JavaScript function expression.
+            items: The argument for each call.
+            batch_size: Calls to send per round trip. Default: 1000.
+        """
+        return self._bridge.iterate(self._async.map(fn, items, batch_size=batch_size))
+
     def close(self) -> None:
         """Close the REPL process."""
         self._bridge.run(self._async.close())
@@ -1,9 +1,22 @@
 from __future__ import annotations
 
 import asyncio
-import base64
+import codecs
 import json
-from typing import Any, Dict, Literal, Mapping, Optional, TypedDict, cast
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    Literal,
+    Mapping,
+    Optional,
+    TypedDict,
+    Union,
+    cast,
+)
 from typing_extensions import NotRequired
 from websockets import ConnectionClosed
 
@@ -14,6 +27,7 @@ from .errors import (
     UnknownRpcMethod,
     ZodErrorRaw,
 )
+from .stream import StreamRegistry, Streamable, complete_stream, start_stream
 from .transport import WebSocketTransport
 from .utils import (
     convert_to_camel_case,
@@ -21,6 +35,12 @@ from .utils import (
     to_snake_case,
 )
 
+if TYPE_CHECKING:
+    from .bridge import AsyncBridge
+
+# Bytes read from the body stream per chunk when iterating a response
+_BODY_READ_SIZE = 64 * 1024
+
 
 class RpcRequest(TypedDict):
     id: int
@@ -46,8 +66,10 @@ class AsyncRpcClient:
         self._transport = transport
         self._id = 0
         self._pending_requests: Dict[int, asyncio.Future[Any]] = {}
+        # Run by the listener as a response arrives, before its caller resumes
+        self._response_hooks: Dict[int, Callable[[Any], None]] = {}
         self._listen_task: asyncio.Task[Any] | None = None
-        self._pending_processes: Dict[int, asyncio.StreamReader] = {}
+        self._streams = StreamRegistry()
         self.__loop: asyncio.AbstractEventLoop | None = None
         self._signal_id = 0
         self._stream_id = 0
@@ -59,20 +81,52 @@ class AsyncRpcClient:
             self.__loop = asyncio.get_running_loop()
         return self.__loop
 
+    @property
+    def buffered_amount(self) -> int:
+        """Bytes queued on the connection but not yet written to the socket."""
+        return self._transport.buffered_amount
+
     async def close(self):
         await self._transport.close()
 
-    async def send_notification(self, method: str, params: dict[str, Any]) -> None:
-        """Send a notification (no response expected)."""
+    async def send_notification(
+        self, method: str, params: dict[str, Any], lane: Optional[int] = None
+    ) -> None:
+        """Send a notification (no response expected).
+
+        Bulk stream frames pass their stream id as the lane so they are
+        scheduled fairly behind control messages (see WebSocketTransport).
+        """
         payload = {"method": method, "params": params, "jsonrpc": "2.0"}
-        await self._transport.send(json.dumps(payload))
+        await self._transport.send(json.dumps(payload), lane)
+
+    async def send_frame(
+        self, frame: Union[bytes, bytearray, memoryview], lane: Optional[int] = None
+    ) -> float:
+        """Send a pre-encoded JSON-RPC message as a text frame.
+
+        Returns the seconds spent writing it, excluding time spent queued.
+        """
+        return await self._transport.send(frame, lane)
 
     def next_stream_id(self) -> int:
         """Get next stream ID."""
         self._stream_id += 1
         return self._stream_id
 
-    async def call(self, method: str, params: Mapping[str, Any]) -> Any:
+    async def call(
+        self,
+        method: str,
+        params: Mapping[str, Any],
+        on_response: Optional[Callable[[Any], None]] = None,
+    ) -> Any:
+        """Call a method and return its result.
+
+        Args:
+            method: The RPC method.
+            params: The parameters, converted to camel case.
+            on_response: Called with the response as soon as it is received, before any message that follows it is handled.
+        """
         if self._listen_task is None or self._listen_task.done():
             self._listen_task = self._loop.create_task(self._listener())
 
@@ -86,10 +140,14 @@ class AsyncRpcClient:
 
         future = self._loop.create_future()
         self._pending_requests[req_id] = future
+        if on_response is not None:
+            self._response_hooks[req_id] = on_response
 
-        await self._transport.send(json.dumps(payload))
-
-        raw_response = await future
+        try:
+            await self._transport.send(json.dumps(payload))
+            raw_response = await future
+        finally:
+            self._response_hooks.pop(req_id, None)
         response = cast(RpcResponse, raw_response)
 
         maybeError = response.get("error")
@@ -139,6 +197,9 @@ class AsyncRpcClient:
                     future = self._pending_requests.pop(req_id)
                     if not future.done():
                         converted_data = convert_to_snake_case(data)
+                        hook = self._response_hooks.pop(req_id, None)
+                        if hook is not None:
+                            hook(converted_data)
                         future.set_result(converted_data)
 
                 elif "method" in data:
@@ -146,17 +207,11 @@ class AsyncRpcClient:
                     params = data.get("params", {})
 
                     if method == "$sandbox.stream.enqueue":
-                        stream_id = params.get("streamId")
-                        chunk = base64.b64decode(params.get("data", ""))
-                        stream = self._pending_processes.get(stream_id)
-                        if stream:
-                            stream.feed_data(chunk)
+                        self._streams.feed(
+                            params.get("streamId"), params.get("data", "")
+                        )
                     elif method == "$sandbox.stream.end":
-                        stream_id = params.get("streamId")
-                        stream = self._pending_processes.get(stream_id)
-                        if stream:
-                            stream.feed_eof()
-                            del self._pending_processes[stream_id]
+                        self._streams.end(params.get("streamId"))
 
         except ConnectionClosed:
             # Cancel all pending requests when connection closes
@@ -176,10 +231,14 @@ class AsyncRpcClient:
         headers: Optional[dict[str, str]] = None,
         redirect: Optional[Literal["follow", "manual"]] = None,
         pid: Optional[int] = None,
+        content: Optional[RequestContent] = None,
+        json_data: Any = None,
     ) -> AsyncFetchResponse:
         self._signal_id += 1
         signal_id = self._signal_id
 
+        body, headers = _request_body(content, json_data, headers)
+
         params: FetchParams = {
             "url": url,
             "method": method or "GET",
@@ -191,12 +250,71 @@ class AsyncRpcClient:
         if pid is not None:
             params["pid"] = pid
 
-        response_data = await self.call("fetch", params)
-        response = cast(FetchResponseData, response_data)
-
-        fetch_response = AsyncFetchResponse(self, response)
+        response_body = asyncio.StreamReader()
+        if body is None:
+            response_data = await self._fetch_call(params, response_body)
+        else:
+            stream_id, writer = await start_stream(self)
+            params["bodyStreamId"] = stream_id
+
+            # Send the body concurrently with the RPC call, since the
+            # server may read the request body before it responds
+            async def _send() -> None:
+                try:
+                    await complete_stream(writer, body, adaptive=True)
+                except Exception as e:
+                    await writer.error(str(e))
+
+            task = self._loop.create_task(_send())
+            try:
+                response_data = await self._fetch_call(params, response_body)
+            except BaseException as e:
+                if not task.done():
+                    # Stop the upload and tell the server the body is incomplete
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    try:
+                        await writer.error(str(e) or type(e).__name__)
+                    except Exception:
+                        pass
+                raise
+            # Take ownership of the response body before waiting for the
+            # upload, so it is released if the upload fails
+            fetch_response = AsyncFetchResponse(self, response_data, response_body)
+            try:
+                await task
+            except BaseException:
+                await fetch_response.aclose()
+                raise
+            return fetch_response
+        fetch_response = AsyncFetchResponse(self, response_data, response_body)
         return fetch_response
 
+    async def _fetch_call(
+        self, params: FetchParams, body: asyncio.StreamReader
+    ) -> FetchResponseData:
+        claimed: list[int] = []
+
+        def _claim_body(response: Any) -> None:
+            # Body chunks may follow the response in the same read, before
+            # the caller resumes, so route them to `body` right away
+            ok = (response.get("result") or {}).get("ok")
+            stream_id = ok.get("body_stream_id") if isinstance(ok, dict) else None
+            if stream_id is not None:
+                self._streams.register(stream_id, body)
+                claimed.append(stream_id)
+
+        try:
+            return cast(
+                FetchResponseData,
+                await self.call("fetch", params, on_response=_claim_body),
+            )
+        except BaseException:
+            # Nothing will read the body, so drop any of it that arrives
+            for stream_id in claimed:
+                self._streams.release(stream_id)
+            raise
+
 
 class FetchParams(TypedDict):
     method: str
@@ -205,19 +323,69 @@ class FetchParams(TypedDict):
     redirect: str
     pid: NotRequired[int | None]
     abortId: int
+    bodyStreamId: NotRequired[int]
+
+
+RequestContent = Union[str, bytes, Streamable]
+
+
+def _request_body(
+    content: Optional[RequestContent],
+    json_data: Any,
+    headers: Optional[dict[str, str]],
+) -> tuple[Optional[Streamable], Optional[dict[str, str]]]:
+    """Normalize a request body to a streamable, adding a JSON content type if needed."""
+    if content is not None and json_data is not None:
+        raise ValueError("content and json cannot both be given")
+
+    if json_data is not None:
+        content = json.dumps(json_data).encode()
+        if not any(name.lower() == "content-type" for name in headers or {}):
+            headers = {**(headers or {}), "content-type": "application/json"}
+
+    if isinstance(content, str):
+        content = content.encode()
+    if isinstance(content, bytes):
+        return iter([content] if content else []), headers
+    return content, headers
 
 
 class FetchResponseData(TypedDict):
     status: int
     status_text: str
     headers: list[tuple[str, str]]
-    body_stream_id: int
+    body_stream_id: Optional[int]
 
 
 class AsyncFetchResponse:
-    def __init__(self, rpc: AsyncRpcClient, response: FetchResponseData):
+    """The response to a fetch, with a body that is streamed on demand.
+
+    Body chunks are buffered only until they are read. Closing the response,
+    or dropping it, releases the body stream; chunks that arrive afterwards
+    are discarded without being decoded.
+    """
+
+    def __init__(
+        self,
+        rpc: AsyncRpcClient,
+        response: FetchResponseData,
+        body: Optional[asyncio.StreamReader] = None,
+    ):
         self._rpc = rpc
         self._response = response
+        self._content: Optional[bytes] = None
+        self._consumed = False
+        stream_id = response.get("body_stream_id")
+        if body is None:
+            body = asyncio.StreamReader()
+            if stream_id is not None:
+                rpc._streams.register(stream_id, body)
+        self._body = body
+        if stream_id is None:
+            self._body.feed_eof()
+        elif rpc._streams.get(stream_id) is body:
+            # Tie the stream to this response, unless it has already ended
+            rpc._streams.register(stream_id, body, self)
 
     def raise_for_status(self) -> HTTPStatusError | None:
         if self.is_success:
@@ -244,6 +412,11 @@ class AsyncFetchResponse:
     def status_code(self) -> int:
         return self._response["status"]
 
+    @property
+    def status_text(self) -> str:
+        """The reason phrase sent with the status code, e.g. "OK"."""
+        return self._response["status_text"]
+
     @property
     def is_informational(self) -> int:
         return 100 <= self.status_code <= 199
@@ -275,12 +448,112 @@ class AsyncFetchResponse:
             and "location" in self._response["headers"]
         )
 
+    @property
+    def encoding(self) -> str:
+        """The charset from the Content-Type header. Default: utf-8."""
+        for name, value in self._response["headers"]:
+            if name.lower() != "content-type":
+                continue
+            for param in value.split(";")[1:]:
+                key, _, charset = param.strip().partition("=")
+                if key.lower() == "charset" and charset:
+                    charset = charset.strip("\"'")
+                    try:
+                        return codecs.lookup(charset).name
+                    except LookupError:
+                        break
+        return "utf-8"
+
+    @property
+    def is_closed(self) -> bool:
+        """Whether the body stream has been fully read or released."""
+        return self._body.at_eof()
+
+    @property
+    def content(self) -> bytes:
+        """The body, once it has been read with `aread()`."""
+        if self._content is None:
+            raise RuntimeError("The response body has not been read; call aread()")
+        return self._content
+
+    async def aiter_bytes(
+        self, chunk_size: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """Iterate over the body as it arrives.
+
+        Args:
+            chunk_size: The maximum size of each chunk. Default: 64 KiB.
+        """
+        size = chunk_size or _BODY_READ_SIZE
+        if self._content is not None:
+            for offset in range(0, len(self._content), size):
+                yield self._content[offset : offset + size]
+            return
+
+        if self._consumed:
+            raise RuntimeError("The response body has already been consumed")
+        self._consumed = True
+        try:
+            while chunk := await self._body.read(size):
+                yield chunk
+        finally:
+            await self.aclose()
+
+    async def aiter_lines(self) -> AsyncIterator[str]:
+        """Iterate over the decoded body line by line, without line endings."""
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        pending: list[str] = []
+        async for chunk in self.aiter_bytes():
+            *lines, rest = decoder.decode(chunk).split("\n")
+            for line in lines:
+                pending.append(line)
+                yield "".join(pending).removesuffix("\r")
+                pending.clear()
+            pending.append(rest)
+
+        pending.append(decoder.decode(b"", final=True))
+        if last := "".join(pending):
+            yield last
+
+    async def aread(self) -> bytes:
+        """Read the whole body, which is then available as `content`."""
+        if self._content is None:
+            self._content = b"".join([chunk async for chunk in self.aiter_bytes()])
+        return self._content
+
+    async def text(self) -> str:
+        """Read the whole body and decode it with `encoding`."""
+        return (await self.aread()).decode(self.encoding, errors="replace")
+
+    async def json(self) -> Any:
+        """Read the whole body and parse it as JSON."""
+        return json.loads(await self.aread())
+
+    async def aclose(self) -> None:
+        """Release the body stream, discarding any of it that has not been read.
+
+        The fetch in the sandbox is not cancelled; chunks it still sends are
+        dropped without being decoded.
+        """
+        self._rpc._streams.release_owner(self)
+        if not self._body.at_eof():
+            # Drop buffered chunks along with the reader
+            self._body = asyncio.StreamReader()
+            self._body.feed_eof()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
     def __repr__(self) -> str:
         return f"<Response [{self.status_code}]>"
 
 
 class FetchResponse(AsyncFetchResponse):
-    def __init__(self, async_res: AsyncFetchResponse):
+    def __init__(self, bridge: AsyncBridge, async_res: AsyncFetchResponse):
+        self._bridge = bridge
         self._async = async_res
 
     def raise_for_status(self) -> HTTPStatusError | None:
@@ -294,6 +567,11 @@ class FetchResponse(AsyncFetchResponse):
     def status_code(self) -> int:
         return self._async.status_code
 
+    @property
+    def status_text(self) -> str:
+        """The reason phrase sent with the status code, e.g. "OK"."""
+        return self._async.status_text
+
     @property
     def is_informational(self) -> int:
         return self._async.is_informational
@@ -322,5 +600,56 @@ class FetchResponse(AsyncFetchResponse):
     def has_redirect_location(self) -> bool:
         return self._async.has_redirect_location
 
+    @property
+    def encoding(self) -> str:
+        """The charset from the Content-Type header. Default: utf-8."""
+        return self._async.encoding
+
+    @property
+    def is_closed(self) -> bool:
+        """Whether the body stream has been fully read or released."""
+        return self._async.is_closed
+
+    @property
+    def content(self) -> bytes:
+        """The body, once it has been read with `read()`."""
+        if self._async._content is None:
+            raise RuntimeError("The response body has not been read; call read()")
+        return self._async._content
+
+    def iter_bytes(self, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        """Iterate over the body as it arrives.
+
+        Args:
+            chunk_size: The maximum size of each chunk. Default: 64 KiB.
+        """
+        return self._bridge.iterate(self._async.aiter_bytes(chunk_size))
+
+    def iter_lines(self) -> Iterator[str]:
+        """Iterate over the decoded body line by line, without line endings."""
+        return self._bridge.iterate(self._async.aiter_lines())
+
+    def read(self) -> bytes:
+        """Read the whole body, which is then available as `content`."""
+        return self._bridge.run(self._async.aread())
+
+    def text(self) -> str:  # type: ignore[override]
+        """Read the whole body and decode it with `encoding`."""
+        return self._bridge.run(self._async.text())
+
+    def json(self) -> Any:  # type: ignore[override]
+        """Read the whole body and parse it as JSON."""
+        return self._bridge.run(self._async.json())
+
+    def close(self) -> None:
+        """Release the body stream, discarding any of it that has not been read."""
+        self._bridge.run(self._async.aclose())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
     def __repr__(self) -> str:
         return f"<Response [{self.status_code}]>"
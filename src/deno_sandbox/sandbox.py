@@ -1,16 +1,20 @@
 from __future__ import annotations
 
+import asyncio
 import base64
 import builtins
-from contextlib import asynccontextmanager, contextmanager
+from contextlib import asynccontextmanager, contextmanager, suppress
 from datetime import datetime, timedelta, timezone
 import json
+import tempfile
+import time
 from typing import (
     Any,
     AsyncIterator,
     BinaryIO,
     Iterable,
     Optional,
+    Sequence,
     TypedDict,
     Union,
     cast,
@@ -18,8 +22,14 @@ from typing import (
 from typing_extensions import Literal, NotRequired, TypeAlias
 import httpx
 
-from .stream import Streamable, complete_stream, start_stream
+from .stream import (
+    StreamRegistryStats,
+    Streamable,
+    complete_stream,
+    start_stream,
+)
 from .utils import convert_to_snake_case
+from .errors import ProcessAlreadyExited
 from .env import AsyncSandboxEnv, SandboxEnv
 from .fs import AsyncSandboxFs, SandboxFs
 from .process import (
@@ -27,20 +37,31 @@ from .process import (
     AsyncChildProcess,
     AsyncDenoProcess,
     AsyncDenoRepl,
+    BatchProcessResult,
+    BatchResult,
+    BatchStats,
     ChildProcess,
+    ChildProcessStatus,
+    CompletedProcess,
     DenoProcess,
     DenoRepl,
+    OutputSink,
+    ProcessInputWriter,
     ProcessSpawnResult,
     RemoteProcessOptions,
+    RingBuffer,
 )
 from .bridge import AsyncBridge
+from .cache import EvalCache
+from .pool import AsyncReplPool, ReplPool
+from .shell import AsyncShell, Shell
 from .console import (
     AsyncConsoleClient,
     AsyncPaginatedList,
     ExposeSSHResult,
     PaginatedList,
 )
-from .rpc import AsyncFetchResponse, AsyncRpcClient, FetchResponse
+from .rpc import AsyncFetchResponse, AsyncRpcClient, FetchResponse, RequestContent
 from .transport import (
     WebSocketTransport,
 )
@@ -48,8 +69,91 @@ from .options import get_sandbox_ws_url
 from .revisions import Revision
 
 
+_OUTPUT_TAIL_SIZE = 64 * 1024
+
 Mode: TypeAlias = Literal["connect", "create"]
 StdIo: TypeAlias = Literal["piped", "null"]
+Output: TypeAlias = Union[Literal["piped", "null", "inherit", "tail"], OutputSink]
+
+
+class _OutputCapture:
+    """Collects a stream in memory, spilling everything to a temporary file once
+    it grows beyond `limit` bytes. Partial output stays available if draining is
+    cancelled."""
+
+    def __init__(self, limit: Optional[int], suffix: str):
+        self.buffer = bytearray()
+        self.path: Optional[str] = None
+        self._limit = limit
+        self._suffix = suffix
+        self._spill: Optional[BinaryIO] = None
+
+    async def drain(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while chunk := await reader.read(64 * 1024):
+                if self._spill is not None:
+                    await asyncio.to_thread(self._spill.write, chunk)
+                    continue
+
+                self.buffer += chunk
+                if self._limit is not None and len(self.buffer) > self._limit:
+                    await self._start_spill()
+        finally:
+            if self._spill is not None:
+                self._spill.close()
+
+    async def _start_spill(self) -> None:
+        if self._limit is None:
+            raise RuntimeError("Output is only spilled past a limit")
+        spill = cast(
+            BinaryIO,
+            tempfile.NamedTemporaryFile(
+                prefix="deno-sandbox-", suffix=self._suffix, delete=False
+            ),
+        )
+        self._spill = spill
+        self.path = spill.name
+        await asyncio.to_thread(spill.write, self.buffer)
+        del self.buffer[self._limit :]
+
+
+def _output_options(
+    params: dict[str, Any],
+    read_size: Optional[int],
+    flush_interval: Optional[float],
+    tail_size: Optional[int] = None,
+) -> RemoteProcessOptions:
+    """Pipe inherited, tail and sink outputs, recording where the client delivers them.
+
+    The sandbox only knows "piped" and "null"; output delivered locally is piped
+    and then pumped to its destination by the process object.
+    """
+    stdout = params["stdout"]
+    stderr = params["stderr"]
+    opts = RemoteProcessOptions(
+        stdout_inherit=stdout == "inherit",
+        stderr_inherit=stderr == "inherit",
+    )
+    # Each stream gets its own buffer, so lines from the two are never spliced
+    if stdout == "tail":
+        stdout = params["stdout"] = RingBuffer(tail_size or _OUTPUT_TAIL_SIZE)
+    if stderr == "tail":
+        stderr = params["stderr"] = RingBuffer(tail_size or _OUTPUT_TAIL_SIZE)
+    if not isinstance(stdout, str):
+        opts["stdout_sink"] = stdout
+    if not isinstance(stderr, str):
+        opts["stderr_sink"] = stderr
+    if read_size is not None:
+        opts["read_size"] = read_size
+    if flush_interval is not None:
+        opts["flush_interval"] = flush_interval
+
+    if stdout == "inherit" or not isinstance(stdout, str):
+        params["stdout"] = "piped"
+    if stderr == "inherit" or not isinstance(stderr, str):
+        params["stderr"] = "piped"
+
+    return opts
 
 
 class SandboxMeta(TypedDict):
@@ -493,7 +597,7 @@ class AsyncSandboxDeno:
     def __init__(
         self,
         rpc: AsyncRpcClient,
-        processes: builtins.list[AsyncChildProcess],
+        processes: dict[int, AsyncChildProcess],
         client: AsyncConsoleClient,
         sandbox_id: str,
     ):
@@ -501,6 +605,10 @@ class AsyncSandboxDeno:
         self._processes = processes
         self._client = client
         self._sandbox_id = sandbox_id
+        self.pool = AsyncReplPool(self.repl, rpc._loop)
+        """Warm REPL processes used by `eval()`. Configure with `pool.size` and `pool.reset`."""
+        self.cache = EvalCache(scope=sandbox_id)
+        """Results of evaluations made with `cache=True`, scoped to this sandbox. Replace it to change its size or add an on-disk store."""
 
     async def run(
         self,
@@ -511,8 +619,8 @@ class AsyncSandboxDeno:
         env: Optional[dict[str, str]] = None,
         signal: Optional[AbortSignal] = None,
         stdin: Optional[Literal["piped", "null"]] = None,
-        stdout: Optional[Literal["piped", "null", "inherit"]] = None,
-        stderr: Optional[Literal["piped", "null", "inherit"]] = None,
+        stdout: Optional[Output] = None,
+        stderr: Optional[Output] = None,
         script_args: Optional[list[str]] = None,
         entrypoint: Optional[str] = None,
         code: Optional[str] = None,
@@ -520,6 +628,9 @@ class AsyncSandboxDeno:
             Literal["js", "cjs", "mjs", "ts", "cts", "mts", "jsx", "tsx"]
         ] = None,
         stdin_data: Optional[Streamable] = None,
+        output_read_size: Optional[int] = None,
+        output_flush_interval: Optional[float] = None,
+        output_tail_size: Optional[int] = None,
     ) -> AsyncDenoProcess:
         """Create a new Deno process from the specified entrypoint file or code.
 
@@ -529,14 +640,17 @@ class AsyncSandboxDeno:
             clear_env: Clear environment variables from parent process.
             env: Environment variables to pass to the subprocess.
             signal: An abort signal to cancel the process.
-            stdin: How stdin of the spawned process should be handled.
-            stdout: How stdout of the spawned process should be handled.
-            stderr: How stderr of the spawned process should be handled.
+            stdin: How stdin of the spawned process should be handled. With "piped", write to it through `process.stdin`.
+            stdout: How stdout of the spawned process should be handled: "piped", "null", "inherit", "tail" (keep only recent output), or a local sink (binary file object, os.PathLike path, asyncio.Queue, or async callback).
+            stderr: How stderr of the spawned process should be handled, as for stdout.
             script_args: Arguments to pass to the Deno runtime, available as Deno.args.
             entrypoint: A module to read from disk and execute as the entrypoint.
             code: Deno code to execute as the entrypoint.
             extension: File extension to use when executing code. Default is 'ts'.
             stdin_data: Data to write to stdin of the process.
+            output_read_size: Bytes to read per chunk when delivering output to inherit or a sink. Default: 64 KiB.
+            output_flush_interval: Seconds between flushes of file object sinks, including inherited stdout/stderr. Default: 0.05.
+            output_tail_size: Bytes of recent output to keep for each stream set to "tail", read with `process.tail()`. Default: 64 KiB.
         """
         params: dict[str, Any] = {
             "stdout": stdout if stdout is not None else "inherit",
@@ -569,21 +683,15 @@ class AsyncSandboxDeno:
 
         # If stdin data is provided, start stream first (but don't send data yet)
         stdin_writer = None
-        if stdin_data is not None:
+        if stdin_data is not None or stdin == "piped":
             params["stdin"] = "piped"
             stdin_stream_id, stdin_writer = await start_stream(self._rpc)
             params["stdinStreamId"] = stdin_stream_id
 
-        opts = RemoteProcessOptions(
-            stdout_inherit=params["stdout"] == "inherit",
-            stderr_inherit=params["stderr"] == "inherit",
+        opts = _output_options(
+            params, output_read_size, output_flush_interval, output_tail_size
         )
 
-        if params["stdout"] == "inherit":
-            params["stdout"] = "piped"
-        if params["stderr"] == "inherit":
-            params["stderr"] = "piped"
-
         result = await self._rpc.call("spawnDeno", params)
 
         # Now that process is spawned, complete the stdin stream
@@ -593,14 +701,69 @@ class AsyncSandboxDeno:
         process = await AsyncDenoProcess.create(
             result, self._rpc, opts, self._processes
         )
-        self._processes.append(process)
+        if stdin_writer is not None and stdin_data is None:
+            process.stdin = ProcessInputWriter(stdin_writer)
+        self._processes[process.pid] = process
         return process
 
-    async def eval(self, code: str) -> Any:
-        repl = await self.repl()
-        result = await repl.eval(code)
-        await repl.close()
-        return result
+    async def eval(
+        self, code: str, *, stateless: bool = False, cache: bool = False
+    ) -> Any:
+        """Evaluate code in a warm REPL from `pool` and return the result.
+
+        A stateful evaluation may change the sandbox, so it invalidates `cache`.
+        Call `cache.invalidate()` after changing the sandbox in other ways.
+
+        Args:
+            code: The code to evaluate.
+            stateless: The code has no side effects, e.g. a pure expression, so its REPL can be reused without a reset.
+            cache: The code is deterministic, so its result can be reused from `cache`. Implies stateless.
+        """
+        if cache:
+            key = self.cache.key(code)
+            result = self.cache.get(key, EvalCache.MISSING)
+            if result is EvalCache.MISSING:
+                result = await self.pool.eval(code, stateless=True)
+                self.cache.put(key, result)
+            return result
+
+        try:
+            return await self.pool.eval(code, stateless=stateless)
+        finally:
+            if not stateless:
+                self.cache.invalidate()
+
+    async def call(
+        self,
+        fn: str,
+        args: builtins.list[Any],
+        *,
+        stateless: bool = False,
+        cache: bool = False,
+    ) -> Any:
+        """Call a function in a warm REPL from `pool` and return the result.
+
+        Args:
+            fn: A JavaScript function expression, or the name of a global function.
+            args: The JSON-serializable arguments to call it with.
+            stateless: The call has no side effects, so its REPL can be reused without a reset.
+            cache: The function is deterministic, so its result for these arguments can be reused from `cache`. Implies stateless.
+        """
+        if cache:
+            key = self.cache.key(fn, args)
+            result = self.cache.get(key, EvalCache.MISSING)
+            if result is EvalCache.MISSING:
+                async with self.pool.acquire(stateless=True) as repl:
+                    result = await repl.call(fn, args)
+                self.cache.put(key, result)
+            return result
+
+        try:
+            async with self.pool.acquire(stateless=stateless) as repl:
+                return await repl.call(fn, args)
+        finally:
+            if not stateless:
+                self.cache.invalidate()
 
     async def repl(
         self,
@@ -658,7 +821,7 @@ class AsyncSandboxDeno:
         result: ProcessSpawnResult = await self._rpc.call("spawnDenoRepl", params)
 
         process = await AsyncDenoRepl.create(result, self._rpc, opts, self._processes)
-        self._processes.append(process)
+        self._processes[process.pid] = process
         return process
 
     async def deploy(
@@ -741,15 +904,15 @@ class SandboxDeno:
         self,
         rpc: AsyncRpcClient,
         bridge: AsyncBridge,
-        processes: builtins.list[AsyncChildProcess],
-        client: AsyncConsoleClient,
-        sandbox_id: str,
+        async_deno: AsyncSandboxDeno,
     ):
         self._rpc = rpc
         self._bridge = bridge
-        self._client = client
+        self._client = async_deno._client
 
-        self._async = AsyncSandboxDeno(rpc, processes, client, sandbox_id)
+        self._async = async_deno
+        self.pool = ReplPool(bridge, async_deno.pool)
+        """Warm REPL processes used by `eval()`. Configure with `pool.size` and `pool.reset`."""
 
     def run(
         self,
@@ -760,8 +923,8 @@ class SandboxDeno:
         env: Optional[dict[str, str]] = None,
         signal: Optional[AbortSignal] = None,
         stdin: Optional[Literal["piped", "null"]] = None,
-        stdout: Optional[Literal["piped", "null", "inherit"]] = None,
-        stderr: Optional[Literal["piped", "null", "inherit"]] = None,
+        stdout: Optional[Output] = None,
+        stderr: Optional[Output] = None,
         script_args: Optional[builtins.list[str]] = None,
         entrypoint: Optional[str] = None,
         code: Optional[str] = None,
@@ -769,6 +932,9 @@ class SandboxDeno:
             Literal["js", "cjs", "mjs", "ts", "cts", "mts", "jsx", "tsx"]
         ] = None,
         stdin_data: Optional[Union[Iterable[bytes], BinaryIO]] = None,
+        output_read_size: Optional[int] = None,
+        output_flush_interval: Optional[float] = None,
+        output_tail_size: Optional[int] = None,
     ) -> DenoProcess:
         """Create a new Deno process from the specified entrypoint file or code.
 
@@ -778,14 +944,17 @@ class SandboxDeno:
             clear_env: Clear environment variables from parent process.
             env: Environment variables to pass to the subprocess.
             signal: An abort signal to cancel the process.
-            stdin: How stdin of the spawned process should be handled.
-            stdout: How stdout of the spawned process should be handled.
-            stderr: How stderr of the spawned process should be handled.
+            stdin: How stdin of the spawned process should be handled. With "piped", write to it through `process.stdin`.
+            stdout: How stdout of the spawned process should be handled: "piped", "null", "inherit", "tail" (keep only recent output), or a local sink (binary file object, os.PathLike path, asyncio.Queue, or async callback).
+            stderr: How stderr of the spawned process should be handled, as for stdout.
             script_args: Arguments to pass to the Deno runtime, available as Deno.args.
             entrypoint: A module to read from disk and execute as the entrypoint.
             code: Deno code to execute as the entrypoint.
             extension: File extension to use when executing code. Default is 'ts'.
             stdin_data: Data to write to stdin of the process.
+            output_read_size: Bytes to read per chunk when delivering output to inherit or a sink. Default: 64 KiB.
+            output_flush_interval: Seconds between flushes of file object sinks, including inherited stdout/stderr. Default: 0.05.
+            output_tail_size: Bytes of recent output to keep for each stream set to "tail", read with `process.tail()`. Default: 64 KiB.
         """
         async_deno = self._bridge.run(
             self._async.run(
@@ -802,12 +971,56 @@ class SandboxDeno:
                 code=code,
                 extension=extension,
                 stdin_data=stdin_data,
+                output_read_size=output_read_size,
+                output_flush_interval=output_flush_interval,
+                output_tail_size=output_tail_size,
             )
         )
         return DenoProcess(self._rpc, self._bridge, async_deno)
 
-    def eval(self, code: str) -> Any:
-        return self._bridge.run(self._async.eval(code))
+    @property
+    def cache(self) -> EvalCache:
+        """Results of evaluations made with `cache=True`, scoped to this sandbox. Replace it to change its size or add an on-disk store."""
+        return self._async.cache
+
+    @cache.setter
+    def cache(self, value: EvalCache) -> None:
+        self._async.cache = value
+
+    def eval(self, code: str, *, stateless: bool = False, cache: bool = False) -> Any:
+        """Evaluate code in a warm REPL from `pool` and return the result.
+
+        A stateful evaluation may change the sandbox, so it invalidates `cache`.
+        Call `cache.invalidate()` after changing the sandbox in other ways.
+
+        Args:
+            code: The code to evaluate.
+            stateless: The code has no side effects, e.g. a pure expression, so its REPL can be reused without a reset.
+            cache: The code is deterministic, so its result can be reused from `cache`. Implies stateless.
+        """
+        return self._bridge.run(
+            self._async.eval(code, stateless=stateless, cache=cache)
+        )
+
+    def call(
+        self,
+        fn: str,
+        args: builtins.list[Any],
+        *,
+        stateless: bool = False,
+        cache: bool = False,
+    ) -> Any:
+        """Call a function in a warm REPL from `pool` and return the result.
+
+        Args:
+            fn: A JavaScript function expression, or the name of a global function.
+            args: The JSON-serializable arguments to call it with.
+            stateless: The call has no side effects, so its REPL can be reused without a reset.
+            cache: The function is deterministic, so its result for these arguments can be reused from `cache`. Implies stateless.
+        """
+        return self._bridge.run(
+            self._async.call(fn, args, stateless=stateless, cache=cache)
+        )
 
     def repl(
         self,
@@ -912,13 +1125,13 @@ class AsyncSandbox:
     ):
         self._client = client
         self._rpc = rpc
-        self._processes: builtins.list[AsyncChildProcess] = []
+        self._processes: dict[int, AsyncChildProcess] = {}
 
         self.url: str | None = None
         self.ssh: None = None
         self.id = sandbox_id
         self.trace_id: str | None = trace_id
-        self.fs = AsyncSandboxFs(rpc)
+        self.fs = AsyncSandboxFs(rpc, self._connect_fs, self._processes)
         self.deno = AsyncSandboxDeno(rpc, self._processes, client, sandbox_id)
         self.env = AsyncSandboxEnv(rpc)
 
@@ -926,6 +1139,13 @@ class AsyncSandbox:
     def closed(self) -> bool:
         return self._rpc._transport.closed
 
+    @asynccontextmanager
+    async def _connect_fs(self) -> AsyncIterator[AsyncSandboxFs]:
+        """Open an additional connection to this sandbox, used for striped transfers."""
+        api = AsyncSandboxApi(self._client)
+        async with api.connect(self.id, debug=self._rpc._debug) as sandbox:
+            yield sandbox.fs
+
     async def spawn(
         self,
         command: str,
@@ -936,9 +1156,12 @@ class AsyncSandbox:
         env: Optional[dict[str, str]] = None,
         signal: Optional[AbortSignal] = None,
         stdin: Optional[Literal["piped", "null"]] = None,
-        stdout: Optional[Literal["piped", "null", "inherit"]] = None,
-        stderr: Optional[Literal["piped", "null", "inherit"]] = None,
+        stdout: Optional[Output] = None,
+        stderr: Optional[Output] = None,
         stdin_data: Optional[Streamable] = None,
+        output_read_size: Optional[int] = None,
+        output_flush_interval: Optional[float] = None,
+        output_tail_size: Optional[int] = None,
     ) -> AsyncChildProcess:
         """Spawn a new child process.
 
@@ -949,10 +1172,13 @@ class AsyncSandbox:
             clear_env: Clear environment variables from parent process.
             env: Environment variables to pass to the subprocess.
             signal: An abort signal to cancel the process.
-            stdin: How stdin of the spawned process should be handled.
-            stdout: How stdout of the spawned process should be handled.
-            stderr: How stderr of the spawned process should be handled.
+            stdin: How stdin of the spawned process should be handled. With "piped", write to it through `process.stdin`.
+            stdout: How stdout of the spawned process should be handled: "piped", "null", "inherit", "tail" (keep only recent output), or a local sink (binary file object, os.PathLike path, asyncio.Queue, or async callback).
+            stderr: How stderr of the spawned process should be handled, as for stdout.
             stdin_data: Data to write to stdin of the process.
+            output_read_size: Bytes to read per chunk when delivering output to inherit or a sink. Default: 64 KiB.
+            output_flush_interval: Seconds between flushes of file object sinks, including inherited stdout/stderr. Default: 0.05.
+            output_tail_size: Bytes of recent output to keep for each stream set to "tail", read with `process.tail()`. Default: 64 KiB.
         """
         params: dict[str, Any] = {
             "command": command,
@@ -975,21 +1201,15 @@ class AsyncSandbox:
 
         # If stdin data is provided, start stream first (but don't send data yet)
         stdin_writer = None
-        if stdin_data is not None:
+        if stdin_data is not None or stdin == "piped":
             params["stdin"] = "piped"
             stdin_stream_id, stdin_writer = await start_stream(self._rpc)
             params["stdinStreamId"] = stdin_stream_id
 
-        opts = RemoteProcessOptions(
-            stdout_inherit=params["stdout"] == "inherit",
-            stderr_inherit=params["stderr"] == "inherit",
+        opts = _output_options(
+            params, output_read_size, output_flush_interval, output_tail_size
         )
 
-        if params["stdout"] == "inherit":
-            params["stdout"] = "piped"
-        if params["stderr"] == "inherit":
-            params["stderr"] = "piped"
-
         result: ProcessSpawnResult = await self._rpc.call("spawn", params)
 
         # Now that process is spawned, complete the stdin stream
@@ -999,9 +1219,226 @@ class AsyncSandbox:
         process = await AsyncChildProcess.create(
             result, self._rpc, opts, self._processes
         )
-        self._processes.append(process)
+        if stdin_writer is not None and stdin_data is None:
+            process.stdin = ProcessInputWriter(stdin_writer)
+        self._processes[process.pid] = process
         return process
 
+    async def run(
+        self,
+        command: str,
+        args: Optional[list[str]] = None,
+        *,
+        capture: bool = True,
+        timeout: Optional[float] = None,
+        max_output: Optional[int] = None,
+        cwd: Optional[str] = None,
+        clear_env: Optional[bool] = None,
+        env: Optional[dict[str, str]] = None,
+        stdin_data: Optional[Streamable] = None,
+    ) -> CompletedProcess:
+        """Run a command to completion and return its exit status and output.
+
+        Args:
+            command: The command to execute.
+            args: Arguments to pass to the process.
+            capture: Collect stdout and stderr into the result. When false, output is inherited. Default: true.
+            timeout: Seconds to wait before killing the process. Default: no timeout.
+            max_output: Bytes of each stream to keep in memory. Larger output is written in full to a local temporary file, see stdout_path/stderr_path. Default: unlimited.
+            cwd: The working directory of the process.
+            clear_env: Clear environment variables from parent process.
+            env: Environment variables to pass to the subprocess.
+            stdin_data: Data to write to stdin of the process.
+        """
+        output: Literal["piped", "inherit"] = "piped" if capture else "inherit"
+        process = await self.spawn(
+            command,
+            args=args,
+            cwd=cwd,
+            clear_env=clear_env,
+            env=env,
+            stdout=output,
+            stderr=output,
+            stdin_data=stdin_data,
+        )
+
+        stdout = _OutputCapture(max_output, ".stdout")
+        stderr = _OutputCapture(max_output, ".stderr")
+        drains: builtins.list[asyncio.Task[None]] = []
+        if capture:
+            drains.append(self._rpc._loop.create_task(stdout.drain(process.stdout)))
+            drains.append(self._rpc._loop.create_task(stderr.drain(process.stderr)))
+
+        timed_out = False
+        finished = False
+        try:
+            try:
+                status = await asyncio.wait_for(process.wait(), timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+                await process.kill()
+                status = ChildProcessStatus(success=False, code=-1, signal=None)
+            finished = True
+
+            if drains:
+                # Output sent before the exit may still be in flight; after a kill
+                # the streams might never end, so only wait briefly for them
+                await asyncio.wait(drains, timeout=1 if timed_out else None)
+        finally:
+            if not finished:
+                # Failed or cancelled while the process ran, e.g. by run_many
+                with suppress(ProcessAlreadyExited):
+                    await process.kill()
+            for task in drains:
+                task.cancel()
+            await asyncio.gather(*drains, return_exceptions=True)
+
+        return CompletedProcess(
+            success=status["success"],
+            code=None if timed_out else status["code"],
+            signal=status["signal"],
+            stdout=bytes(stdout.buffer),
+            stderr=bytes(stderr.buffer),
+            stdout_path=stdout.path,
+            stderr_path=stderr.path,
+            timed_out=timed_out,
+        )
+
+    async def shell(
+        self,
+        *,
+        cwd: Optional[str] = None,
+        env: Optional[dict[str, str]] = None,
+    ) -> AsyncShell:
+        """Start a persistent bash session for running many commands cheaply.
+
+        Args:
+            cwd: The initial working directory of the session.
+            env: Environment variables to pass to the session.
+        """
+
+        async def _spawn() -> AsyncChildProcess:
+            return await self.spawn(
+                "bash",
+                args=["--noprofile", "--norc"],
+                cwd=cwd,
+                env=env,
+                stdin="piped",
+                stdout="piped",
+                stderr="piped",
+            )
+
+        shell = AsyncShell(_spawn)
+        await shell.start()
+        return shell
+
+    async def run_many(
+        self,
+        commands: Iterable[Union[str, Sequence[str]]],
+        *,
+        concurrency: int = 8,
+        order: Literal["submission", "completion"] = "submission",
+        capture: bool = True,
+        timeout: Optional[float] = None,
+        max_output: Optional[int] = None,
+        cwd: Optional[str] = None,
+        clear_env: Optional[bool] = None,
+        env: Optional[dict[str, str]] = None,
+    ) -> BatchResult:
+        """Run many commands, at most `concurrency` at a time, and collect their results.
+
+        A command that cannot be run, such as one that does not exist, gets a
+        failed result with its `error` set rather than aborting the batch.
+
+        Args:
+            commands: The commands to run, each a command name or a sequence of the command and its arguments.
+            concurrency: The maximum number of commands running at once. Default: 8.
+            order: Return results in "submission" order or in "completion" order. Default: "submission".
+            capture: Collect stdout and stderr into each result. When false, output is inherited. Default: true.
+            timeout: Seconds to wait before killing each process. Default: no timeout.
+            max_output: Bytes of each stream to keep in memory per command, as for `run()`. Default: unlimited.
+            cwd: The working directory of the processes.
+            clear_env: Clear environment variables from parent process.
+            env: Environment variables to pass to the subprocesses.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+
+        argvs = [[c] if isinstance(c, str) else list(c) for c in commands]
+        pending = iter(enumerate(argvs))
+        results: builtins.list[BatchProcessResult] = []
+
+        async def _worker() -> None:
+            # Workers pull from a shared iterator, so only `concurrency` tasks
+            # exist however many commands are submitted
+            for index, argv in pending:
+                started = time.perf_counter()
+                error: Optional[Exception] = None
+                try:
+                    result = await self.run(
+                        argv[0],
+                        argv[1:],
+                        capture=capture,
+                        timeout=timeout,
+                        max_output=max_output,
+                        cwd=cwd,
+                        clear_env=clear_env,
+                        env=env,
+                    )
+                except Exception as e:
+                    # One command failing to spawn must not lose the other results
+                    error = e
+                    result = CompletedProcess(
+                        success=False,
+                        code=None,
+                        signal=None,
+                        stdout=b"",
+                        stderr=b"",
+                        stdout_path=None,
+                        stderr_path=None,
+                        timed_out=False,
+                    )
+                duration = time.perf_counter() - started
+                item = {
+                    **result,
+                    "index": index,
+                    "args": argv,
+                    "duration": duration,
+                    "error": error,
+                }
+                results.append(cast(BatchProcessResult, item))
+
+        started = time.perf_counter()
+        workers = [
+            self._rpc._loop.create_task(_worker())
+            for _ in range(min(concurrency, len(argvs)))
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        wall_seconds = time.perf_counter() - started
+
+        if order == "submission":
+            results.sort(key=lambda r: r["index"])
+
+        durations = [r["duration"] for r in results]
+        succeeded = sum(1 for r in results if r["success"])
+        stats = BatchStats(
+            total=len(results),
+            succeeded=succeeded,
+            failed=len(results) - succeeded,
+            timed_out=sum(1 for r in results if r["timed_out"]),
+            errored=sum(1 for r in results if r["error"] is not None),
+            wall_seconds=wall_seconds,
+            process_seconds=sum(durations),
+            mean_seconds=sum(durations) / len(durations) if durations else 0.0,
+            max_seconds=max(durations, default=0.0),
+        )
+        return BatchResult(results=results, stats=stats)
+
     async def fetch(
         self,
         url: str,
@@ -1009,19 +1446,49 @@ class AsyncSandbox:
         method: Optional[str] = "GET",
         headers: Optional[dict[str, str]] = None,
         redirect: Optional[Literal["follow", "manual"]] = None,
+        content: Optional[RequestContent] = None,
+        json: Any = None,
     ) -> AsyncFetchResponse:
-        return await self._rpc.fetch(url, method, headers, redirect)
+        """Fetch a URL from inside the sandbox.
 
-    async def close(self) -> None:
-        # Kill all tracked processes
-        for process in self._processes:
-            await process.kill()
+        Args:
+            url: The URL to fetch.
+            method: The HTTP method. Default: GET.
+            headers: Request headers.
+            redirect: Whether to follow redirects. Default: follow.
+            content: The request body: bytes, a str (sent as UTF-8), or a sync/async iterable or file object streamed to the sandbox.
+            json: A value to send as a JSON body, with a JSON content type unless one is given.
+        """
+        return await self._rpc.fetch(
+            url, method, headers, redirect, None, content, json
+        )
+
+    async def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Kill all running processes concurrently, then close the connection.
+
+        Args:
+            timeout: Seconds to wait for the processes to be killed before closing anyway. None waits indefinitely. Default: 5.
+        """
+        # Pooled REPLs are in the registry, so they are killed with everything else
+        self.deno.pool.shutdown()
+        processes = list(self._processes.values())
         self._processes.clear()
+        if processes:
+            kills = [self._rpc._loop.create_task(p.kill()) for p in processes]
+            _, pending = await asyncio.wait(kills, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            # Failing to kill one process must not keep the connection open
+            await asyncio.gather(*kills, return_exceptions=True)
         await self._rpc.close()
 
     async def kill(self) -> None:
         await self._client.delete(f"/api/v3/sandboxes/{self.id}")
 
+    def stream_stats(self) -> StreamRegistryStats:
+        """Counts and buffered bytes of incoming streams, for diagnosing leaked readers."""
+        return self._rpc._streams.stats()
+
     async def extend_timeout(self, additional_s: int) -> datetime:
         """Request to extend the timeout of the sandbox by the specified duration.
         You can at max extend timeout of a sandbox by 30 minutes at once.
@@ -1113,10 +1580,10 @@ class Sandbox:
         self.ssh: None = None
         self.id = async_sandbox.id
         self.trace_id: str | None = async_sandbox.trace_id
-        self.fs = SandboxFs(rpc, bridge)
-        self.deno = SandboxDeno(
-            rpc, bridge, self._async._processes, client, async_sandbox.id
+        self.fs = SandboxFs(
+            rpc, bridge, async_sandbox._connect_fs, async_sandbox._processes
         )
+        self.deno = SandboxDeno(rpc, bridge, async_sandbox.deno)
         self.env = SandboxEnv(rpc, bridge)
 
     @property
@@ -1133,9 +1600,12 @@ class Sandbox:
         env: Optional[dict[str, str]] = None,
         signal: Optional[AbortSignal] = None,
         stdin: Optional[Literal["piped", "null"]] = None,
-        stdout: Optional[Literal["piped", "null", "inherit"]] = None,
-        stderr: Optional[Literal["piped", "null", "inherit"]] = None,
+        stdout: Optional[Output] = None,
+        stderr: Optional[Output] = None,
         stdin_data: Optional[Union[Iterable[bytes], BinaryIO]] = None,
+        output_read_size: Optional[int] = None,
+        output_flush_interval: Optional[float] = None,
+        output_tail_size: Optional[int] = None,
     ) -> ChildProcess:
         """Spawn a new child process.
 
@@ -1146,10 +1616,13 @@ class Sandbox:
             clear_env: Clear environment variables from parent process.
             env: Environment variables to pass to the subprocess.
             signal: An abort signal to cancel the process.
-            stdin: How stdin of the spawned process should be handled.
-            stdout: How stdout of the spawned process should be handled.
-            stderr: How stderr of the spawned process should be handled.
+            stdin: How stdin of the spawned process should be handled. With "piped", write to it through `process.stdin`.
+            stdout: How stdout of the spawned process should be handled: "piped", "null", "inherit", "tail" (keep only recent output), or a local sink (binary file object, os.PathLike path, asyncio.Queue, or async callback).
+            stderr: How stderr of the spawned process should be handled, as for stdout.
             stdin_data: Data to write to stdin of the process.
+            output_read_size: Bytes to read per chunk when delivering output to inherit or a sink. Default: 64 KiB.
+            output_flush_interval: Seconds between flushes of file object sinks, including inherited stdout/stderr. Default: 0.05.
+            output_tail_size: Bytes of recent output to keep for each stream set to "tail", read with `process.tail()`. Default: 64 KiB.
         """
         async_child = self._bridge.run(
             self._async.spawn(
@@ -1163,10 +1636,111 @@ class Sandbox:
                 stdout=stdout,
                 stderr=stderr,
                 stdin_data=stdin_data,
+                output_read_size=output_read_size,
+                output_flush_interval=output_flush_interval,
+                output_tail_size=output_tail_size,
             )
         )
         return ChildProcess(self._rpc, self._bridge, async_child)
 
+    def run(
+        self,
+        command: str,
+        args: Optional[builtins.list[str]] = None,
+        *,
+        capture: bool = True,
+        timeout: Optional[float] = None,
+        max_output: Optional[int] = None,
+        cwd: Optional[str] = None,
+        clear_env: Optional[bool] = None,
+        env: Optional[dict[str, str]] = None,
+        stdin_data: Optional[Union[Iterable[bytes], BinaryIO]] = None,
+    ) -> CompletedProcess:
+        """Run a command to completion and return its exit status and output.
+
+        Args:
+            command: The command to execute.
+            args: Arguments to pass to the process.
+            capture: Collect stdout and stderr into the result. When false, output is inherited. Default: true.
+            timeout: Seconds to wait before killing the process. Default: no timeout.
+            max_output: Bytes of each stream to keep in memory. Larger output is written in full to a local temporary file, see stdout_path/stderr_path. Default: unlimited.
+            cwd: The working directory of the process.
+            clear_env: Clear environment variables from parent process.
+            env: Environment variables to pass to the subprocess.
+            stdin_data: Data to write to stdin of the process.
+        """
+        return self._bridge.run(
+            self._async.run(
+                command,
+                args,
+                capture=capture,
+                timeout=timeout,
+                max_output=max_output,
+                cwd=cwd,
+                clear_env=clear_env,
+                env=env,
+                stdin_data=stdin_data,
+            )
+        )
+
+    def shell(
+        self,
+        *,
+        cwd: Optional[str] = None,
+        env: Optional[dict[str, str]] = None,
+    ) -> Shell:
+        """Start a persistent bash session for running many commands cheaply.
+
+        Args:
+            cwd: The initial working directory of the session.
+            env: Environment variables to pass to the session.
+        """
+        async_shell = self._bridge.run(self._async.shell(cwd=cwd, env=env))
+        return Shell(self._bridge, async_shell)
+
+    def run_many(
+        self,
+        commands: Iterable[Union[str, Sequence[str]]],
+        *,
+        concurrency: int = 8,
+        order: Literal["submission", "completion"] = "submission",
+        capture: bool = True,
+        timeout: Optional[float] = None,
+        max_output: Optional[int] = None,
+        cwd: Optional[str] = None,
+        clear_env: Optional[bool] = None,
+        env: Optional[dict[str, str]] = None,
+    ) -> BatchResult:
+        """Run many commands, at most `concurrency` at a time, and collect their results.
+
+        A command that cannot be run, such as one that does not exist, gets a
+        failed result with its `error` set rather than aborting the batch.
+
+        Args:
+            commands: The commands to run, each a command name or a sequence of the command and its arguments.
+            concurrency: The maximum number of commands running at once. Default: 8.
+            order: Return results in "submission" order or in "completion" order. Default: "submission".
+            capture: Collect stdout and stderr into each result. When false, output is inherited. Default: true.
+            timeout: Seconds to wait before killing each process. Default: no timeout.
+            max_output: Bytes of each stream to keep in memory per command, as for `run()`. Default: unlimited.
+            cwd: The working directory of the processes.
+            clear_env: Clear environment variables from parent process.
+            env: Environment variables to pass to the subprocesses.
+        """
+        return self._bridge.run(
+            self._async.run_many(
+                commands,
+                concurrency=concurrency,
+                order=order,
+                capture=capture,
+                timeout=timeout,
+                max_output=max_output,
+                cwd=cwd,
+                clear_env=clear_env,
+                env=env,
+            )
+        )
+
     def fetch(
         self,
         url: str,
@@ -1174,18 +1748,39 @@ class Sandbox:
         method: Optional[str] = "GET",
         headers: Optional[dict[str, str]] = None,
         redirect: Optional[Literal["follow", "manual"]] = None,
+        content: Optional[RequestContent] = None,
+        json: Any = None,
     ) -> FetchResponse:
+        """Fetch a URL from inside the sandbox.
+
+        Args:
+            url: The URL to fetch.
+            method: The HTTP method. Default: GET.
+            headers: Request headers.
+            redirect: Whether to follow redirects. Default: follow.
+            content: The request body: bytes, a str (sent as UTF-8), or a sync/async iterable or file object streamed to the sandbox.
+            json: A value to send as a JSON body, with a JSON content type unless one is given.
+        """
         async_response = self._bridge.run(
-            self._rpc.fetch(url, method, headers, redirect, None)
+            self._rpc.fetch(url, method, headers, redirect, None, content, json)
         )
-        return FetchResponse(async_response)
+        return FetchResponse(self._bridge, async_response)
 
-    def close(self) -> None:
-        self._bridge.run(self._async.close())
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Kill all running processes concurrently, then close the connection.
+
+        Args:
+            timeout: Seconds to wait for the processes to be killed before closing anyway. None waits indefinitely. Default: 5.
+        """
+        self._bridge.run(self._async.close(timeout))
 
     def kill(self) -> None:
         self._bridge.run(self._async.kill())
 
+    def stream_stats(self) -> StreamRegistryStats:
+        """Counts and buffered bytes of incoming streams, for diagnosing leaked readers."""
+        return self._async.stream_stats()
+
     def extend_timeout(self, additional_s: int) -> datetime:
         """Request to extend the timeout of the sandbox by the specified duration.
         You can at max extend timeout of a sandbox by 30 minutes at once.
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import asyncio
+import secrets
+from typing import Awaitable, Callable, Optional, TypedDict
+
+from .bridge import AsyncBridge
+from .process import AsyncChildProcess
+
+_READ_SIZE = 64 * 1024
+
+
+class ShellResult(TypedDict):
+    """The result of running a command in a shell session."""
+
+    success: bool
+    """Whether the command exited with a zero exit code."""
+
+    code: Optional[int]
+    """The exit code, or None if the command timed out."""
+
+    stdout: bytes
+    """The command's stdout."""
+
+    stderr: bytes
+    """The command's stderr."""
+
+    timed_out: bool
+    """Whether the command exceeded its timeout, which ends the session."""
+
+
+def _quote(command: str) -> bytes:
+    return ("'" + command.replace("'", "'\\''") + "'").encode()
+
+
+class _FramedReader:
+    """Reads a process output stream up to sentinel tokens."""
+
+    def __init__(self, reader: asyncio.StreamReader):
+        self._reader = reader
+        self._buffer = bytearray()
+        self.eof = False
+
+    async def read_until(self, token: bytes) -> tuple[bytes, bytes]:
+        """Return the output before `token` and the rest of the token's line.
+
+        At EOF, returns everything left and an empty trailer.
+        """
+        searched = 0
+        while (index := self._buffer.find(token, searched)) == -1 or (
+            newline := self._buffer.find(b"\n", index + len(token))
+        ) == -1:
+            if index == -1:
+                # The token may straddle the next chunk
+                searched = max(0, len(self._buffer) - len(token) + 1)
+            chunk = await self._reader.read(_READ_SIZE)
+            if not chunk:
+                self.eof = True
+                output = bytes(self._buffer)
+                self._buffer.clear()
+                return output, b""
+            self._buffer += chunk
+
+        output = bytes(self._buffer[:index])
+        trailer = bytes(self._buffer[index + len(token) : newline])
+        del self._buffer[: newline + 1]
+        return output, trailer
+
+    def partial(self) -> bytes:
+        return bytes(self._buffer)
+
+
+class AsyncShell:
+    """A long-lived bash session that runs commands one after another.
+
+    Each command is written to the shell's stdin followed by sentinel
+    markers on stdout and stderr that carry its exit status, so a command
+    costs one write instead of a spawn, two stream setups and a wait. The
+    working directory and environment persist between commands.
+
+    A command that times out, is cancelled or fails, or one that exits the
+    shell, ends the session; the next command starts a fresh one.
+    """
+
+    def __init__(self, spawn: Callable[[], Awaitable[AsyncChildProcess]]):
+        self._spawn = spawn
+        self._process: Optional[AsyncChildProcess] = None
+        self._stdout: Optional[_FramedReader] = None
+        self._stderr: Optional[_FramedReader] = None
+        self._token = f"__deno_sandbox_{secrets.token_hex(8)}__".encode()
+        self._lock = asyncio.Lock()
+        self._closed = False
+
+    @property
+    def pid(self) -> Optional[int]:
+        """The pid of the shell process, if a session is running."""
+        return self._process.pid if self._process is not None else None
+
+    async def start(self) -> None:
+        """Start the shell process, if it is not already running."""
+        if self._closed:
+            raise RuntimeError("Shell is closed")
+        if self._process is None:
+            process = await self._spawn()
+            if self._closed:
+                await process.kill()
+                raise RuntimeError("Shell is closed")
+            self._process = process
+            self._stdout = _FramedReader(self._process.stdout)
+            self._stderr = _FramedReader(self._process.stderr)
+
+    async def run(
+        self, command: str, *, timeout: Optional[float] = None
+    ) -> ShellResult:
+        """Run a command in the session and return its exit status and output.
+
+        Args:
+            command: The shell command to run. It reads stdin from /dev/null.
+            timeout: Seconds to wait for the command before killing the session. Default: no timeout.
+        """
+        async with self._lock:
+            await self.start()
+            process = self._process
+            if (
+                process is None
+                or process.stdin is None
+                or self._stdout is None
+                or self._stderr is None
+            ):
+                # close() ended the session while it was starting
+                raise RuntimeError("Shell is closed")
+
+            # eval keeps a malformed command from swallowing the sentinels
+            token = self._token
+            try:
+                process.stdin.write(
+                    b"eval "
+                    + _quote(command)
+                    + b" </dev/null; printf '%s%d\\n' '"
+                    + token
+                    + b"' \"$?\"; printf '%s\\n' '"
+                    + token
+                    + b"' >&2\n"
+                )
+                await process.stdin.drain()
+                (stdout, status), (stderr, _) = await asyncio.wait_for(
+                    asyncio.gather(
+                        self._stdout.read_until(token),
+                        self._stderr.read_until(token),
+                    ),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                stdout, stderr = self._stdout.partial(), self._stderr.partial()
+                await self._end_session()
+                return ShellResult(
+                    success=False,
+                    code=None,
+                    stdout=stdout,
+                    stderr=stderr,
+                    timed_out=True,
+                )
+            except BaseException:
+                # The command may still be running, and its output would be
+                # read as the next command's
+                await self._end_session()
+                raise
+
+            if self._stdout.eof:
+                # The command exited the shell
+                exit_status = await process.wait()
+                self._process = None
+                code = exit_status["code"]
+            else:
+                code = int(status)
+
+            return ShellResult(
+                success=code == 0,
+                code=code,
+                stdout=stdout,
+                stderr=stderr,
+                timed_out=False,
+            )
+
+    async def _end_session(self) -> None:
+        if self._process is not None:
+            process, self._process = self._process, None
+            await process.kill()
+
+    async def close(self) -> None:
+        """End the session and kill the shell process."""
+        self._closed = True
+        await self._end_session()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class Shell:
+    def __init__(self, bridge: AsyncBridge, async_shell: AsyncShell):
+        self._bridge = bridge
+        self._async = async_shell
+
+    @property
+    def pid(self) -> Optional[int]:
+        """The pid of the shell process, if a session is running."""
+        return self._async.pid
+
+    def run(self, command: str, *, timeout: Optional[float] = None) -> ShellResult:
+        """Run a command in the session and return its exit status and output.
+
+        Args:
+            command: The shell command to run. It reads stdin from /dev/null.
+            timeout: Seconds to wait for the command before killing the session. Default: no timeout.
+        """
+        return self._bridge.run(self._async.run(command, timeout=timeout))
+
+    def close(self) -> None:
+        """End the session and kill the shell process."""
+        self._bridge.run(self._async.close())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._bridge.run(self._async.__aexit__(exc_type, exc_val, exc_tb))
@@ -1,13 +1,132 @@
 from __future__ import annotations
 
-import base64
-from typing import TYPE_CHECKING, AsyncIterable, BinaryIO, Iterable, Union
+import asyncio
+import binascii
+import mmap
+import os
+import stat
+import time
+import weakref
+import zlib
+from contextlib import aclosing
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    BinaryIO,
+    Callable,
+    Iterable,
+    Optional,
+    TypedDict,
+    Union,
+    cast,
+)
+from typing_extensions import Literal, TypeAlias
 
 if TYPE_CHECKING:
     from .rpc import AsyncRpcClient
 
 Streamable = Union[AsyncIterable[bytes], Iterable[bytes], BinaryIO]
 
+Compression: TypeAlias = Literal["gzip", "deflate"]
+
+# zlib window bits selecting the gzip (RFC 1952) or zlib (RFC 1950) container,
+# matching what CompressionStream/DecompressionStream expect in the sandbox.
+_WBITS = {"gzip": 31, "deflate": 15}
+
+# Content that compresses to more than this fraction of its size is sent as is
+_COMPRESSIBLE_RATIO = 0.9
+_SAMPLE_SIZE = 64 * 1024
+
+
+class StreamMetrics(TypedDict):
+    bytes: int
+    """The number of payload bytes sent."""
+
+    chunks: int
+    """The number of enqueue messages sent."""
+
+    read_seconds: float
+    """Time spent waiting for the source to produce data."""
+
+    send_seconds: float
+    """Time spent encoding and sending data."""
+
+    chunk_size: int
+    """The chunk size in use when the stream finished."""
+
+
+def add_metrics(total: StreamMetrics, metrics: StreamMetrics) -> None:
+    """Add the metrics of one stream to a running total, in place."""
+    total["bytes"] += metrics["bytes"]
+    total["chunks"] += metrics["chunks"]
+    total["read_seconds"] += metrics["read_seconds"]
+    total["send_seconds"] += metrics["send_seconds"]
+    total["chunk_size"] = max(total["chunk_size"], metrics["chunk_size"])
+
+
+def empty_metrics() -> StreamMetrics:
+    return StreamMetrics(
+        bytes=0, chunks=0, read_seconds=0.0, send_seconds=0.0, chunk_size=0
+    )
+
+
+ChunkSize = Union[int, Callable[[], int]]
+
+
+class AdaptiveChunkSize:
+    """Tunes the stream chunk size from send throughput and outbound queue depth.
+
+    Chunks are sized to occupy the connection for about `target_seconds`: fast
+    links get fewer, larger frames, while slow or congested links keep frames
+    small so RPCs sharing the connection are not stuck behind them.
+    """
+
+    def __init__(
+        self,
+        initial: int = 64 * 1024,
+        *,
+        minimum: int = 16 * 1024,
+        maximum: int = 1024 * 1024,
+        target_seconds: float = 0.02,
+    ):
+        self.size = max(minimum, min(maximum, initial))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_seconds = target_seconds
+        self._throughput: Optional[float] = None
+
+    def observe(self, sent: int, seconds: float, buffered: int) -> None:
+        """Record that `sent` bytes took `seconds` to send, leaving `buffered` bytes queued."""
+        if seconds > 0:
+            rate = sent / seconds
+            if self._throughput is None:
+                self._throughput = rate
+            else:
+                self._throughput = 0.8 * self._throughput + 0.2 * rate
+
+        size = self.size
+        if self._throughput is not None:
+            # Grow at most 2x per chunk to avoid oscillating on noisy samples
+            size = min(int(self._throughput * self.target_seconds), self.size * 2)
+        if buffered > self.size:
+            # The socket is backing up: the link, not frame overhead, is the limit
+            size = min(size, self.size // 2)
+
+        self.size = max(self.minimum, min(self.maximum, size))
+
+
+# The enqueue notification is framed around the base64 payload by hand, so a
+# chunk is encoded straight into a reusable buffer instead of going through
+# b64encode, str.decode, json.dumps and str.encode in turn.
+_ENQUEUE_PREFIX = (
+    b'{"method":"$sandbox.stream.enqueue","params":{"streamId":%d,"data":"'
+)
+_ENQUEUE_SUFFIX = b'"},"jsonrpc":"2.0"}'
+# A multiple of 3, so blocks encode without padding and concatenate cleanly
+_ENCODE_BLOCK_SIZE = 48 * 1024
+
 
 class AsyncStreamWriter:
     """Manages writing a stream to the server."""
@@ -15,6 +134,13 @@ class AsyncStreamWriter:
     def __init__(self, rpc: AsyncRpcClient, stream_id: int):
         self._rpc = rpc
         self._stream_id = stream_id
+        self._prefix = _ENQUEUE_PREFIX % stream_id
+        self._frame = bytearray()
+
+    @property
+    def buffered_amount(self) -> int:
+        """Bytes queued on the connection but not yet written to the socket."""
+        return self._rpc.buffered_amount
 
     async def start(self) -> None:
         """Send $sandbox.stream.start message."""
@@ -22,31 +148,170 @@ class AsyncStreamWriter:
             "$sandbox.stream.start", {"streamId": self._stream_id}
         )
 
-    async def enqueue(self, data: bytes) -> None:
-        """Send $sandbox.stream.enqueue message with base64-encoded data."""
-        await self._rpc.send_notification(
-            "$sandbox.stream.enqueue",
-            {
-                "streamId": self._stream_id,
-                "data": base64.b64encode(data).decode("ascii"),
-            },
-        )
+    async def enqueue(self, data: Union[bytes, bytearray, memoryview]) -> float:
+        """Send $sandbox.stream.enqueue message with base64-encoded data.
+
+        Calls must not overlap, since each one reuses the same frame buffer.
+        Returns the seconds spent writing the frame, excluding time spent queued.
+        """
+        frame = self._encode_enqueue(data)
+        try:
+            return await self._rpc.send_frame(frame, self._stream_id)
+        finally:
+            frame.release()
+
+    def _encode_enqueue(self, data: Union[bytes, bytearray, memoryview]) -> memoryview:
+        source = memoryview(data).cast("B")
+        start = len(self._prefix)
+        end = start + 4 * -(-len(source) // 3)
+        size = end + len(_ENQUEUE_SUFFIX)
+        if len(self._frame) < size:
+            self._frame = bytearray(size)
+
+        # Writing through a memoryview copies in place; assigning bytes to a
+        # bytearray slice would first copy them into a temporary bytearray.
+        frame = memoryview(self._frame)
+        frame[:start] = self._prefix
+        # Encode in blocks so only a small temporary exists at any time
+        position = start
+        for offset in range(0, len(source), _ENCODE_BLOCK_SIZE):
+            block = binascii.b2a_base64(
+                source[offset : offset + _ENCODE_BLOCK_SIZE], newline=False
+            )
+            frame[position : position + len(block)] = block
+            position += len(block)
+        frame[end:size] = _ENQUEUE_SUFFIX
+        source.release()
+        return frame[:size]
 
     async def end(self) -> None:
         """Send $sandbox.stream.end message."""
         await self._rpc.send_notification(
-            "$sandbox.stream.end", {"streamId": self._stream_id}
+            "$sandbox.stream.end", {"streamId": self._stream_id}, self._stream_id
         )
 
     async def error(self, message: str) -> None:
         """Send $sandbox.stream.error message."""
         await self._rpc.send_notification(
-            "$sandbox.stream.error", {"streamId": self._stream_id, "error": message}
+            "$sandbox.stream.error",
+            {"streamId": self._stream_id, "error": message},
+            self._stream_id,
+        )
+
+
+class StreamRegistryStats(TypedDict):
+    open: int
+    """The number of incoming streams still registered."""
+
+    buffered_bytes: int
+    """Bytes received on registered streams that have not been read yet."""
+
+    by_owner: dict[str, int]
+    """Registered streams per owner type, e.g. {"AsyncChildProcess": 2}."""
+
+    dropped_chunks: int
+    """Chunks received for streams that were already released."""
+
+    dropped_bytes: int
+    """Payload bytes of the dropped chunks."""
+
+
+class StreamRegistry:
+    """Tracks the readers of incoming streams, and the objects that own them.
+
+    A stream is released when it ends, when its owner releases it (e.g. on
+    kill or close), or when the owner is garbage collected. Released readers
+    get EOF so nothing waits on them forever, and chunks that arrive for them
+    afterwards are dropped without being decoded.
+    """
+
+    def __init__(self) -> None:
+        self._readers: dict[int, asyncio.StreamReader] = {}
+        self._owner_types: dict[int, str] = {}
+        # Keyed by id(owner); each finalizer is detached once its streams are released
+        self._owned: dict[int, tuple[list[int], weakref.finalize]] = {}
+        self.dropped_chunks = 0
+        self.dropped_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._readers)
+
+    def get(self, stream_id: int) -> Optional[asyncio.StreamReader]:
+        return self._readers.get(stream_id)
+
+    def register(
+        self, stream_id: int, reader: asyncio.StreamReader, owner: Any = None
+    ) -> None:
+        """Route incoming data for `stream_id` to `reader`, optionally tied to `owner`."""
+        self._readers[stream_id] = reader
+        if owner is None:
+            return
+
+        self._owner_types[stream_id] = type(owner).__name__
+        key = id(owner)
+        if key in self._owned:
+            self._owned[key][0].append(stream_id)
+        else:
+            finalizer = weakref.finalize(owner, self._release_key, key)
+            self._owned[key] = ([stream_id], finalizer)
+
+    def feed(self, stream_id: int, data: str) -> None:
+        """Feed a base64 encoded chunk to the stream's reader, or drop it."""
+        reader = self._readers.get(stream_id)
+        if reader is None:
+            self.dropped_chunks += 1
+            padding = 2 if data.endswith("==") else 1 if data.endswith("=") else 0
+            self.dropped_bytes += len(data) * 3 // 4 - padding
+            return
+        # a2b_base64 takes the ASCII str as is, unlike b64decode which first
+        # copies it into a bytes object
+        reader.feed_data(binascii.a2b_base64(data))
+
+    def end(self, stream_id: int) -> None:
+        """Signal EOF to the stream's reader and release it."""
+        self.release(stream_id)
+
+    def release(self, stream_id: int) -> None:
+        reader = self._readers.pop(stream_id, None)
+        self._owner_types.pop(stream_id, None)
+        if reader is not None and not reader.at_eof():
+            reader.feed_eof()
+
+    def release_owner(self, owner: Any) -> None:
+        """Release every stream registered to `owner`."""
+        self._release_key(id(owner))
+
+    def _release_key(self, key: int) -> None:
+        entry = self._owned.pop(key, None)
+        if entry is None:
+            return
+        stream_ids, finalizer = entry
+        finalizer.detach()
+        for stream_id in stream_ids:
+            self.release(stream_id)
+
+    def stats(self) -> StreamRegistryStats:
+        by_owner: dict[str, int] = {}
+        for owner_type in self._owner_types.values():
+            by_owner[owner_type] = by_owner.get(owner_type, 0) + 1
+        return StreamRegistryStats(
+            open=len(self._readers),
+            buffered_bytes=sum(
+                len(getattr(reader, "_buffer", b""))
+                for reader in self._readers.values()
+            ),
+            by_owner=by_owner,
+            dropped_chunks=self.dropped_chunks,
+            dropped_bytes=self.dropped_bytes,
         )
 
 
 async def stream_data(
-    rpc: AsyncRpcClient, data: Streamable, chunk_size: int = 64 * 1024
+    rpc: AsyncRpcClient,
+    data: Streamable,
+    chunk_size: int = 64 * 1024,
+    *,
+    adaptive: bool = False,
 ) -> int:
     """
     Stream data to server. Returns stream_id.
@@ -57,7 +322,7 @@ async def stream_data(
     stream_id, writer = await start_stream(rpc)
 
     try:
-        await complete_stream(writer, data, chunk_size)
+        await complete_stream(writer, data, chunk_size, adaptive=adaptive)
         return stream_id
 
     except Exception as e:
@@ -78,31 +343,72 @@ async def start_stream(rpc: AsyncRpcClient) -> tuple[int, AsyncStreamWriter]:
 
 
 async def complete_stream(
-    writer: AsyncStreamWriter, data: Streamable, chunk_size: int = 64 * 1024
-) -> None:
+    writer: AsyncStreamWriter,
+    data: Streamable,
+    chunk_size: int = 64 * 1024,
+    *,
+    use_mmap: bool = False,
+    adaptive: bool = False,
+) -> StreamMetrics:
     """
     Complete a stream by sending all data and the end notification.
 
     Should be called after start_stream() and after any RPC calls that need the stream_id.
+    File-like sources are read in a worker thread, one chunk ahead of the chunk being
+    sent. With use_mmap, regular files are instead memory-mapped and sent as
+    memoryview slices, which avoids copying each chunk out of the page cache.
+    With adaptive, chunk_size is only the starting point: it is tuned while sending
+    (see AdaptiveChunkSize), and chunks larger than the current size are split.
     """
-    if hasattr(data, "read"):
-        # File-like object
+    chunker = AdaptiveChunkSize(chunk_size) if adaptive else None
+    size: ChunkSize = (lambda: chunker.size) if chunker is not None else chunk_size
+    metrics = StreamMetrics(
+        bytes=0, chunks=0, read_seconds=0.0, send_seconds=0.0, chunk_size=chunk_size
+    )
+
+    if use_mmap and _is_regular_file(data):
+        source = _mmap_chunks(cast(BinaryIO, data), size)
+    else:
+        source = iter_chunks(data, size)
+
+    async def _send(chunk: Union[bytes, memoryview]) -> None:
+        started = time.perf_counter()
+        written = await writer.enqueue(chunk)
+        metrics["send_seconds"] += time.perf_counter() - started
+        metrics["bytes"] += len(chunk)
+        metrics["chunks"] += 1
+        if chunker is not None:
+            # Tune on write time only: time queued behind other lanes reflects
+            # contention, which the scheduler already shares fairly
+            chunker.observe(len(chunk), written, writer.buffered_amount)
+
+    async with aclosing(source) as chunks:
         while True:
-            chunk = data.read(chunk_size)  # type: ignore[union-attr]
-            if not chunk:
+            started = time.perf_counter()
+            try:
+                chunk = await chunks.__anext__()
+            except StopAsyncIteration:
                 break
-            await writer.enqueue(chunk)
-    elif hasattr(data, "__aiter__"):
-        # Async iterable
-        async for chunk in data:  # type: ignore[union-attr]
-            await writer.enqueue(chunk)
-    else:
-        # Sync iterable
-        for chunk in data:
-            await writer.enqueue(chunk)
+            metrics["read_seconds"] += time.perf_counter() - started
+
+            if chunker is None or len(chunk) <= chunker.size:
+                await _send(chunk)
+                continue
+
+            view = memoryview(chunk)
+            offset = 0
+            while offset < len(view):
+                piece = view[offset : offset + chunker.size]
+                offset += len(piece)
+                await _send(piece)
 
     await writer.end()
 
+    if chunker is not None:
+        metrics["chunk_size"] = chunker.size
+
+    return metrics
+
 
 def is_streamable(obj: object) -> bool:
     """Check if object is streamable (not bytes)."""
@@ -111,3 +417,131 @@ def is_streamable(obj: object) -> bool:
         or hasattr(obj, "__aiter__")
         or (hasattr(obj, "__iter__") and not isinstance(obj, (bytes, str, dict, list)))
     )
+
+
+async def iter_chunks(
+    data: Streamable, chunk_size: ChunkSize = 64 * 1024
+) -> AsyncIterator[bytes]:
+    """Iterate over any streamable as an async iterator of byte chunks.
+
+    File-like objects are read in a worker thread so slow disks do not block the
+    event loop, with the next read already running while a chunk is consumed.
+    """
+    if hasattr(data, "read"):
+        file = cast(BinaryIO, data)
+        loop = asyncio.get_running_loop()
+        pending = loop.run_in_executor(None, file.read, _resolve(chunk_size))
+        try:
+            while True:
+                chunk = await pending
+                if not chunk:
+                    break
+                pending = loop.run_in_executor(None, file.read, _resolve(chunk_size))
+                yield chunk
+        finally:
+            # Never leave a read running against a file the caller may close next
+            await asyncio.wait([pending])
+            if not pending.cancelled():
+                pending.exception()
+    elif hasattr(data, "__aiter__"):
+        async for chunk in data:  # type: ignore[union-attr]
+            yield chunk
+    else:
+        for chunk in data:  # type: ignore[union-attr]
+            yield chunk
+
+
+def _resolve(chunk_size: ChunkSize) -> int:
+    return chunk_size if isinstance(chunk_size, int) else chunk_size()
+
+
+def _is_regular_file(data: Streamable) -> bool:
+    try:
+        fileno = data.fileno()  # type: ignore[union-attr]
+        return stat.S_ISREG(os.fstat(fileno).st_mode)
+    except (AttributeError, OSError, ValueError):
+        return False
+
+
+async def _mmap_chunks(
+    file: BinaryIO, chunk_size: ChunkSize
+) -> AsyncIterator[memoryview]:
+    start = file.tell()
+    size = os.fstat(file.fileno()).st_size
+    if start >= size:
+        return
+
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+            offset = start
+            while offset < size:
+                chunk = view[offset : offset + _resolve(chunk_size)]
+                offset += len(chunk)
+                try:
+                    yield chunk
+                finally:
+                    chunk.release()
+        finally:
+            view.release()
+            file.seek(size)
+
+
+async def compress_chunks(
+    chunks: AsyncIterable[bytes], compression: Compression
+) -> AsyncIterator[bytes]:
+    """Compress chunks incrementally, off the event loop."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, _WBITS[compression])
+    async for chunk in chunks:
+        compressed = await asyncio.to_thread(compressor.compress, chunk)
+        if compressed:
+            yield compressed
+
+    yield compressor.flush()
+
+
+async def decompress_chunks(
+    chunks: AsyncIterable[bytes], compression: Compression
+) -> AsyncIterator[bytes]:
+    """Decompress chunks incrementally, off the event loop."""
+    decompressor = zlib.decompressobj(_WBITS[compression])
+    async for chunk in chunks:
+        decompressed = await asyncio.to_thread(decompressor.decompress, chunk)
+        if decompressed:
+            yield decompressed
+
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+
+async def sample_compression(
+    chunks: AsyncIterator[bytes], compression: Compression
+) -> tuple[Optional[Compression], AsyncIterator[bytes]]:
+    """Decide whether compressing is worthwhile from a sample of the leading data.
+
+    Returns the compression to use (None for already-compressed content) and an
+    iterator that still yields every chunk, including the sampled ones.
+    """
+    sampled: list[bytes] = []
+    size = 0
+    async for chunk in chunks:
+        sampled.append(chunk)
+        size += len(chunk)
+        if size >= _SAMPLE_SIZE:
+            break
+
+    sample = b"".join(sampled)[:_SAMPLE_SIZE]
+    chosen: Optional[Compression] = compression
+    if sample:
+        compressed = await asyncio.to_thread(zlib.compress, sample, 1)
+        if len(compressed) > len(sample) * _COMPRESSIBLE_RATIO:
+            chosen = None
+
+    async def _replay() -> AsyncIterator[bytes]:
+        for chunk in sampled:
+            yield chunk
+        async for chunk in chunks:
+            yield chunk
+
+    return chosen, _replay()
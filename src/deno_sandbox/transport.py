@@ -1,5 +1,10 @@
 from __future__ import annotations
 
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Optional, Union
+
 from websockets import ClientConnection, ConnectionClosed, connect
 from httpx import URL
 
@@ -51,16 +56,43 @@ def get_close_code_description(code: int) -> str:
         return f"Unknown code ({code})"
 
 
+# Each frame's future resolves to the seconds spent writing it to the connection
+_Frame = tuple[Union[str, bytes, bytearray, memoryview], "asyncio.Future[float]"]
+
+
 class WebSocketTransport:
+    """WebSocket connection with prioritised, fair outgoing message scheduling.
+
+    Outgoing messages are written by a single writer task. Control messages
+    (RPC requests and notifications) always go first; stream frames are queued
+    per lane and taken round-robin, one frame per lane at a time, so a large
+    upload cannot starve RPCs or other streams sharing the connection.
+    """
+
     def __init__(self, debug: bool = False) -> None:
         self._ws: ClientConnection | None = None
         self._closed = False
         self._debug = debug
+        self._control: deque[_Frame] = deque()
+        self._lanes: OrderedDict[int, deque[_Frame]] = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._writer_task: asyncio.Task[None] | None = None
+        self._sending: Optional[_Frame] = None
 
     @property
     def closed(self) -> bool:
         return self._closed
 
+    @property
+    def buffered_amount(self) -> int:
+        """The number of bytes queued for sending but not yet written to the socket."""
+        if self._ws is None:
+            return 0
+        try:
+            return self._ws.transport.get_write_buffer_size()
+        except (AttributeError, NotImplementedError):
+            return 0
+
     async def connect(self, url: URL, headers: dict[str, str]) -> ClientConnection:
         try:
             ws = await connect(str(url), additional_headers=headers)
@@ -74,10 +106,79 @@ class WebSocketTransport:
 
             raise e
 
-    async def send(self, data: str) -> None:
+    async def send(
+        self,
+        data: Union[str, bytes, bytearray, memoryview],
+        lane: Optional[int] = None,
+    ) -> float:
+        """Send a message, returning once it has been written to the connection.
+
+        Returns the seconds spent writing the message, excluding the time it
+        waited in the queue behind other messages.
+
+        Args:
+            data: The message to send. Bytes must be UTF-8 encoded text; every message is sent as a text frame.
+            lane: The stream lane to queue the message on, or None for a control message. Messages on the same lane are sent in order.
+        """
         if self._ws is None:
             raise RuntimeError("WebSocket is not connected")
-        await self._ws.send(data)
+
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.get_running_loop().create_task(self._writer())
+
+        future: asyncio.Future[float] = asyncio.get_running_loop().create_future()
+        if lane is None:
+            self._control.append((data, future))
+        else:
+            self._lanes.setdefault(lane, deque()).append((data, future))
+        self._wakeup.set()
+
+        return await future
+
+    def _next_frame(self) -> Optional[_Frame]:
+        if self._control:
+            return self._control.popleft()
+
+        if not self._lanes:
+            return None
+
+        lane, frames = next(iter(self._lanes.items()))
+        frame = frames.popleft()
+        if frames:
+            self._lanes.move_to_end(lane)
+        else:
+            del self._lanes[lane]
+        return frame
+
+    async def _writer(self) -> None:
+        ws = self._ws
+        if ws is None:
+            self._fail_pending(RuntimeError("WebSocket is not connected"))
+            return
+        while True:
+            frame = self._next_frame()
+            if frame is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            data, future = frame
+            if future.done():
+                # The sender was cancelled before its turn came
+                continue
+
+            self._sending = frame
+            started = time.perf_counter()
+            try:
+                await ws.send(data, text=True)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(time.perf_counter() - started)
+            finally:
+                self._sending = None
 
     async def close(self) -> None:
         self._closed = True
@@ -85,6 +186,30 @@ class WebSocketTransport:
         if self._ws is not None:
             await self._ws.close()
 
+        error: Exception
+        if self._ws is not None and self._ws.protocol.close_exc is not None:
+            error = self._ws.protocol.close_exc
+        else:
+            error = RuntimeError("WebSocket is closed")
+
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            self._writer_task = None
+        self._fail_pending(error)
+
+    def _fail_pending(self, error: Exception) -> None:
+        """Fail the message being written and every queued message with `error`."""
+        pending = [self._sending] if self._sending is not None else []
+        self._sending = None
+        pending.extend(self._control)
+        for frames in self._lanes.values():
+            pending.extend(frames)
+        self._control.clear()
+        self._lanes.clear()
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(error)
+
     async def __aexit__(self):
         await self.close()
 
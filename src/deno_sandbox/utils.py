@@ -1,4 +1,7 @@
 import re
+from typing import Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
 
 
 def to_camel_case(snake_str):
@@ -28,6 +31,18 @@ def convert_to_snake_case(data):
         return data
 
 
+def batched(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Split items into lists of `size`, the last of which may be shorter."""
+    batch: list[T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
 def parse_link_header(header: str) -> dict[str, str]:
     links = {}
     parts = header.split(",")
@@ -39,3 +54,134 @@ def parse_link_header(header: str) -> dict[str, str]:
         name = section[1].strip().split("=")[1][1:-1]
         links[name] = url
     return links
+
+
+def _find_closing(text: str, start: int, open_char: str, close_char: str) -> int:
+    depth = 0
+    i = start
+    while i < len(text):
+        c = text[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == open_char:
+            depth += 1
+        elif c == close_char:
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return -1
+
+
+def split_glob(glob: str, sep: str) -> list[str]:
+    """Split a glob on `sep`, ignoring separators nested in (), {} or []."""
+    parts = []
+    depth = 0
+    current = ""
+    i = 0
+    while i < len(glob):
+        c = glob[i]
+        if c == "\\" and i + 1 < len(glob):
+            current += glob[i : i + 2]
+            i += 2
+            continue
+        if c in "({[":
+            depth += 1
+        elif c in ")}]" and depth > 0:
+            depth -= 1
+        if c == sep and depth == 0:
+            parts.append(current)
+            current = ""
+        else:
+            current += c
+        i += 1
+    parts.append(current)
+    return parts
+
+
+def is_glob(text: str) -> bool:
+    """Whether the string contains any glob syntax."""
+    return re.search(r"[*?\[\]{}()!]", text) is not None
+
+
+def _translate_glob_segment(segment: str, extended: bool) -> str:
+    out = []
+    i = 0
+    n = len(segment)
+    while i < n:
+        c = segment[i]
+        if extended and c in "?*+@!" and i + 1 < n and segment[i + 1] == "(":
+            end = _find_closing(segment, i + 1, "(", ")")
+            if end != -1:
+                alternatives = "|".join(
+                    _translate_glob_segment(p, extended)
+                    for p in split_glob(segment[i + 2 : end], "|")
+                )
+                group = f"(?:{alternatives})"
+                if c == "!":
+                    # The negation has to see the rest of the segment, otherwise
+                    # `!(foo).ts` would still match `foo.ts`.
+                    rest = _translate_glob_segment(segment[end + 1 :], extended)
+                    out.append(f"(?!{group}{rest}(?:/|$))[^/]*{rest}")
+                    return "".join(out)
+                else:
+                    out.append(group + {"?": "?", "*": "*", "+": "+", "@": ""}[c])
+                i = end + 1
+                continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[" and extended and segment.find("]", i + 2) != -1:
+            end = segment.find("]", i + 2)
+            body = segment[i + 1 : end].replace("\\", "\\\\")
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append(f"[{body}]")
+            i = end + 1
+            continue
+        elif c == "{" and _find_closing(segment, i, "{", "}") != -1:
+            end = _find_closing(segment, i, "{", "}")
+            alternatives = "|".join(
+                _translate_glob_segment(p, extended)
+                for p in split_glob(segment[i + 1 : end], ",")
+            )
+            out.append(f"(?:{alternatives})")
+            i = end + 1
+            continue
+        elif c == "\\" and i + 1 < n:
+            out.append(re.escape(segment[i + 1]))
+            i += 2
+            continue
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def glob_to_regex(
+    glob: str,
+    *,
+    extended: bool = True,
+    globstar: bool = True,
+    case_insensitive: bool = False,
+) -> re.Pattern[str]:
+    """Translate a glob into a regular expression matching whole paths."""
+    segments = split_glob(glob, "/")
+    parts: list[str] = []
+    for i, segment in enumerate(segments):
+        last = i == len(segments) - 1
+        if globstar and segment == "**":
+            if not last:
+                parts.append("(?:.*/)?")
+            elif parts and parts[-1].endswith("/"):
+                parts[-1] = parts[-1][:-1]
+                parts.append("(?:/.*)?")
+            else:
+                parts.append(".*")
+            continue
+        parts.append(_translate_glob_segment(segment, extended) + ("" if last else "/"))
+
+    flags = re.IGNORECASE if case_insensitive else 0
+    return re.compile("^" + "".join(parts) + "/*$", flags)
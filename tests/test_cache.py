@@ -0,0 +1,79 @@
+from deno_sandbox.cache import EvalCache
+
+
+def test_eval_cache_lru():
+    cache = EvalCache(max_entries=2)
+
+    a, b, c = cache.key("a"), cache.key("b"), cache.key("c")
+    cache.put(a, [1])
+    cache.put(b, None)
+    assert cache.get(a) == [1]
+    cache.put(c, 3)
+
+    # b was the least recently used
+    assert cache.get(b, "missing") == "missing"
+    assert cache.get(c) == 3
+
+    result = cache.get(a)
+    result.append(2)
+    assert cache.get(a) == [1]
+
+    assert cache.key("f", [1, {"x": 2}]) != cache.key("f", [1, {"x": 3}])
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["misses"] == 1
+
+
+def test_eval_cache_invalidate(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = EvalCache(max_entries=0, path=path, scope="sandbox-a")
+
+    key = cache.key("1 + 1")
+    cache.put(key, 2)
+    assert cache.get(key) == 2
+    assert cache.stats()["disk_hits"] == 1
+    cache.close()
+
+    # Results survive in the backing store, but only within their scope
+    cache = EvalCache(path=path, scope="sandbox-a")
+    assert cache.get(cache.key("1 + 1")) == 2
+    other = EvalCache(path=path, scope="sandbox-b")
+    assert other.get(other.key("1 + 1"), EvalCache.MISSING) is EvalCache.MISSING
+    other.put(other.key("1 + 1"), 2)
+
+    cache.invalidate()
+    assert cache.epoch == 1
+    assert cache.get(key) is None
+    assert cache.get(cache.key("1 + 1")) is None
+
+    # A result computed before an invalidation is not stored
+    cache.put(key, 2)
+    assert cache.stats()["entries"] == 0
+    cache.close()
+
+    # Invalidating one scope leaves the others' results alone
+    assert other.epoch == 0
+    assert other.get(other.key("1 + 1")) == 2
+    other.close()
+
+    # A cache sharing the scope picks up the epoch from the backing store
+    cache = EvalCache(path=path, scope="sandbox-a")
+    assert cache.epoch == 1
+    assert cache.get(key) is None
+    cache.close()
+
+
+def test_eval_cache_default_scope(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    first = EvalCache(max_entries=0, path=path)
+    second = EvalCache(path=path)
+    assert first.scope != second.scope
+
+    first.put(first.key("1 + 1"), 2)
+    assert second.get(second.key("1 + 1")) is None
+    second.invalidate()
+    assert first.get(first.key("1 + 1")) == 2
+    first.close()
+    second.close()
@@ -1,5 +1,14 @@
+import asyncio
+import base64
+import json
+
+import httpx
 import pytest
 
+from deno_sandbox.httpx_transport import SandboxTransport
+from deno_sandbox.process import _array_dtype, _array_payload
+from deno_sandbox.rpc import AsyncRpcClient
+
 
 @pytest.mark.asyncio(loop_scope="session")
 async def test_repl_eval_async(async_shared_sandbox):
@@ -97,3 +106,369 @@ def test_deno_run_http_ready_sync(shared_sandbox):
 
         headers = dict(res.headers)
         assert headers["content-type"] == "text/plain;charset=UTF-8"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_deno_run_tail_async(async_shared_sandbox):
+    sb = async_shared_sandbox
+
+    cp = await sb.deno.run(
+        code="for (let i = 0; i < 1000; i++) { console.log(i); console.error(`e${i}`) }",
+        stdout="tail",
+        stderr="tail",
+        output_tail_size=64,
+    )
+    await cp.wait()
+
+    assert cp.tail_lines(3) == ["997", "998", "999"]
+    assert cp.tail(4) == b"999\n"
+    assert len(cp.tail()) == 64
+    assert cp.tail_lines(2, stream="stderr") == ["e998", "e999"]
+
+
+def test_deno_run_tail_sync(shared_sandbox):
+    sb = shared_sandbox
+
+    cp = sb.deno.run(code="console.log('a'); console.log('b')", stdout="tail")
+    cp.wait()
+
+    assert cp.tail_lines(1) == ["b"]
+    assert cp.tail() == b"a\nb\n"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_repl_pool_async(async_shared_sandbox):
+    sb = async_shared_sandbox
+
+    assert await sb.deno.eval("1 + 1", stateless=True) == 2
+    assert await sb.deno.eval("1 + 2", stateless=True) == 3
+    assert sb.deno.pool.metrics()["hits"] >= 1
+
+    # Stateful evaluations run in a REPL that is then replaced
+    await sb.deno.eval("globalThis.leaked = 1; 1")
+    assert await sb.deno.eval("typeof globalThis.leaked") == "undefined"
+
+
+def test_repl_pool_sync(shared_sandbox):
+    sb = shared_sandbox
+
+    sb.deno.pool.size = 1
+    results = [sb.deno.eval(f"{i} * 2", stateless=True) for i in range(5)]
+    assert results == [0, 2, 4, 6, 8]
+
+    metrics = sb.deno.pool.metrics()
+    assert metrics["evals"] >= 5
+    assert sb.deno.pool.health_check() == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_repl_call_many_async(async_shared_sandbox):
+    sb = async_shared_sandbox
+
+    async with await sb.deno.repl() as repl:
+        await repl.eval("const add = (a, b) => a + b; 1")
+
+        results = await repl.call_many(
+            "add", [[i, i] for i in range(250)], batch_size=100
+        )
+        assert results == [2 * i for i in range(250)]
+
+        squares = [x async for x in repl.map("(x) => x * x", range(10), batch_size=3)]
+        assert squares == [i * i for i in range(10)]
+
+    results = await sb.deno.pool.call_many(
+        "Math.max", [[i, 5] for i in range(10)], batch_size=2, concurrency=2
+    )
+    assert results == [max(i, 5) for i in range(10)]
+
+
+def test_repl_call_many_sync(shared_sandbox):
+    sb = shared_sandbox
+
+    with sb.deno.repl() as repl:
+        assert repl.call_many("(s) => s.toUpperCase()", [["a"], ["b"]]) == ["A", "B"]
+
+    assert list(sb.deno.pool.map("(x) => x + 1", range(5), batch_size=2)) == [
+        1,
+        2,
+        3,
+        4,
+        5,
+    ]
+
+
+def test_array_payload_empty_and_scalar():
+    np = pytest.importorskip("numpy")
+
+    typed, data = _array_payload(np, np.zeros((0, 3), dtype=np.int16))
+    assert typed == "Int16Array"
+    assert data.nbytes == 0
+
+    typed, data = _array_payload(np, np.array(1.5, dtype=">f8"))
+    assert typed == "Float64Array"
+    assert bytes(data) == np.array(1.5, dtype="<f8").tobytes()
+
+
+def test_array_dtype_unsupported():
+    np = pytest.importorskip("numpy")
+
+    assert _array_dtype(np, "BigInt64Array") == np.dtype("<i8")
+    with pytest.raises(ValueError, match="Uint8ClampedArray"):
+        _array_dtype(np, "Uint8ClampedArray")
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_repl_array_async(async_shared_sandbox):
+    np = pytest.importorskip("numpy")
+    sb = async_shared_sandbox
+
+    data = np.arange(6, dtype=np.float64).reshape(2, 3)
+
+    async with await sb.deno.repl() as repl:
+        await repl.send_array("data", data)
+
+        assert await repl.eval("data.shape") == [2, 3]
+        assert (await repl.eval_array("data") == data).all()
+
+        doubled = await repl.eval_array("data.map((x) => x * 2)")
+        assert doubled.tolist() == [0, 2, 4, 6, 8, 10]
+
+
+def test_repl_array_sync(shared_sandbox):
+    np = pytest.importorskip("numpy")
+    sb = shared_sandbox
+
+    with sb.deno.repl() as repl:
+        repl.send_array("ids", np.array([1, -2, 3], dtype=np.int32))
+
+        result = repl.eval_array("ids.map((x) => x * x)")
+        assert result.dtype == np.int32
+        assert result.tolist() == [1, 4, 9]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_repl_eval_cache_async(async_shared_sandbox):
+    sb = async_shared_sandbox
+    sb.deno.cache.invalidate()
+
+    first = await sb.deno.eval("Math.random()", cache=True)
+    assert await sb.deno.eval("Math.random()", cache=True) == first
+    assert await sb.deno.call("Math.max", [1, 2], cache=True) == 2
+    assert sb.deno.cache.stats()["hits"] >= 1
+
+    # Stateful evaluations invalidate the cache
+    await sb.deno.eval("1")
+    assert await sb.deno.eval("Math.random()", cache=True) != first
+
+
+def test_repl_eval_cache_sync(shared_sandbox):
+    sb = shared_sandbox
+
+    first = sb.deno.eval("Date.now()", cache=True)
+    assert sb.deno.eval("Date.now()", cache=True) == first
+
+    sb.deno.cache.invalidate()
+    assert sb.deno.call("(a, b) => a + b", [1, 2], stateless=True) == 3
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_deno_fetch_body_async(async_shared_sandbox):
+    sb = async_shared_sandbox
+
+    async with await sb.deno.run(
+        code="""Deno.serve((req) => new URL(req.url).pathname === "/json"
+          ? Response.json({ ok: true })
+          : new Response("a\\nb\\n".repeat(1000)))""",
+    ) as cp:
+        assert await cp.wait_http_ready() is True
+
+        res = await cp.fetch(url="http://localhost/json")
+        assert await res.json() == {"ok": True}
+
+        async with await cp.fetch(url="http://localhost/lines") as res:
+            lines = [line async for line in res.aiter_lines()]
+            assert lines == ["a", "b"] * 1000
+
+        res = await cp.fetch(url="http://localhost/lines")
+        chunk = await res.aiter_bytes(16).__anext__()
+        assert len(chunk) <= 16
+        await res.aclose()
+        assert res.is_closed
+
+
+def test_deno_fetch_body_sync(shared_sandbox):
+    sb = shared_sandbox
+
+    with sb.deno.run(code="Deno.serve((req) => new Response('hello'))") as cp:
+        assert cp.wait_http_ready() is True
+
+        res = cp.fetch(url="http://localhost/")
+        assert res.text() == "hello"
+        assert res.content == b"hello"
+
+        with cp.fetch(url="http://localhost/") as res:
+            assert b"".join(res.iter_bytes()) == b"hello"
+
+
+def enqueue(data: bytes) -> dict:
+    return {
+        "jsonrpc": "2.0",
+        "method": "$sandbox.stream.enqueue",
+        "params": {"streamId": 7, "data": base64.b64encode(data).decode()},
+    }
+
+
+class FakeFetchTransport:
+    """Answers each fetch with the response and its body in one read.
+
+    With `hold`, the replies are kept in `held` instead of being received.
+    """
+
+    _debug = False
+    buffered_amount = 0
+
+    def __init__(self, *, end: bool = True, hold: bool = False):
+        self.sent: list[dict] = []
+        self.held: list[dict] = []
+        self.incoming: asyncio.Queue[str] = asyncio.Queue()
+        self.end = end
+        self.hold = hold
+
+    def receive(self, message: dict) -> None:
+        self.incoming.put_nowait(json.dumps(message))
+
+    async def send(self, data, lane=None):
+        message = json.loads(data)
+        self.sent.append(message)
+        if message.get("method") != "fetch":
+            return 0.0
+        result = {
+            "status": 200,
+            "statusText": "OK",
+            "headers": [],
+            "bodyStreamId": 7,
+        }
+        replies = [
+            {"jsonrpc": "2.0", "id": message["id"], "result": {"ok": result}},
+            enqueue(b"hi"),
+        ]
+        if self.end:
+            replies.append(
+                {
+                    "jsonrpc": "2.0",
+                    "method": "$sandbox.stream.end",
+                    "params": {"streamId": 7},
+                }
+            )
+        if self.hold:
+            self.held.extend(replies)
+        else:
+            for reply in replies:
+                self.receive(reply)
+        return 0.0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.incoming.get()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_fetch_body_sent_with_response():
+    rpc = AsyncRpcClient(FakeFetchTransport())  # type: ignore[arg-type]
+
+    res = await rpc.fetch("http://localhost/")
+    assert await res.aread() == b"hi"
+    stats = rpc._streams.stats()
+    assert stats["open"] == 0 and stats["dropped_chunks"] == 0
+    rpc._listen_task.cancel()  # type: ignore[union-attr]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_fetch_cancel_and_close_release_body():
+    transport = FakeFetchTransport(end=False)
+    rpc = AsyncRpcClient(transport)  # type: ignore[arg-type]
+
+    # Closing early drops the rest of the body
+    res = await rpc.fetch("http://localhost/")
+    await res.aclose()
+    transport.receive(enqueue(b"late"))
+    await asyncio.sleep(0)
+    assert rpc._streams.stats()["dropped_chunks"] == 1
+
+    # So does cancelling before the response arrives
+    transport.hold = True
+    task = asyncio.ensure_future(rpc.fetch("http://localhost/"))
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    for reply in transport.held:
+        transport.receive(reply)
+    await asyncio.sleep(0)
+    assert rpc._streams.stats()["open"] == 0
+    assert rpc._streams.stats()["dropped_chunks"] == 2
+
+    # The fetch in the sandbox is left to finish; nothing else is sent
+    assert [message["method"] for message in transport.sent] == ["fetch", "fetch"]
+    rpc._listen_task.cancel()  # type: ignore[union-attr]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_deno_fetch_request_body_async(async_shared_sandbox):
+    sb = async_shared_sandbox
+
+    async with await sb.deno.run(
+        code="Deno.serve(async (req) => new Response((await req.arrayBuffer()).byteLength + ' ' + req.headers.get('content-type')))",
+    ) as cp:
+        assert await cp.wait_http_ready() is True
+
+        async def chunks():
+            for _ in range(4):
+                yield b"x" * 256 * 1024
+
+        res = await cp.fetch(url="http://localhost/", method="POST", content=chunks())
+        assert (await res.text()).startswith(f"{1024 * 1024} ")
+
+        res = await cp.fetch(url="http://localhost/", method="POST", json={"a": 1})
+        assert await res.text() == "8 application/json"
+
+
+def test_deno_fetch_request_body_sync(shared_sandbox):
+    sb = shared_sandbox
+
+    with sb.deno.run(
+        code="Deno.serve(async (req) => new Response(await req.text()))"
+    ) as cp:
+        assert cp.wait_http_ready() is True
+
+        res = cp.fetch(url="http://localhost/", method="PUT", content="héllo")
+        assert res.text() == "héllo"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_deno_httpx_transport_async(async_shared_sandbox):
+    sb = async_shared_sandbox
+
+    async with await sb.deno.run(
+        code="Deno.serve(async (req) => { if (new URL(req.url).pathname === '/slow') await new Promise((r) => setTimeout(r, 5000)); return new Response(req.method + ' ' + new URL(req.url).pathname + ' ' + await req.text()) })",
+    ) as cp:
+        assert await cp.wait_http_ready() is True
+
+        async with httpx.AsyncClient(
+            transport=SandboxTransport(cp), base_url="http://localhost"
+        ) as client:
+            res = await client.get("/hello")
+            assert res.status_code == 200
+            assert res.reason_phrase == "OK"
+            assert res.text == "GET /hello "
+
+            with pytest.raises(httpx.ReadTimeout):
+                await client.get("/slow", timeout=0.2)
+
+            res = await client.post("/echo", content=b"body")
+            assert res.text == "POST /echo body"
+
+            results = await asyncio.gather(*(client.get(f"/{i}") for i in range(10)))
+            assert [r.text for r in results] == [f"GET /{i} " for i in range(10)]
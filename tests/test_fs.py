@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+from types import SimpleNamespace
+
+import pytest
+
+from deno_sandbox.fs import AsyncFsWatcher
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_iter_walk_async(async_shared_sandbox):
+    sb = async_shared_sandbox
+
+    await sb.fs.mkdir("/tmp/iter_walk/a/b", recursive=True)
+    await sb.fs.write_text_file("/tmp/iter_walk/one.txt", "1")
+    await sb.fs.write_text_file("/tmp/iter_walk/a/two.ts", "2")
+    await sb.fs.write_text_file("/tmp/iter_walk/a/b/three.ts", "3")
+
+    paths = set()
+    async for entry in sb.fs.iter_walk("/tmp/iter_walk"):
+        paths.add(entry["path"])
+
+    assert paths == {
+        "/tmp/iter_walk",
+        "/tmp/iter_walk/one.txt",
+        "/tmp/iter_walk/a",
+        "/tmp/iter_walk/a/two.ts",
+        "/tmp/iter_walk/a/b",
+        "/tmp/iter_walk/a/b/three.ts",
+    }
+
+    files = [
+        entry["path"]
+        async for entry in sb.fs.iter_walk(
+            "/tmp/iter_walk", include_dirs=False, exts=[".ts"], max_depth=2
+        )
+    ]
+    assert files == ["/tmp/iter_walk/a/two.ts"]
+
+    # A file root yields just the file, like walk
+    entries = [entry async for entry in sb.fs.iter_walk("/tmp/iter_walk/one.txt")]
+    assert [(e["path"], e["is_file"]) for e in entries] == [
+        ("/tmp/iter_walk/one.txt", True)
+    ]
+
+
+def test_iter_walk_sync(shared_sandbox):
+    sb = shared_sandbox
+
+    sb.fs.mkdir("/tmp/iter_walk_sync/a", recursive=True)
+    sb.fs.write_text_file("/tmp/iter_walk_sync/one.txt", "1")
+    sb.fs.write_text_file("/tmp/iter_walk_sync/a/two.txt", "2")
+
+    paths = {entry["path"] for entry in sb.fs.iter_walk("/tmp/iter_walk_sync")}
+    assert paths == {
+        "/tmp/iter_walk_sync",
+        "/tmp/iter_walk_sync/one.txt",
+        "/tmp/iter_walk_sync/a",
+        "/tmp/iter_walk_sync/a/two.txt",
+    }
+
+    # Stopping early must not leave the iterator hanging
+    for entry in sb.fs.iter_walk("/tmp/iter_walk_sync"):
+        assert entry["path"] == "/tmp/iter_walk_sync"
+        break
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_iter_glob_async(async_shared_sandbox):
+    sb = async_shared_sandbox
+
+    await sb.fs.mkdir("/tmp/iter_glob/src/nested", recursive=True)
+    await sb.fs.mkdir("/tmp/iter_glob/node_modules", recursive=True)
+    await sb.fs.write_text_file("/tmp/iter_glob/src/main.ts", "")
+    await sb.fs.write_text_file("/tmp/iter_glob/src/nested/util.ts", "")
+    await sb.fs.write_text_file("/tmp/iter_glob/src/readme.md", "")
+    await sb.fs.write_text_file("/tmp/iter_glob/node_modules/dep.ts", "")
+
+    matches = [
+        path
+        async for path in sb.fs.iter_glob(
+            "**/*.ts", root="/tmp/iter_glob", exclude=["node_modules"]
+        )
+    ]
+    assert sorted(matches) == [
+        "/tmp/iter_glob/src/main.ts",
+        "/tmp/iter_glob/src/nested/util.ts",
+    ]
+
+
+def test_iter_glob_sync(shared_sandbox):
+    sb = shared_sandbox
+
+    sb.fs.mkdir("/tmp/iter_glob_sync/src", recursive=True)
+    sb.fs.write_text_file("/tmp/iter_glob_sync/src/main.ts", "")
+    sb.fs.write_text_file("/tmp/iter_glob_sync/src/readme.md", "")
+
+    matches = list(sb.fs.iter_glob("/tmp/iter_glob_sync/src/*.ts"))
+    assert matches == ["/tmp/iter_glob_sync/src/main.ts"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_watch_async(async_shared_sandbox):
+    sb = async_shared_sandbox
+
+    await sb.fs.mkdir("/tmp/watch_async", recursive=True)
+    async with await sb.fs.watch("/tmp/watch_async") as watcher:
+        await sb.fs.write_text_file("/tmp/watch_async/file.txt", "hello")
+
+        event = await watcher.__anext__()
+        assert event["path"] == "/tmp/watch_async/file.txt"
+        assert event["kind"] in ("create", "modify")
+
+
+@pytest.mark.asyncio
+async def test_watch_skips_blank_lines():
+    stdout = asyncio.StreamReader()
+    stdout.feed_data(b'\n{"kind": "create", "path": "/a"}\n\n')
+    stdout.feed_eof()
+    watcher = AsyncFsWatcher(SimpleNamespace(stdout=stdout))  # type: ignore[arg-type]
+
+    assert [event async for event in watcher] == [{"kind": "create", "path": "/a"}]
+
+
+def test_watch_sync(shared_sandbox):
+    sb = shared_sandbox
+
+    sb.fs.mkdir("/tmp/watch_sync", recursive=True)
+    with sb.fs.watch(["/tmp/watch_sync"]) as watcher:
+        sb.fs.write_text_file("/tmp/watch_sync/file.txt", "hello")
+
+        for event in watcher:
+            assert event["path"] == "/tmp/watch_sync/file.txt"
+            break
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_hash_async(async_shared_sandbox):
+    sb = async_shared_sandbox
+
+    await sb.fs.write_file("/tmp/hash_a.txt", b"hello")
+    await sb.fs.write_file("/tmp/hash_b.txt", b"world")
+
+    digest = await sb.fs.hash("/tmp/hash_a.txt")
+    assert digest == hashlib.sha256(b"hello").hexdigest()
+
+    digests = await sb.fs.hash(["/tmp/hash_a.txt", "/tmp/hash_b.txt"], algorithm="md5")
+    assert digests == {
+        "/tmp/hash_a.txt": hashlib.md5(b"hello").hexdigest(),
+        "/tmp/hash_b.txt": hashlib.md5(b"world").hexdigest(),
+    }
+
+
+def test_hash_sync(shared_sandbox):
+    sb = shared_sandbox
+
+    sb.fs.write_file("/tmp/hash_sync.txt", b"hello")
+    assert sb.fs.hash("/tmp/hash_sync.txt") == hashlib.sha256(b"hello").hexdigest()
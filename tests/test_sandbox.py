@@ -1,10 +1,17 @@
+import asyncio
 from datetime import datetime, timezone
+import io
+import pathlib
+import tempfile
+from types import SimpleNamespace
 import httpx
 import pytest
 import uuid
 
 from deno_sandbox import AsyncDenoDeploy, DenoDeploy
 from deno_sandbox.errors import RpcValidationError, UnknownRpcMethod
+from deno_sandbox.process import AsyncChildProcess, _pipe_to_queue
+from deno_sandbox.shell import AsyncShell
 
 
 def gen_app_name() -> str:
@@ -28,6 +35,33 @@ async def test_create_sync():
         assert sandbox.id is not None
 
 
+@pytest.mark.asyncio(loop_scope="session")
+async def test_close_kills_processes_async():
+    sdk = AsyncDenoDeploy()
+
+    async with sdk.sandbox.create() as sandbox:
+        for _ in range(5):
+            await sandbox.spawn("sleep", args=["60"])
+        # Helper processes started by fs are tracked too
+        await sandbox.fs.watch("/tmp")
+        assert len(sandbox._processes) == 6
+
+        await sandbox.close(timeout=10)
+        assert sandbox._processes == {}
+        assert sandbox.closed
+
+
+def test_close_kills_processes_sync():
+    sdk = DenoDeploy()
+
+    with sdk.sandbox.create() as sandbox:
+        process = sandbox.spawn("sleep", args=["60"])
+        assert process.pid in sandbox._async._processes
+
+        sandbox.close(timeout=10)
+        assert sandbox._async._processes == {}
+
+
 @pytest.mark.asyncio(loop_scope="session")
 async def test_connect_async():
     sdk = AsyncDenoDeploy()
@@ -113,6 +147,292 @@ async def test_spawn_sync(shared_sandbox) -> None:
     assert "will be installed" in stderr.decode()
 
 
+@pytest.mark.asyncio(loop_scope="session")
+async def test_run_async(async_shared_sandbox) -> None:
+    sb = async_shared_sandbox
+
+    result = await sb.run("sh", ["-c", "echo out; echo err >&2; exit 3"])
+    assert result["code"] == 3
+    assert result["stdout"] == b"out\n"
+    assert result["stderr"] == b"err\n"
+
+    result = await sb.run("sh", ["-c", "head -c 5000 /dev/zero"], max_output=100)
+    assert result["stdout"] == bytes(100)
+    assert result["stdout_path"] is not None
+    with open(result["stdout_path"], "rb") as f:
+        assert f.read() == bytes(5000)
+
+    result = await sb.run("sleep", ["30"], timeout=0.5)
+    assert result["timed_out"]
+    assert result["code"] is None
+
+
+def test_run_sync(shared_sandbox) -> None:
+    sb = shared_sandbox
+
+    result = sb.run("echo", ["hello"])
+    assert result["success"]
+    assert result["stdout"] == b"hello\n"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_run_many_async(async_shared_sandbox) -> None:
+    sb = async_shared_sandbox
+
+    commands = [["echo", str(i)] for i in range(10)] + ["false", "no-such-command"]
+    batch = await sb.run_many(commands, concurrency=4)
+    assert [r["stdout"] for r in batch["results"][:10]] == [
+        f"{i}\n".encode() for i in range(10)
+    ]
+    assert batch["results"][10]["code"] == 1
+    assert batch["results"][10]["error"] is None
+    assert not batch["results"][11]["success"]
+    assert batch["results"][11]["error"] is not None
+    assert batch["stats"]["total"] == 12
+    assert batch["stats"]["failed"] == 2
+    assert batch["stats"]["errored"] == 1
+
+
+def test_run_many_sync(shared_sandbox) -> None:
+    sb = shared_sandbox
+
+    batch = sb.run_many([["echo", "a"], ["echo", "b"]], order="completion")
+    assert sorted(r["stdout"] for r in batch["results"]) == [b"a\n", b"b\n"]
+    assert batch["stats"]["succeeded"] == 2
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_shell_async(async_shared_sandbox) -> None:
+    sb = async_shared_sandbox
+
+    async with await sb.shell() as shell:
+        result = await shell.run("echo out; echo err >&2; (exit 3)")
+        assert result["code"] == 3
+        assert result["stdout"] == b"out\n"
+        assert result["stderr"] == b"err\n"
+
+        await shell.run("cd /tmp && export GREETING=hello")
+        result = await shell.run("pwd; echo $GREETING")
+        assert result["stdout"] == b"/tmp\nhello\n"
+
+        result = await shell.run("sleep 30", timeout=0.5)
+        assert result["timed_out"]
+        assert (await shell.run("true"))["success"]
+
+        task = asyncio.ensure_future(shell.run("sleep 1; echo late"))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        result = await shell.run("echo next")
+        assert result["stdout"] == b"next\n"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_shell_closed_while_starting() -> None:
+    spawned = asyncio.Event()
+    release = asyncio.Event()
+    killed = []
+
+    class Process:
+        stdin = stdout = stderr = None
+
+        async def kill(self):
+            killed.append(self)
+
+    async def spawn():
+        spawned.set()
+        await release.wait()
+        return Process()
+
+    shell = AsyncShell(spawn)  # type: ignore[arg-type]
+    task = asyncio.ensure_future(shell.run("true"))
+    await spawned.wait()
+    await shell.close()
+    release.set()
+
+    with pytest.raises(RuntimeError, match="Shell is closed"):
+        await task
+    assert len(killed) == 1
+
+
+def test_shell_sync(shared_sandbox) -> None:
+    sb = shared_sandbox
+
+    with sb.shell(cwd="/tmp") as shell:
+        for i in range(20):
+            assert shell.run(f"echo {i}")["stdout"] == f"{i}\n".encode()
+        assert shell.run("pwd")["stdout"] == b"/tmp\n"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_spawn_output_sinks_async(async_shared_sandbox) -> None:
+    sb = async_shared_sandbox
+
+    queue: asyncio.Queue[bytes] = asyncio.Queue()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = pathlib.Path(tmpdir) / "stderr.log"
+        p = await sb.spawn(
+            "sh",
+            args=["-c", "echo out; echo err >&2"],
+            stdout=queue,
+            stderr=path,
+            output_read_size=4096,
+        )
+        await p.wait()
+
+        stdout = b""
+        while chunk := await queue.get():
+            stdout += chunk
+        assert stdout == b"out\n"
+        assert path.read_bytes() == b"err\n"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_queue_sink_bounded() -> None:
+    reader = asyncio.StreamReader()
+    reader.feed_data(b"ab")
+    reader.feed_eof()
+    queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=1)
+    pump = asyncio.ensure_future(_pipe_to_queue(reader, queue, 1))
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+    # The closing b"" waits for room rather than being dropped
+    assert [await queue.get() for _ in range(3)] == [b"a", b"b", b""]
+    await pump
+
+    reader = asyncio.StreamReader()
+    reader.feed_data(b"a")
+    queue = asyncio.Queue(maxsize=1)
+    pump = asyncio.ensure_future(_pipe_to_queue(reader, queue, 1))
+    for _ in range(5):
+        await asyncio.sleep(0)
+    pump.cancel()
+    await asyncio.sleep(0)
+    assert [await queue.get() for _ in range(2)] == [b"a", b""]
+
+
+def test_spawn_output_sinks_sync(shared_sandbox) -> None:
+    sb = shared_sandbox
+
+    sink = io.BytesIO()
+    p = sb.spawn("echo", args=["hello"], stdout=sink, output_flush_interval=0.5)
+    p.wait()
+    assert sink.getvalue() == b"hello\n"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_spawn_stdin_async(async_shared_sandbox) -> None:
+    sb = async_shared_sandbox
+
+    p = await sb.spawn("wc", args=["-c"], stdin="piped", stdout="piped")
+    assert p.stdin is not None
+    for _ in range(16):
+        p.stdin.write(bytes(64 * 1024))
+        await p.stdin.drain()
+    await p.stdin.close()
+
+    await p.wait()
+    stdout = await p.stdout.read(-1)
+    assert stdout.decode().strip() == str(16 * 64 * 1024)
+
+
+def test_spawn_stdin_sync(shared_sandbox) -> None:
+    sb = shared_sandbox
+
+    p = sb.spawn("cat", stdin="piped", stdout="piped")
+    assert p.stdin is not None
+    p.stdin.write(b"hello ")
+    p.stdin.write(b"world")
+    p.stdin.close()
+
+    p.wait()
+    assert p.stdout.read(-1) == b"hello world"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_spawn_lines_async(async_shared_sandbox) -> None:
+    sb = async_shared_sandbox
+
+    p = await sb.spawn(
+        "sh",
+        args=["-c", "echo '{\"a\": 1}'; echo err >&2; echo; echo '{\"b\": 2}'"],
+        stdout="piped",
+        stderr="piped",
+    )
+    values = [value async for value in p.iter_ndjson()]
+    assert values == [{"a": 1}, {"b": 2}]
+    assert [line async for line in p.stderr.lines()] == ["err"]
+    await p.wait()
+
+    p = await sb.spawn(
+        "sh", args=["-c", "echo out; echo err >&2"], stdout="piped", stderr="piped"
+    )
+    events = [event async for event in p.events()]
+    assert sorted((e["stream"], e["line"]) for e in events) == [
+        ("stderr", "err"),
+        ("stdout", "out"),
+    ]
+    await p.wait()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_events_stop_early() -> None:
+    class Reader:
+        async def _timed_lines(self):
+            for i in range(1000):
+                yield str(i), None
+
+    process = SimpleNamespace(
+        _rpc=SimpleNamespace(_loop=asyncio.get_running_loop()),
+        stdout=Reader(),
+        stderr=Reader(),
+    )
+
+    async def first():
+        events = AsyncChildProcess.events(process)  # type: ignore[arg-type]
+        event = await events.__anext__()
+        # Let both pumps fill the queue and block before stopping
+        for _ in range(10):
+            await asyncio.sleep(0)
+        await events.aclose()
+        return event
+
+    event = await asyncio.wait_for(first(), 5)
+    assert event["line"] == "0"
+
+
+def test_spawn_lines_sync(shared_sandbox) -> None:
+    sb = shared_sandbox
+
+    p = sb.spawn("sh", args=["-c", "printf 'a\\nb'"], stdout="piped")
+    assert list(p.stdout.lines()) == ["a", "b"]
+    p.wait()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_kill_releases_streams_async(async_shared_sandbox) -> None:
+    sb = async_shared_sandbox
+
+    before = sb.stream_stats()["open"]
+    p = await sb.spawn("sleep", args=["60"], stdout="piped", stderr="piped")
+    assert sb.stream_stats()["open"] == before + 2
+
+    await p.kill()
+    assert sb.stream_stats()["open"] == before
+    assert await p.stdout.read() == b""
+
+
+def test_kill_releases_streams_sync(shared_sandbox) -> None:
+    sb = shared_sandbox
+
+    before = sb.stream_stats()["open"]
+    with sb.spawn("sleep", args=["60"], stdout="piped", stderr="piped"):
+        assert sb.stream_stats()["open"] == before + 2
+    assert sb.stream_stats()["open"] == before
+
+
 @pytest.mark.asyncio(loop_scope="session")
 async def test_extend_timeout_async(async_shared_sandbox):
     sb = async_shared_sandbox
@@ -1,9 +1,23 @@
 import asyncio
+import base64
+import gc
 import io
+import json
 import os
 import tempfile
+import tracemalloc
+
 import pytest
 
+from deno_sandbox.process import RingBuffer
+from deno_sandbox.stream import (
+    AdaptiveChunkSize,
+    AsyncStreamWriter,
+    StreamRegistry,
+    complete_stream,
+    empty_metrics,
+)
+
 
 @pytest.mark.asyncio(loop_scope="session")
 async def test_write_file_bytes_async(async_shared_sandbox):
@@ -186,6 +200,75 @@ async def test_write_file_slow_async_generator(async_shared_sandbox):
     assert content == b"chunk0 chunk1 chunk2 chunk3 chunk4 "
 
 
+@pytest.mark.asyncio(loop_scope="session")
+async def test_write_file_verify_async(async_shared_sandbox):
+    """Test write_file with verify compares against a sandbox-side hash."""
+    sb = async_shared_sandbox
+
+    def chunks():
+        yield b"verified "
+        yield b"content"
+
+    await sb.fs.write_file("test_verify.txt", chunks(), verify=True)
+    content = await sb.fs.read_file("test_verify.txt")
+    assert content == b"verified content"
+
+
+def test_write_file_verify_sync(shared_sandbox):
+    """Test write_file with verify compares against a sandbox-side hash."""
+    sb = shared_sandbox
+
+    file_obj = io.BytesIO(b"verified content sync")
+    sb.fs.write_file("test_verify_sync.txt", file_obj, verify=True)
+    content = sb.fs.read_file("test_verify_sync.txt")
+    assert content == b"verified content sync"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_write_file_compressed_async(async_shared_sandbox):
+    """Test write_file and read_file with gzip compression on the wire."""
+    sb = async_shared_sandbox
+
+    data = b"compressible line\n" * 10000
+    await sb.fs.write_file("test_gzip.txt", data, compression="gzip")
+    assert await sb.fs.read_file("test_gzip.txt") == data
+    assert await sb.fs.read_file("test_gzip.txt", compression="gzip") == data
+
+
+def test_write_file_compressed_sync(shared_sandbox):
+    """Test write_file with adaptive compression of incompressible data."""
+    sb = shared_sandbox
+
+    data = os.urandom(100 * 1024)
+    sb.fs.write_file("test_auto_sync.bin", io.BytesIO(data), compression="auto")
+    assert sb.fs.read_file("test_auto_sync.bin", compression="deflate") == data
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_write_file_parallel_connections_async(async_shared_sandbox):
+    """Test striped write_file/read_file over additional connections."""
+    sb = async_shared_sandbox
+
+    data = os.urandom(20 * 1024 * 1024)
+    await sb.fs.write_file(
+        "test_striped.bin", data, parallel_connections=4, verify=True
+    )
+    content = await sb.fs.read_file("test_striped.bin", parallel_connections=4)
+    assert content == data
+
+
+def test_write_file_parallel_connections_sync(shared_sandbox):
+    """Test striped write_file from a file object (sync)."""
+    sb = shared_sandbox
+
+    data = os.urandom(20 * 1024 * 1024)
+    with tempfile.TemporaryFile() as f:
+        f.write(data)
+        f.seek(0)
+        sb.fs.write_file("test_striped_sync.bin", f, parallel_connections=2)
+    assert sb.fs.read_file("test_striped_sync.bin") == data
+
+
 # stdin streaming tests for spawn
 
 
@@ -351,6 +434,47 @@ async def test_upload_file_async(async_shared_sandbox):
         os.unlink(local_path)
 
 
+@pytest.mark.asyncio(loop_scope="session")
+async def test_upload_large_file_async(async_shared_sandbox):
+    """Test uploading a file spanning many read-ahead chunks (async)."""
+    sb = async_shared_sandbox
+
+    data = os.urandom(1024 * 1024 + 123)
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        f.write(data)
+        local_path = f.name
+
+    try:
+        await sb.fs.upload(local_path, "/tmp/uploaded_large_file.bin")
+        content = await sb.fs.read_file("/tmp/uploaded_large_file.bin")
+        assert content == data
+    finally:
+        os.unlink(local_path)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_upload_mmap_async(async_shared_sandbox):
+    """Test uploading a memory-mapped file and collecting its metrics (async)."""
+    sb = async_shared_sandbox
+
+    data = os.urandom(300 * 1024)
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        f.write(data)
+        local_path = f.name
+
+    try:
+        metrics = empty_metrics()
+        await sb.fs.upload(
+            local_path, "/tmp/uploaded_mmap.bin", use_mmap=True, metrics=metrics
+        )
+        assert metrics["bytes"] == len(data)
+        assert metrics["chunks"] >= 1
+        content = await sb.fs.read_file("/tmp/uploaded_mmap.bin")
+        assert content == data
+    finally:
+        os.unlink(local_path)
+
+
 def test_upload_file_sync(shared_sandbox):
     """Test uploading a single file (sync)."""
     sb = shared_sandbox
@@ -475,3 +599,174 @@ def test_upload_symlink_sync(shared_sandbox):
         # Verify the symlink was created
         link_info = sb.fs.lstat("/tmp/uploaded_symlink_dir_sync/link.txt")
         assert link_info["is_symlink"] is True
+
+
+def test_adaptive_chunk_size():
+    chunker = AdaptiveChunkSize(64 * 1024, minimum=16 * 1024, maximum=1024 * 1024)
+
+    # A fast link grows the chunk size, at most doubling per observation
+    chunker.observe(64 * 1024, 0.0001, 0)
+    assert chunker.size == 128 * 1024
+    for _ in range(10):
+        chunker.observe(chunker.size, 0.0001, 0)
+    assert chunker.size == 1024 * 1024
+
+    # A backed-up outbound queue halves it
+    chunker.observe(chunker.size, 0.0001, 4 * 1024 * 1024)
+    assert chunker.size == 512 * 1024
+
+    # A slow link settles near the target send time, within bounds
+    for _ in range(50):
+        chunker.observe(chunker.size, chunker.size / 100_000, 0)
+    assert chunker.size == 16 * 1024
+
+
+def test_enqueue_frame_allocations():
+    """Encoding into the reused frame buffer allocates less than the JSON path."""
+    data = os.urandom(1024 * 1024)
+    writer = AsyncStreamWriter(None, 7)  # type: ignore[arg-type]
+
+    def naive() -> bytes:
+        payload = {
+            "method": "$sandbox.stream.enqueue",
+            "params": {"streamId": 7, "data": base64.b64encode(data).decode("ascii")},
+            "jsonrpc": "2.0",
+        }
+        return json.dumps(payload).encode()
+
+    def encode() -> None:
+        writer._encode_enqueue(data).release()
+
+    def peak(fn) -> int:
+        tracemalloc.start()
+        try:
+            fn()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    frame = writer._encode_enqueue(data)
+    assert json.loads(bytes(frame)) == json.loads(naive())
+    frame.release()
+
+    # The JSON path holds ~4 copies of the payload at once; the reused frame
+    # buffer only needs one small block at a time
+    assert peak(encode) < peak(naive) / 4
+
+
+class _FakeRpc:
+    """Collects stream frames instead of sending them."""
+
+    buffered_amount = 0
+
+    def __init__(self):
+        self.frames: list[bytes] = []
+        self.write_seconds = 0.0
+
+    async def send_frame(self, frame, lane=None):
+        self.frames.append(bytes(frame))
+        return self.write_seconds
+
+    async def send_notification(self, method, params, lane=None):
+        pass
+
+    def received(self) -> bytes:
+        return b"".join(
+            base64.b64decode(json.loads(frame)["params"]["data"])
+            for frame in self.frames
+        )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_complete_stream_mmap():
+    rpc = _FakeRpc()
+    writer = AsyncStreamWriter(rpc, 1)  # type: ignore[arg-type]
+    data = os.urandom(200 * 1024 + 7)
+
+    with tempfile.TemporaryFile() as f:
+        f.write(data)
+        f.seek(10)
+        metrics = await complete_stream(writer, f, 64 * 1024, use_mmap=True)
+        # The file is left positioned after the data, as a read would leave it
+        assert f.tell() == len(data)
+
+    assert rpc.received() == data[10:]
+    assert metrics["bytes"] == len(data) - 10
+    assert metrics["chunks"] == 4
+    assert metrics["chunk_size"] == 64 * 1024
+    assert metrics["send_seconds"] >= 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_complete_stream_adaptive_uses_write_time():
+    """Time spent queued behind other lanes does not shrink the chunk size."""
+
+    class QueuedRpc(_FakeRpc):
+        async def send_frame(self, frame, lane=None):
+            # Slow to come back, but the write itself was fast
+            await asyncio.sleep(0.05)
+            return await super().send_frame(frame, lane)
+
+    rpc = QueuedRpc()
+    rpc.write_seconds = 0.0001
+    writer = AsyncStreamWriter(rpc, 1)  # type: ignore[arg-type]
+    data = os.urandom(1024 * 1024)
+
+    metrics = await complete_stream(
+        writer,
+        [data[i : i + 256 * 1024] for i in range(0, len(data), 256 * 1024)],
+        16 * 1024,
+        adaptive=True,
+    )
+
+    assert rpc.received() == data
+    assert metrics["chunk_size"] > 16 * 1024
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_stream_registry():
+    class Owner:
+        pass
+
+    registry = StreamRegistry()
+    owner = Owner()
+    stdout, stderr = asyncio.StreamReader(), asyncio.StreamReader()
+    registry.register(1, stdout, owner)
+    registry.register(2, stderr, owner)
+
+    registry.feed(1, base64.b64encode(b"hello").decode())
+    stats = registry.stats()
+    assert stats["open"] == 2
+    assert stats["buffered_bytes"] == 5
+    assert stats["by_owner"] == {"Owner": 2}
+
+    # Releasing the owner ends its readers; buffered data stays readable
+    registry.release_owner(owner)
+    assert len(registry) == 0
+    assert await stdout.read() == b"hello"
+    assert stderr.at_eof()
+
+    # Late chunks are dropped without being decoded into a reader
+    registry.feed(2, base64.b64encode(b"late").decode())
+    assert registry.stats()["dropped_chunks"] == 1
+    assert registry.stats()["dropped_bytes"] == 4
+
+    # Streams are released when their owner is garbage collected
+    reader = asyncio.StreamReader()
+    registry.register(3, reader, Owner())
+    gc.collect()
+    assert registry.get(3) is None
+    assert reader.at_eof()
+
+
+def test_ring_buffer():
+    ring = RingBuffer(8)
+    ring.write(b"hello\n")
+    ring.write(b"world\n")
+    assert ring.tail() == b"o\nworld\n"
+    assert ring.tail(3) == b"ld\n"
+    assert ring.tail_lines(1) == ["world"]
+    assert ring.total == 12
+
+    ring.write(b"0123456789")
+    assert ring.tail() == b"23456789"
@@ -0,0 +1,116 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from websockets import ConnectionClosedOK
+from websockets.frames import Close
+
+from deno_sandbox.transport import WebSocketTransport
+
+
+class FakeConnection:
+    """Records sent messages; sends block while `gate` is clear."""
+
+    def __init__(self):
+        self.sent: list[str] = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.protocol = SimpleNamespace(close_exc=None)
+
+    async def send(self, data, text=False):
+        await self.gate.wait()
+        self.sent.append(data)
+
+    async def close(self):
+        pass
+
+
+def connected() -> tuple[WebSocketTransport, FakeConnection]:
+    transport = WebSocketTransport()
+    ws = FakeConnection()
+    transport._ws = ws  # type: ignore[assignment]
+    return transport, ws
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_control_messages_first_and_lanes_round_robin():
+    transport, ws = connected()
+    ws.gate.clear()
+
+    # Occupies the writer while the rest is queued
+    first = asyncio.ensure_future(transport.send("first", 1))
+    await asyncio.sleep(0)
+    sends = [transport.send(f"a{i}", 1) for i in range(3)]
+    sends += [transport.send(f"b{i}", 2) for i in range(2)]
+    sends.append(transport.send("control"))
+    tasks = [asyncio.ensure_future(send) for send in sends]
+    await asyncio.sleep(0)
+
+    ws.gate.set()
+    results = await asyncio.gather(first, *tasks)
+
+    assert ws.sent == ["first", "control", "a0", "b0", "a1", "b1", "a2"]
+    assert all(isinstance(seconds, float) and seconds >= 0 for seconds in results)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_cancelled_sends_are_skipped():
+    transport, ws = connected()
+    ws.gate.clear()
+
+    first = asyncio.ensure_future(transport.send("first"))
+    await asyncio.sleep(0)
+    cancelled = asyncio.ensure_future(transport.send("cancelled", 1))
+    kept = asyncio.ensure_future(transport.send("kept", 1))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    ws.gate.set()
+    await asyncio.gather(first, kept)
+    assert ws.sent == ["first", "kept"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_close_fails_pending_sends():
+    transport, ws = connected()
+    ws.gate.clear()
+
+    sending = asyncio.ensure_future(transport.send("sending"))
+    await asyncio.sleep(0)
+    queued = asyncio.ensure_future(transport.send("queued", 1))
+    await asyncio.sleep(0)
+
+    await transport.close()
+
+    for task in (sending, queued):
+        with pytest.raises(RuntimeError, match="closed"):
+            await task
+    assert transport.closed
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_close_reports_close_exception():
+    transport, ws = connected()
+    ws.gate.clear()
+    error = ConnectionClosedOK(Close(1000, ""), Close(1000, ""), True)
+    ws.protocol.close_exc = error
+
+    queued = asyncio.ensure_future(transport.send("queued", 1))
+    await asyncio.sleep(0)
+    await transport.close()
+
+    with pytest.raises(ConnectionClosedOK):
+        await queued
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_writer_without_connection_fails_queued():
+    transport, _ = connected()
+    future = asyncio.get_running_loop().create_future()
+    transport._control.append(("queued", future))
+    transport._ws = None
+
+    await transport._writer()
+
+    with pytest.raises(RuntimeError, match="not connected"):
+        await future
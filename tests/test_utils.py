@@ -1,4 +1,4 @@
-from deno_sandbox.utils import parse_link_header
+from deno_sandbox.utils import batched, glob_to_regex, parse_link_header
 
 
 def test_link_header():
@@ -10,3 +10,23 @@ def test_link_header():
         "last": "https://api.example.com/resource?page=5",
     }
     assert parsed == expected
+
+
+def test_glob_to_regex():
+    assert glob_to_regex("/app/**/*.ts").match("/app/main.ts")
+    assert glob_to_regex("/app/**/*.ts").match("/app/src/lib/mod.ts")
+    assert not glob_to_regex("/app/**/*.ts").match("/app/main.js")
+    assert glob_to_regex("/app/**").match("/app")
+    assert not glob_to_regex("/app/*").match("/app/src/main.ts")
+    assert glob_to_regex("/app/{a,b}.json").match("/app/b.json")
+    assert not glob_to_regex("/app/[!a].json").match("/app/a.json")
+    assert glob_to_regex("/app/@(x|y).ts").match("/app/y.ts")
+    assert not glob_to_regex("/app/!(x).ts").match("/app/x.ts")
+    assert glob_to_regex("*.TS", case_insensitive=True).match("main.ts")
+    assert glob_to_regex("/app/**/x", globstar=False).match("/app/a/x")
+    assert not glob_to_regex("/app/**/x", globstar=False).match("/app/a/b/x")
+
+
+def test_batched():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(batched([], 3)) == []